@@ -1,89 +1,216 @@
 import gradio as gr
-import google.generativeai as genai
-from PIL import Image
-from docx import Document
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-import re
+import asyncio
+import logging
 import os
-import tempfile
+import zipfile
+from io import BytesIO
 
-def markdown_to_docx(text):
-    # Converts Markdown text (headers and bold) into a DOCX object.
-    doc = Document()
-    lines = text.split('\n')
+from image2word.docx_builder import markdown_to_docx, new_document
+from image2word.gemini_batch import DEFAULT_CONCURRENCY, DEFAULT_RPM, DEFAULT_TPM, GeminiBatch
+from image2word.gemini_client import LineBuffer, stream_markdown
+from image2word.gemini_payload import DEFAULT_ENCODING
+from image2word.ocr_cache import get_cache, image_digest, make_key
+from image2word.page_source import count_pages, iter_pages
+from image2word.scheduler import Scheduler, ServerBusy
+from image2word.spool import SWEEP_SECONDS, TTL, get_spool
+from image2word.tracing import Trace, stage, start_metrics_server, traced
+
+MODEL_NAME = 'gemini-2.5-flash'
+PROMPT = (
+    "Extract the text from this image. Return the content in Markdown format. "
+    "Use headers (#) for big text, bold (**) for bold text. "
+    "Do not include markdown code block fences (like ```markdown). "
+    "Just return the raw text."
+)
+
+# At most this many conversions talk to Gemini at once (each on its own
+# thread, the SDK blocks) and IMAGE2WORD_MAX_QUEUE more may wait
+GEMINI_CONCURRENCY = int(os.getenv("IMAGE2WORD_GEMINI_CONCURRENCY", DEFAULT_CONCURRENCY))
+scheduler = Scheduler('gemini', GEMINI_CONCURRENCY)
+
+def gemini_markdown_stream(image, api_key):
+    # Yields the markdown for one PIL image in chunks as Gemini produces it.
+    # Identical uploads come back from the cache as a single chunk.
+    key = make_key(image_digest(image), engine='gemini', model=MODEL_NAME, prompt=PROMPT,
+                   encoding=DEFAULT_ENCODING.signature())
+    cache = get_cache()
+    cached = cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+
+    chunks = []
+    for chunk in stream_markdown(api_key, MODEL_NAME, PROMPT, image):
+        chunks.append(chunk)
+        yield chunk
+    cache.put(key, ''.join(chunks))
+
+def stream_page(image, api_key, doc):
+    # Generator: yields the page's markdown so far while adding each finished line to doc
+    lines = LineBuffer()
+    for chunk in gemini_markdown_stream(image, api_key):
+        with stage('docx'):
+            markdown_to_docx(lines.feed(chunk), doc=doc)
+        yield lines.text
+    with stage('docx'):
+        markdown_to_docx(lines.flush(), doc=doc)
+
+def admit(slots=1):
+    # A place in line, or an error toast right away when the line is full
+    try:
+        return scheduler.admit(slots)
+    except ServerBusy as e:
+        raise gr.Error(str(e))
+
+def save_doc(doc, trace):
+    # Thread: serialize the docx in memory, then one write to the spool for the download
+    buffer = BytesIO()
+    with trace.active(), stage('save'):
+        doc.save(buffer)
+    return get_spool().write(buffer.getvalue(), "converted_doc.docx")
+
+# Async generators on the server's event loop: they report their place in
+# line while waiting, and every blocking step runs on the scheduler's threads.
+
+async def process_image(image, api_key):
+    # Streams the raw text while Gemini writes it, then adds the .docx file.
+    if image is None:
+        yield "Please upload an image.", None
+        return
     
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
+    if not api_key:
+        yield "Please enter a valid Google Gemini API Key.", None
+        return
+
+    async with admit() as ticket:
+        async for position in ticket.positions():
+            yield scheduler.describe(position) + "...", None
+
+        trace = Trace('app', 'image')
+        try:
+            # 1. Stream the markdown, building the DOCX line by line as it arrives
+            doc = new_document()
+            result_text = ""
+            async for result_text in scheduler.stream(traced(trace, stream_page(image, api_key, doc))):
+                yield result_text, None
             
-        # Header Handling (# Header)
-        if line.startswith('#'):
-            level = line.count('#')
-            clean_text = line.replace('#', '').strip()
-            # Docx supports heading levels 1-9
-            heading_level = min(level, 9)
-            p = doc.add_heading(clean_text, level=heading_level)
-            p.alignment = WD_ALIGN_PARAGRAPH.LEFT
-        else:
-            # Standard Paragraph with simple Bold parsing
-            p = doc.add_paragraph()
+            # 2. Hand the file to gr.File through the spool, which deletes it
+            # after a while (Hugging Face spaces run for weeks)
+            save_path = await scheduler.call(save_doc, doc, trace)
+            trace.finish()
             
-            # Very basic markdown bold parser (**text**)
-            parts = re.split(r'(\*\*.*?\*\*)', line)
-            for part in parts:
-                if part.startswith('**') and part.endswith('**'):
-                    run = p.add_run(part[2:-2])
-                    run.bold = True
-                else:
-                    p.add_run(part)
+            yield result_text, save_path
+
+        except Exception as e:
+            trace.finish(ok=False)
+            yield f"Error: {str(e)}", None
+
+async def process_document(document, api_key):
+    # Converts a PDF/TIFF page by page, streaming the text as it goes
+    if document is None:
+        yield "Please upload a PDF or TIFF.", None
+        return
+    
+    if not api_key:
+        yield "Please enter a valid Google Gemini API Key.", None
+        return
+
+    path = document if isinstance(document, str) else document.name
+    async with admit() as ticket:
+        async for position in ticket.positions():
+            yield scheduler.describe(position) + "...", None
+
+        trace = Trace('app', 'document')
+        try:
+            total = await scheduler.call(count_pages, path)
+            doc = new_document()
+            pages_text = []
+            number = 0
             
-            p.style = doc.styles['Normal']
+            async for page in scheduler.stream(traced(trace, iter_pages(path))):
+                number += 1
+                if number > 1:
+                    doc.add_page_break()
+                header = f"<!-- Page {number} / {total} -->\n"
+                result_text = ""
+                async for result_text in scheduler.stream(traced(trace, stream_page(page, api_key, doc))):
+                    yield "\n\n".join(pages_text + [header + result_text]), None
+                pages_text.append(header + result_text)
             
-    return doc
+            save_path = await scheduler.call(save_doc, doc, trace)
+            trace.finish()
+            
+            yield "\n\n".join(pages_text), save_path
 
-def process_image(image, api_key):
-    # Takes an image and API key, returns the raw text and a path to the .docx file.
-    if image is None:
-        return "Please upload an image.", None
+        except Exception as e:
+            trace.finish(ok=False)
+            yield f"Error: {str(e)}", None
+
+async def process_batch(files, api_key, concurrency=DEFAULT_CONCURRENCY, rpm=DEFAULT_RPM, tpm=DEFAULT_TPM):
+    # Async generator: converts many images concurrently within the rate limits,
+    # reporting progress as images finish, then returns a zip of .docx files
+    if not files:
+        yield "Please upload at least one image.", None
+        return
     
     if not api_key:
-        return "Please enter a valid Google Gemini API Key.", None
+        yield "Please enter a valid Google Gemini API Key.", None
+        return
 
-    try:
-        # 1. Configure API
-        genai.configure(api_key=api_key)
-        
-        # 2. Select Model
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        
-        # 3. Define Prompt
-        prompt = (
-            "Extract the text from this image. Return the content in Markdown format. "
-            "Use headers (#) for big text, bold (**) for bold text. "
-            "Do not include markdown code block fences (like ```markdown). "
-            "Just return the raw text."
-        )
-        
-        
-        # 4. Call Gemini
-        response = model.generate_content([prompt, image])
-        result_text = response.text
-        
-        # 5. Generate DOCX
-        doc = markdown_to_docx(result_text)
-        
-        # 6. Save to a temporary file
-        # Hugging Face spaces act like read-only containers mostly, 
-        # so we use a temporary file path for the output.
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".docx")
-        doc.save(temp_file.name)
-        temp_file.close()
-        
-        return result_text, temp_file.name
+    paths = [f if isinstance(f, str) else f.name for f in files]
+    # A batch takes one place in line and reserves as many of the server's
+    # Gemini slots as it sends requests at once; the rate limits are its own
+    concurrency = min(max(1, int(concurrency)), len(paths), scheduler.concurrency)
+    rpm = max(1, int(rpm or DEFAULT_RPM))
+    tpm = max(1, int(tpm or DEFAULT_TPM))
+    async with admit(concurrency) as ticket:
+        async for position in ticket.positions():
+            yield scheduler.describe(position) + "...", None
+
+        batch = GeminiBatch(api_key, MODEL_NAME, PROMPT, concurrency=concurrency, rpm=rpm, tpm=tpm)
+        finished = asyncio.Queue()
+        task = asyncio.ensure_future(batch.run(paths, on_result=finished.put_nowait))
+        try:
+            done = failed = 0
+            while done < len(paths):
+                result = await finished.get()
+                done += 1
+                failed += not result.ok
+                yield f"Converted {done} / {len(paths)} images ({failed} failed)...", None
+            results = await task
+        finally:
+            task.cancel()  # the client went away: stop sending its requests
+
+        report, zip_path = await scheduler.call(write_zip, results)
+    yield report, zip_path
 
-    except Exception as e:
-        return f"Error: {str(e)}", None
+def write_zip(results):
+    # Thread: one .docx per converted image, zipped -> (markdown report, zip path or None)
+    report = []
+    used_names = set()
+    zip_buffer = BytesIO()
+    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        # Results are in upload order, so the zip and the report match the input list
+        for result in results:
+            source_name = os.path.basename(result.source)
+            if not result.ok:
+                report.append(f"<!-- {source_name} -->\nError: {result.error}")
+                continue
+
+            name = f"{os.path.splitext(source_name)[0]}.docx"
+            suffix = 1
+            while name in used_names:
+                suffix += 1
+                name = f"{os.path.splitext(source_name)[0]}_{suffix}.docx"
+            used_names.add(name)
+
+            buffer = BytesIO()
+            markdown_to_docx(result.text).save(buffer)
+            archive.writestr(name, buffer.getvalue())
+            report.append(f"<!-- {source_name} -->\n{result.text}")
+
+    zip_path = get_spool().write(zip_buffer.getvalue(), "gemini_batch.zip") if used_names else None
+    return "\n\n".join(report), zip_path
 
 # Gradio Interface Setup
 
@@ -92,7 +219,8 @@ custom_css = """
 #component-0 {max_width: 800px; margin: auto;}
 """
 
-with gr.Blocks(css=custom_css, title="AI Image to Word Converter") as demo:
+# delete_cache: Gradio keeps its own copy of every output file, expire those like the spool
+with gr.Blocks(css=custom_css, title="AI Image to Word Converter", delete_cache=(SWEEP_SECONDS, TTL)) as demo:
     gr.Markdown("# 📄 AI Image to Word (Docx) Converter")
     gr.Markdown("Upload an image, enter your Google Gemini API Key, and get a formatted Word document back.")
     
@@ -105,20 +233,55 @@ with gr.Blocks(css=custom_css, title="AI Image to Word Converter") as demo:
             )
             image_input = gr.Image(type="pil", label="Upload Image")
             submit_btn = gr.Button("🚀 Convert Image", variant="primary")
+            document_input = gr.File(label="Or Upload a Multi-page PDF/TIFF", file_types=[".pdf", ".tif", ".tiff"])
+            document_btn = gr.Button("📚 Convert Document")
         
         with gr.Column():
             output_text = gr.TextArea(label="Extracted Text (Markdown)", interactive=False)
             output_file = gr.File(label="Download DOCX")
 
+    with gr.Accordion("Batch Conversion", open=False):
+        with gr.Row():
+            with gr.Column():
+                batch_input = gr.File(label="Upload Images", file_count="multiple", file_types=["image"])
+                concurrency_input = gr.Slider(1, 16, value=DEFAULT_CONCURRENCY, step=1, label="Parallel Requests")
+                with gr.Row():
+                    rpm_input = gr.Number(value=DEFAULT_RPM, precision=0, label="Requests / Minute")
+                    tpm_input = gr.Number(value=DEFAULT_TPM, precision=0, label="Tokens / Minute")
+                batch_btn = gr.Button("🗂️ Convert Batch")
+            
+            with gr.Column():
+                batch_text = gr.TextArea(label="Batch Results (Markdown)", interactive=False)
+                batch_file = gr.File(label="Download ZIP")
+
     # Connect the button to the function
     submit_btn.click(
         fn=process_image, 
         inputs=[image_input, api_input], 
         outputs=[output_text, output_file]
     )
+
+    document_btn.click(
+        fn=process_document,
+        inputs=[document_input, api_input],
+        outputs=[output_text, output_file]
+    )
+    
+    batch_btn.click(
+        fn=process_batch,
+        inputs=[batch_input, api_input, concurrency_input, rpm_input, tpm_input],
+        outputs=[batch_text, batch_file]
+    )
+
+    # The handlers only wait on the scheduler, which does the admission control
+    demo.queue(default_concurrency_limit=None)
     
     gr.Markdown("Powered by **Gemini 2.5 Flash**")
 
 # Launch the app
 if __name__ == "__main__":
+    # Per-conversion stage timings are logged; set IMAGE2WORD_METRICS_PORT for a /metrics endpoint
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s: %(message)s")
+    start_metrics_server()
+    get_spool()  # sweep files left by an earlier run, report the spool in /metrics
     demo.launch()
\ No newline at end of file
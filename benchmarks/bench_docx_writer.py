@@ -0,0 +1,133 @@
+"""Build time, save time and size of word-level .docx output.
+
+Usage: python benchmarks/bench_docx_writer.py [--pages 1 10 50] [--repeat 3]
+
+Compares, on the same parsed hOCR pages:
+  per-word     the old builder: one run per word, font size set on every run
+  coalesced    words_to_docx: runs merged, sizes from paragraph styles
+  direct       docx_writer.write_docx: XML streamed into the zip
+The direct writer has no separate build step, so its whole time is under
+save. Every output is reopened with python-docx to check the text matches.
+"""
+import argparse
+import re
+import zipfile
+from io import BytesIO
+
+from common import best_of, group_lines, load_hocr_fixtures, synthetic_hocr
+
+from image2word.docx_builder import new_document, words_to_docx
+from image2word.docx_writer import write_docx
+from image2word.hocr_parser import parse_hocr
+from image2word.layout import LINE_TOLERANCE, layout_words
+from image2word.preprocess import read_scale
+
+SYNTHETIC_WORDS = 300  # per page, roughly a dense scan
+CENTER_INDENT = 90  # px; the old builder centered every line starting further right
+RUN_PATTERN = re.compile(rb'<w:r[ >]')
+
+
+def legacy_words_to_docx(words_data, doc, scale=1.0):
+    # The builder before run coalescing (tesseract_app / ocr_tesseract_app)
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    from docx.shared import Pt
+
+    lines = group_lines(words_data, tolerance=LINE_TOLERANCE * scale)
+    all_heights = [w.h for w in words_data]
+    median_height = sorted(all_heights)[len(all_heights)//2] if all_heights else 20
+    last_y_bottom = 0
+    for y, line_words in lines:
+        if last_y_bottom > 0 and y - last_y_bottom > (median_height * 1.5):
+            doc.add_paragraph("")
+        p = doc.add_paragraph()
+        if line_words[0].x > CENTER_INDENT * scale:
+            p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        avg_h = sum([w.h for w in line_words]) / len(line_words)
+        is_header = avg_h > (median_height * 1.3)
+        for i, word in enumerate(line_words):
+            run = p.add_run(word.text if i == 0 else " " + word.text)
+            if is_header:
+                run.bold = True
+                run.font.size = Pt(14)
+            else:
+                run.font.size = Pt(11)
+                if word.bold: run.bold = True
+                if word.italic: run.italic = True
+        last_y_bottom = y + max([w.h for w in line_words])
+    return doc
+
+
+def build_with(builder):
+    def build(pages):
+        doc = new_document()
+        for number, (words, scale) in enumerate(pages):
+            if number:
+                doc.add_page_break()
+            builder(words, doc=doc, scale=scale)
+        return doc
+    return build
+
+
+def save(doc):
+    buffer = BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def write_direct(pages):
+    buffer = BytesIO()
+    write_docx((layout_words(words, scale=scale) for words, scale in pages), buffer)
+    return buffer.getvalue()
+
+
+def run_count(data):
+    with zipfile.ZipFile(BytesIO(data)) as package:
+        return len(RUN_PATTERN.findall(package.read('word/document.xml')))
+
+
+def paragraph_texts(data):
+    from docx import Document
+    return [p.text for p in Document(BytesIO(data)).paragraphs]
+
+
+def load_pages(page_counts):
+    # name -> [(words, scale)]
+    inputs = [(name, [(parse_hocr(hocr), read_scale(hocr))]) for name, hocr in sorted(load_hocr_fixtures().items())]
+    for count in page_counts:
+        pages = [(parse_hocr(synthetic_hocr(SYNTHETIC_WORDS, seed=seed)), 1.0) for seed in range(count)]
+        inputs.append((f"synthetic_{count}p", pages))
+    return inputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, nargs='+', default=[1, 10, 50])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    writers = [
+        ('per-word', build_with(legacy_words_to_docx)),
+        ('coalesced', build_with(lambda words, doc, scale: words_to_docx(words, doc=doc, scale=scale))),
+        ('direct', None),
+    ]
+    print(f"{'input':<22}{'words':>7}  {'writer':<11}{'build ms':>10}{'save ms':>10}{'KB':>8}{'runs':>8}")
+    for name, pages in load_pages(args.pages):
+        words = sum(len(w) for w, _ in pages)
+        reference = None
+        for writer, build in writers:
+            if build is None:
+                build_time = 0.0
+                save_time, data = best_of(write_direct, pages, repeat=args.repeat)
+            else:
+                build_time, doc = best_of(build, pages, repeat=args.repeat)
+                save_time, data = best_of(save, doc, repeat=args.repeat)
+            texts = paragraph_texts(data)
+            if reference is None:
+                reference = texts
+            assert texts == reference, f"{writer} output differs for {name}"
+            print(f"{name:<22}{words:>7}  {writer:<11}{build_time * 1000:>10.1f}{save_time * 1000:>10.1f}"
+                  f"{len(data) / 1024:>8.1f}{run_count(data):>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""Gemini batch throughput, retries and ordering against a local fake server.
+
+Usage: python benchmarks/bench_gemini_batch.py [--images 60] [--concurrency 1 4 8] [--error-rate 0.15]
+
+Every run uses fresh (uncached) images: the sample images cycled with a
+few pixels of border so each upload is distinct. Output is checked
+against the fake server's per-image hash to verify submission order.
+"""
+import argparse
+import hashlib
+import time
+
+from PIL import Image, ImageOps
+
+from common import sample_images
+
+from image2word import gemini_client
+from fake_gemini_server import FakeGemini
+from image2word.gemini_batch import convert_batch
+from image2word.gemini_payload import encode_image
+
+
+def make_images(count):
+    originals = [Image.open(path).convert('RGB') for path in sample_images()]
+    return [ImageOps.expand(originals[i % len(originals)], border=1 + i // len(originals), fill='white')
+            for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--images', type=int, default=60)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--latency-ms', type=float, default=300.0)
+    parser.add_argument('--error-rate', type=float, default=0.15)
+    parser.add_argument('--rpm', type=int, default=600, help="client-side requests per minute")
+    parser.add_argument('--tpm', type=int, default=2_000_000, help="client-side tokens per minute")
+    args = parser.parse_args()
+
+    images = make_images(args.images)
+    expected = [hashlib.sha1(encode_image(image).data).hexdigest()[:12] for image in images]
+
+    print(f"{'concurrency':>12}{'seconds':>9}{'img/s':>8}{'ok':>5}{'failed':>8}{'retries':>9}"
+          f"{'429s':>6}{'503s':>6}{'in flight':>11}{'order':>7}")
+    for concurrency in args.concurrency:
+        fake = FakeGemini(args.latency_ms / 1000, args.error_rate, seed=concurrency).start()
+        gemini_client.GEMINI_ENDPOINT = fake.url
+        start = time.perf_counter()
+        results = convert_batch(images, 'fake-key', 'gemini-2.5-flash', 'Extract the text.',
+                                concurrency=concurrency, rpm=args.rpm, tpm=args.tpm, use_cache=False)
+        seconds = time.perf_counter() - start
+        fake.stop()
+
+        ok = [r for r in results if r.ok]
+        in_order = all(r.index == i and (not r.ok or expected[i] in r.text) for i, r in enumerate(results))
+        print(f"{concurrency:>12}{seconds:>9.1f}{len(results) / seconds:>8.1f}{len(ok):>5}"
+              f"{len(results) - len(ok):>8}{sum(max(0, r.attempts - 1) for r in results):>9}"
+              f"{fake.stats['429']:>6}{fake.stats['503']:>6}{fake.stats['max_in_flight']:>11}"
+              f"{'ok' if in_order else 'WRONG':>7}")
+
+
+if __name__ == '__main__':
+    main()
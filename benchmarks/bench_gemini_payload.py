@@ -0,0 +1,122 @@
+"""Gemini upload size and round-trip time per image encoding.
+
+Usage: python benchmarks/bench_gemini_payload.py [--mbps 10] [--latency-ms 80]
+
+Requests go to a local stand-in endpoint that reads the body at ``--mbps``
+of uplink bandwidth and answers after ``--latency-ms``, so the numbers are
+repeatable and don't need an API key. "sdk-default" is what the SDK sends
+when it is handed the image as-is: the original file bytes for an opened
+file, a lossless WebP for an in-memory image.
+"""
+import argparse
+import base64
+import http.client
+import io
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from PIL import Image
+
+from common import sample_images
+
+from image2word.gemini_payload import EncodeOptions, encode_image
+
+SETTINGS = {
+    'jpeg-q80': EncodeOptions(),
+    'jpeg-q60': EncodeOptions(quality=60),
+    'jpeg-q90-colour': EncodeOptions(quality=90, grayscale=False),
+    'jpeg-q80-line36': EncodeOptions(target_line_height=36),
+    'webp-q80': EncodeOptions(image_format='WEBP'),
+    'webp-q60': EncodeOptions(image_format='WEBP', quality=60),
+}
+
+
+def make_handler(bytes_per_second, latency):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive, like the SDK's channel
+
+        def do_POST(self):
+            remaining = int(self.headers['Content-Length'])
+            start = time.perf_counter()
+            received = 0
+            while remaining:
+                chunk = self.rfile.read(min(65536, remaining))
+                remaining -= len(chunk)
+                received += len(chunk)
+                # Throttle to the simulated uplink
+                behind = received / bytes_per_second - (time.perf_counter() - start)
+                if behind > 0:
+                    time.sleep(behind)
+            time.sleep(latency)
+            body = b'{"candidates": [{"content": {"parts": [{"text": "ok"}]}}]}'
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def sdk_default(path):
+    image = Image.open(path)
+    if image.format in ('JPEG', 'PNG', 'WEBP'):
+        with open(path, 'rb') as f:
+            return f.read(), Image.MIME[image.format]
+    buffer = io.BytesIO()
+    image.save(buffer, format='WEBP', lossless=True)
+    return buffer.getvalue(), 'image/webp'
+
+
+def round_trip(connection, data, mime_type):
+    # Same JSON shape (base64 inline data) as a generateContent request
+    body = json.dumps({'contents': [{'parts': [
+        {'text': 'prompt'},
+        {'inline_data': {'mime_type': mime_type, 'data': base64.b64encode(data).decode('ascii')}},
+    ]}]}).encode()
+    start = time.perf_counter()
+    connection.request('POST', '/v1beta/models/stand-in:generateContent', body=body,
+                       headers={'Content-Type': 'application/json'})
+    connection.getresponse().read()
+    return len(body), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mbps', type=float, default=10.0, help="simulated uplink bandwidth (megabits/s)")
+    parser.add_argument('--latency-ms', type=float, default=80.0, help="simulated server processing latency")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(args.mbps * 1e6 / 8, args.latency_ms / 1000))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    connection = http.client.HTTPConnection('127.0.0.1', server.server_address[1])
+
+    print(f"{'image':<20}{'setting':<18}{'size':>11}{'payload KB':>12}{'request KB':>12}{'encode ms':>11}{'rtt ms':>9}")
+    for path in sample_images():
+        name = os.path.basename(path)
+        data, mime_type = sdk_default(path)
+        sent, rtt = round_trip(connection, data, mime_type)
+        size = '%dx%d' % Image.open(path).size
+        print(f"{name:<20}{'sdk-default':<18}{size:>11}{len(data) / 1024:>12.0f}{sent / 1024:>12.0f}{'-':>11}{rtt * 1000:>9.0f}")
+
+        for setting, options in SETTINGS.items():
+            start = time.perf_counter()
+            payload = encode_image(Image.open(path), options)
+            encode = time.perf_counter() - start
+            sent, rtt = round_trip(connection, payload.data, payload.mime_type)
+            size = '%dx%d' % payload.size
+            print(f"{name:<20}{setting:<18}{size:>11}{len(payload.data) / 1024:>12.0f}{sent / 1024:>12.0f}"
+                  f"{encode * 1000:>11.0f}{rtt * 1000:>9.0f}")
+
+    connection.close()
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
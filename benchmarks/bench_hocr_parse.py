@@ -0,0 +1,60 @@
+"""Benchmark the streaming hOCR parser against the old per-word regex parser.
+
+Usage: python benchmarks/bench_hocr_parse.py [--repeat N]
+"""
+import argparse
+import html
+import re
+
+from common import best_of, load_hocr_fixtures, synthetic_hocr
+
+from image2word.hocr_parser import parse_hocr
+
+
+def legacy_parse_hocr(hocr_string):
+    # The original parser from tesseract_app.py / ocr_tesseract_app.py
+    words = []
+    pattern = re.compile(r"<span class=['\"]ocrx_word['\"].*?title=['\"]bbox (\d+) (\d+) (\d+) (\d+).*?>(.*?)</span>", re.DOTALL)
+    matches = pattern.findall(hocr_string)
+
+    for match in matches:
+        x1, y1, x2, y2, content = match
+        x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
+
+        is_bold = bool(re.search(r"<strong>|<b>", content, re.IGNORECASE))
+        is_italic = bool(re.search(r"<em>|<i>", content, re.IGNORECASE))
+        clean_text = re.sub('<[^<]+?>', '', content).strip()
+
+        if clean_text:
+            words.append({'text': clean_text, 'x': x1, 'y': y1, 'h': y2-y1, 'bold': is_bold, 'italic': is_italic})
+    return words
+
+
+def check_same(legacy, words):
+    assert len(legacy) == len(words), (len(legacy), len(words))
+    for old, new in zip(legacy, words):
+        assert html.unescape(old['text']) == new.text
+        assert (old['x'], old['y'], old['h'], old['bold'], old['italic']) == \
+            (new.x, new.y, new.h, new.bold, new.italic)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    inputs = [(name, hocr) for name, hocr in sorted(load_hocr_fixtures().items())]
+    if not inputs:
+        print("(no recorded sample_images fixtures and no Tesseract; synthetic pages only)")
+    inputs += [(f"synthetic_{n}", synthetic_hocr(n)) for n in (500, 3000, 5000, 20000)]
+
+    print(f"{'input':<22}{'words':>8}{'regex ms':>12}{'stream ms':>12}{'speedup':>10}")
+    for name, hocr in inputs:
+        old_time, legacy = best_of(legacy_parse_hocr, hocr, repeat=args.repeat)
+        new_time, words = best_of(parse_hocr, hocr, repeat=args.repeat)
+        check_same(legacy, words)
+        print(f"{name:<22}{len(words):>8}{old_time * 1000:>12.2f}{new_time * 1000:>12.2f}{old_time / new_time:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""Cold-start import cost of every entry point and of the headless core.
+
+Usage: python benchmarks/bench_import_time.py [--repeat 5] [--baseline REV] [--stub-toolkits]
+
+Each target is imported in a fresh interpreter under ``python -X importtime``
+and the cumulative time of that import is reported (best of --repeat), with
+the heaviest third-party packages it pulled in. Anything imported lazily
+later, e.g. the Gemini SDK on the first request, is not counted.
+
+--baseline checks REV out into a temporary git worktree and measures the
+same targets there, to show the difference. --stub-toolkits replaces gradio
+and customtkinter with MagicMocks when they aren't installed, so the rest of
+an entry point's imports can still be measured (the toolkit itself is then
+missing from the numbers); otherwise such entry points are reported as
+unavailable.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+from common import ROOT
+
+ENTRY_POINTS = ['tesseract_app', 'ocr_tesseract_app', 'app', 'ocr_gemini_app']
+CORE = ['image2word', 'image2word.docx_builder', 'image2word.ocr_engine', 'image2word.gemini_client',
+        'image2word.gemini_batch']
+TOOLKITS = ['gradio', 'customtkinter']
+HEAVIEST = 4
+
+STUB_PRELUDE = f"""
+import importlib.util, sys
+from unittest import mock
+for name in {TOOLKITS!r}:
+    if importlib.util.find_spec(name) is None:
+        sys.modules[name] = mock.MagicMock()
+"""
+
+
+def parse_importtime(stderr):
+    # -> [(depth, name, self_us, cumulative_us)] in the order Python reports them
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((depth, name.strip(), int(own), int(cumulative)))
+    return rows
+
+
+def measure_once(root, module, stub):
+    code = (STUB_PRELUDE if stub else '') + f"\nimport {module}\n"
+    env = dict(os.environ, PYTHONPATH=root, PYTHONDONTWRITEBYTECODE='1')
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=root, env=env,
+                          capture_output=True, text=True)
+    if proc.returncode:
+        last = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit {proc.returncode}"
+        return None, last
+    rows = parse_importtime(proc.stderr)
+    # The target's own line comes after its dependencies, at depth 0
+    end = max((i for i, r in enumerate(rows) if r[1] == module and r[0] == 0), default=None)
+    if end is None:
+        return 0.0, []
+    start = end
+    while start > 0 and rows[start - 1][0] > 0:
+        start -= 1
+    # Self time per third-party package, over everything the target pulled in
+    skip = set(sys.stdlib_module_names) | set(ENTRY_POINTS) | {'image2word'}
+    packages = {}
+    for depth, name, own, cumulative in rows[start:end]:
+        base = name.split('.')[0]
+        if base not in skip and not base.startswith('_'):
+            packages[base] = packages.get(base, 0) + own
+    heaviest = sorted((item for item in packages.items() if item[1] >= 500), key=lambda item: -item[1])[:HEAVIEST]
+    return rows[end][3] / 1000, heaviest
+
+
+def measure(root, module, repeat, stub):
+    best, heaviest = None, []
+    for _ in range(repeat):
+        ms, detail = measure_once(root, module, stub)
+        if ms is None:
+            return None, detail
+        if best is None or ms < best:
+            best, heaviest = ms, detail
+    return best, heaviest
+
+
+def worktree(rev):
+    path = tempfile.mkdtemp(prefix='image2word_baseline_')
+    subprocess.run(['git', 'worktree', 'add', '--detach', path, rev], cwd=ROOT, check=True,
+                   capture_output=True)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--baseline', help="git revision to compare against, e.g. HEAD~1")
+    parser.add_argument('--stub-toolkits', action='store_true',
+                        help="mock gradio/customtkinter when they aren't installed")
+    parser.add_argument('modules', nargs='*', help="modules to measure (default: entry points and core)")
+    args = parser.parse_args()
+
+    targets = args.modules or ENTRY_POINTS + CORE
+    baseline = worktree(args.baseline) if args.baseline else None
+    try:
+        header = f"{'module':<28}{'ms':>9}"
+        if baseline:
+            header += f"{args.baseline:>12}{'change':>9}"
+        print(header + "  heaviest third-party imports (ms)")
+        for module in targets:
+            ms, heaviest = measure(ROOT, module, args.repeat, args.stub_toolkits)
+            if ms is None:
+                print(f"{module:<28}{'-':>9}  unavailable: {heaviest}")
+                continue
+            line = f"{module:<28}{ms:>9.1f}"
+            if baseline:
+                old, _ = measure(baseline, module, args.repeat, args.stub_toolkits)
+                if old is None:
+                    line += f"{'-':>12}{'':>9}"
+                else:
+                    line += f"{old:>12.1f}{(ms - old) / old:>+9.0%}"
+            print(line + "  " + ", ".join(f"{name} {us / 1000:.0f}" for name, us in heaviest))
+    finally:
+        if baseline:
+            subprocess.run(['git', 'worktree', 'remove', '--force', baseline], cwd=ROOT, capture_output=True)
+
+
+if __name__ == '__main__':
+    main()
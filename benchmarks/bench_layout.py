@@ -0,0 +1,78 @@
+"""Page layout time: per-line Python loops vs layout.layout_words on NumPy columns.
+
+Usage: python benchmarks/bench_layout.py [--words 300 3000 30000 100000] [--repeat 5]
+
+Both lay out the same parsed synthetic hOCR pages (see common.synthetic_hocr;
+large pages are simply very tall). The output is checked to be the same
+paragraphs, runs and headers. Centering is the one intended difference,
+the old fixed 90 px indent against the text-area test, so the number of
+centered lines is reported for each instead.
+"""
+import argparse
+
+from common import best_of, group_lines, load_hocr_fixtures, synthetic_hocr
+
+from image2word.hocr_parser import parse_hocr
+from image2word.layout import GAP_FACTOR, HEADER_FACTOR, LINE_TOLERANCE, Paragraph, Run, layout_words
+from image2word.preprocess import read_scale
+
+CENTER_INDENT = 90  # px; the old centering rule
+
+
+def legacy_layout_words(words_data, use_ocr_lines=False, scale=1.0):
+    # layout_words before the columnar rewrite: Python lists per line
+    lines = group_lines(words_data, tolerance=LINE_TOLERANCE * scale, use_ocr_lines=use_ocr_lines)
+    all_heights = [w.h for w in words_data]
+    median_height = sorted(all_heights)[len(all_heights)//2] if all_heights else 20
+    last_y_bottom = 0
+    paragraphs = []
+
+    for y, line_words in lines:
+        if last_y_bottom > 0 and y - last_y_bottom > median_height * GAP_FACTOR:
+            paragraphs.append(Paragraph())
+
+        avg_h = sum(w.h for w in line_words) / len(line_words)
+        paragraph = Paragraph(centered=line_words[0].x > CENTER_INDENT * scale,
+                              header=avg_h > median_height * HEADER_FACTOR)
+        if paragraph.header:
+            paragraph.runs.append(Run(" ".join(w.text for w in line_words)))
+        else:
+            runs = paragraph.runs
+            for i, word in enumerate(line_words):
+                text = word.text if i == 0 else " " + word.text
+                if runs and runs[-1].bold == word.bold and runs[-1].italic == word.italic:
+                    runs[-1].text += text
+                else:
+                    runs.append(Run(text, word.bold, word.italic))
+        paragraphs.append(paragraph)
+
+        last_y_bottom = y + max(w.h for w in line_words)
+    return paragraphs
+
+
+def without_alignment(paragraphs):
+    return [(p.runs, p.header) for p in paragraphs]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--words', type=int, nargs='+', default=[300, 3000, 30000, 100000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    inputs = [(name, parse_hocr(hocr), read_scale(hocr)) for name, hocr in sorted(load_hocr_fixtures().items())]
+    inputs += [(f"synthetic_{n}", parse_hocr(synthetic_hocr(n)), 1.0) for n in args.words]
+
+    print(f"{'input':<20}{'words':>8}{'lines':>7}{'legacy ms':>11}{'columnar ms':>13}{'speedup':>9}"
+          f"{'centered':>10}{'was':>6}")
+    for name, words, scale in inputs:
+        old_time, old = best_of(legacy_layout_words, words, False, scale, repeat=args.repeat)
+        new_time, new = best_of(layout_words, words, False, scale, repeat=args.repeat)
+        assert without_alignment(old) == without_alignment(new), name
+        lines = sum(1 for p in new if p.runs)
+        print(f"{name:<20}{len(words):>8}{lines:>7}{old_time * 1000:>11.2f}{new_time * 1000:>13.2f}"
+              f"{old_time / new_time:>8.1f}x{sum(p.centered for p in new):>10}{sum(p.centered for p in old):>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Benchmark line clustering: old per-word scan of every line vs cluster_ys (common.group_lines).
+
+Usage: python benchmarks/bench_line_clustering.py [--legacy-max N]
+"""
+import argparse
+import random
+
+from common import best_of, group_lines, load_hocr_fixtures
+
+from image2word.hocr_parser import Word, parse_hocr
+
+
+def legacy_group_lines(words_data):
+    # The apps' original grouping loop, before cluster_ys
+    lines = {}
+    for word in words_data:
+        y = word.y
+        found = False
+        for line_y in lines.keys():
+            if abs(line_y - y) < 12:
+                lines[line_y].append(word)
+                found = True
+                break
+        if not found: lines[y] = [word]
+    return [(y, sorted(lines[y], key=lambda k: k.x)) for y in sorted(lines.keys())]
+
+
+def synthetic_words(n_words, seed=0):
+    # Dense page: ~14 words per line, baseline jitter and irregular line
+    # spacing so some lines sit closer than the 12px tolerance.
+    rng = random.Random(seed)
+    words = []
+    y = 40
+    line = 0
+    while len(words) < n_words:
+        line += 1
+        x = 40 + rng.randint(0, 80)
+        for _ in range(min(14, n_words - len(words))):
+            top = y + rng.randint(-4, 4)
+            words.append(Word('word', x, top, x + 60, top + rng.randint(16, 24), line=line))
+            x += 70
+        y += rng.choice((9, 14, 22, 28, 30))
+    # Tesseract emits words block by block, not strictly top to bottom
+    chunks = [words[i:i + 200] for i in range(0, len(words), 200)]
+    rng.shuffle(chunks)
+    return [w for chunk in chunks for w in chunk]
+
+
+def same_grouping(a, b):
+    return [(y, [id(w) for w in ws]) for y, ws in a] == [(y, [id(w) for w in ws]) for y, ws in b]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--legacy-max', type=int, default=20000,
+                        help="skip the quadratic legacy loop above this many words")
+    args = parser.parse_args()
+
+    for name, hocr in sorted(load_hocr_fixtures().items()):
+        words = parse_hocr(hocr)
+        assert same_grouping(legacy_group_lines(words), group_lines(words)), name
+        print(f"{name}: identical grouping ({len(words)} words)")
+
+    print(f"{'words':>8}{'lines':>8}{'legacy ms':>12}{'sweep ms':>12}{'speedup':>10}")
+    for n in (100, 1000, 5000, 10000, 20000, 50000):
+        words = synthetic_words(n)
+        new_time, lines = best_of(group_lines, words, repeat=3)
+        if n <= args.legacy_max:
+            old_time, legacy = best_of(legacy_group_lines, words, repeat=1)
+            assert same_grouping(legacy, lines), n
+            old_ms, speedup = f"{old_time * 1000:.1f}", f"{old_time / new_time:.1f}x"
+        else:
+            old_ms, speedup = "skipped", "-"
+        print(f"{n:>8}{len(lines):>8}{old_ms:>12}{new_time * 1000:>12.1f}{speedup:>10}")
+
+
+if __name__ == '__main__':
+    main()
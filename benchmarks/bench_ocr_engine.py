@@ -0,0 +1,43 @@
+"""Per-image OCR latency of each available engine on sample_images.
+
+Usage: python benchmarks/bench_ocr_engine.py [--repeat N]
+
+Needs Tesseract installed; tesserocr is measured only if it is importable.
+"""
+import argparse
+import os
+
+from PIL import Image
+
+from common import best_of, sample_images
+
+from image2word.ocr_engine import ENGINES
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    engines = []
+    for name, engine_cls in ENGINES.items():
+        try:
+            engine = engine_cls()
+            engine.image_to_hocr(Image.new('L', (64, 32), 255))  # warm-up / availability check
+        except Exception as e:
+            print(f"{name}: unavailable ({e})")
+            continue
+        engines.append(engine)
+    if not engines:
+        return
+
+    print(f"{'image':<18}" + "".join(f"{e.name + ' ms':>18}" for e in engines))
+    for path in sample_images():
+        image = Image.open(path)
+        image.load()
+        times = [best_of(e.image_to_hocr, image, repeat=args.repeat)[0] for e in engines]
+        print(f"{os.path.basename(path):<18}" + "".join(f"{t * 1000:>18.1f}" for t in times))
+
+
+if __name__ == '__main__':
+    main()
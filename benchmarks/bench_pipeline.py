@@ -0,0 +1,233 @@
+"""Per-stage latency and peak memory of every app's post-OCR pipeline.
+
+Usage: python benchmarks/bench_pipeline.py [--scale 1 10 50] [--repeat 5] [--json out.json] [--compare old.json]
+
+Runs offline on seeded synthetic stand-ins for the sample images (hOCR
+and markdown), and --scale adds synthetic inputs that many times larger.
+--record OCRs the sample images with Tesseract (and, given
+GEMINI_API_KEY, Gemini) into benchmarks/fixtures/, which is not
+committed; later runs use those recordings in place of the stand-ins.
+
+Entry points (never launched):
+  tesseract_app       parse_hocr -> line_keys -> layout_words -> preview_html -> render_pages (docx + save)
+  ocr_tesseract_app   parse_hocr -> line_keys -> layout_words -> render_pages (docx + save)
+  app                 markdown_to_docx -> save
+  ocr_gemini_app      markdown_to_docx -> save
+The Tesseract apps' post-OCR path is image2word.convert (render_task and
+tesseract_job), timed without importing them. line_keys is timed on its
+own; layout_words repeats it per column. The Gemini apps are imported;
+one that needs a module that isn't installed is skipped, with a
+"skipped:" line in the output and in the JSON.
+
+Timings are the best of --repeat runs; peak memory is measured in a
+separate run under tracemalloc. --json writes every number plus the git
+commit, so two runs can be diffed with --compare.
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from io import BytesIO
+
+from common import (FIXTURE_DIR, ROOT, best_of, load_hocr_fixtures, load_markdown_fixtures, sample_images,
+                    synthetic_hocr, synthetic_markdown)
+
+from image2word.convert import render_pages
+from image2word.hocr_parser import parse_hocr
+from image2word.layout import LINE_TOLERANCE, WordColumns, layout_words, line_keys
+from image2word.preprocess import read_scale
+from image2word.render import preview_html
+
+SYNTHETIC_WORDS = 300  # per page, roughly a dense scan
+SYNTHETIC_LINES = 60
+
+
+def save_docx(doc):
+    buffer = BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def cluster_lines(parsed):
+    # Timed on its own; layout_words repeats it for every column
+    words, scale = parsed
+    line_keys(WordColumns(words), LINE_TOLERANCE * scale)
+    return parsed
+
+
+def preview(paragraphs):
+    preview_html(paragraphs)
+    return paragraphs
+
+
+def hocr_stages(with_preview):
+    stages = [
+        ('parse_hocr', lambda hocr: (parse_hocr(hocr), read_scale(hocr))),
+        ('line_keys', cluster_lines),
+        ('layout_words', lambda parsed: layout_words(parsed[0], scale=parsed[1])),
+    ]
+    if with_preview:
+        stages.append(('preview_html', preview))
+    stages.append(('render_pages', lambda paragraphs: render_pages([paragraphs], 'docx')))
+    return stages
+
+
+def markdown_stages(markdown_to_docx):
+    return [
+        ('markdown_to_docx', markdown_to_docx),
+        ('save', save_docx),
+    ]
+
+
+def load_entry_points():
+    # -> ({name: (input kind, stages)}, {skipped name: missing module});
+    # each stage feeds the next
+    entry_points = {
+        'tesseract_app': ('hocr', hocr_stages(with_preview=True)),
+        'ocr_tesseract_app': ('hocr', hocr_stages(with_preview=False)),
+    }
+    loaders = {
+        'app': lambda m: ('markdown', markdown_stages(m.markdown_to_docx)),
+        'ocr_gemini_app': lambda m: ('markdown', markdown_stages(
+            lambda text: m.TechyOCRApp.markdown_to_docx(None, text))),
+    }
+    skipped = {}
+    for name, loader in loaders.items():
+        try:
+            entry_points[name] = loader(importlib.import_module(name))
+        except ImportError as e:
+            skipped[name] = e.name or str(e)
+    return entry_points, skipped
+
+
+def load_inputs(scales, record):
+    api_key = os.getenv('GEMINI_API_KEY') if record else None
+    hocr = load_hocr_fixtures() if record else read_fixtures('.hocr')
+    markdown = load_markdown_fixtures(api_key) if record else read_fixtures('.md')
+    inputs = {'hocr': [], 'markdown': []}
+    for seed, path in enumerate(sample_images()):
+        name = os.path.splitext(os.path.basename(path))[0]
+        if name in hocr:
+            inputs['hocr'].append((name, 'recorded', hocr[name]))
+        else:
+            inputs['hocr'].append((name, 'synthetic', synthetic_hocr(SYNTHETIC_WORDS, seed=seed)))
+        if name in markdown:
+            inputs['markdown'].append((name, 'recorded', markdown[name]))
+        else:
+            inputs['markdown'].append((name, 'synthetic', synthetic_markdown(SYNTHETIC_LINES, seed=seed)))
+    for scale in scales:
+        if scale > 1:
+            inputs['hocr'].append((f"synthetic_x{scale}", 'synthetic', synthetic_hocr(SYNTHETIC_WORDS * scale)))
+            inputs['markdown'].append((f"synthetic_x{scale}", 'synthetic', synthetic_markdown(SYNTHETIC_LINES * scale)))
+    return inputs
+
+
+def read_fixtures(extension):
+    # Recorded fixtures only; never calls Tesseract or Gemini
+    fixtures = {}
+    if os.path.isdir(FIXTURE_DIR):
+        for name in os.listdir(FIXTURE_DIR):
+            if name.endswith(extension):
+                with open(os.path.join(FIXTURE_DIR, name), encoding='utf-8') as f:
+                    fixtures[name[:-len(extension)]] = f.read()
+    return fixtures
+
+
+def peak_memory(fn, arg):
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    fn(arg)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak - baseline
+
+
+def run_stages(stages, data, repeat):
+    rows = []
+    for stage, fn in stages:
+        seconds, result = best_of(fn, data, repeat=repeat)
+        rows.append({'stage': stage, 'ms': seconds * 1000, 'peak_kb': peak_memory(fn, data) / 1024})
+        data = result
+    return rows
+
+
+def input_size(kind, text):
+    return text.count("ocrx_word") if kind == 'hocr' else text.count('\n') + 1
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, old_path):
+    with open(old_path) as f:
+        old = {(r['entry_point'], r['input'], r['stage']): r for r in json.load(f)['results']}
+    print(f"\nvs {old_path}:")
+    print(f"{'entry point':<20}{'input':<20}{'stage':<18}{'old ms':>10}{'new ms':>10}{'change':>9}")
+    for r in results:
+        before = old.get((r['entry_point'], r['input'], r['stage']))
+        if before and before['ms'] > 0:
+            change = (r['ms'] - before['ms']) / before['ms'] * 100
+            print(f"{r['entry_point']:<20}{r['input']:<20}{r['stage']:<18}{before['ms']:>10.2f}{r['ms']:>10.2f}"
+                  f"{change:>+8.0f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=int, nargs='+', default=[1, 10, 50],
+                        help="synthetic inputs this many times a page's size (1 = none extra)")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--record', action='store_true', help="record missing fixtures (Tesseract / Gemini)")
+    parser.add_argument('--json', help="write machine-readable results to this file ('-' for stdout)")
+    parser.add_argument('--compare', help="JSON from an earlier run to diff against")
+    args = parser.parse_args()
+
+    entry_points, skipped = load_entry_points()
+    inputs = load_inputs(args.scale, args.record)
+
+    results = []
+    quiet = args.json == '-'
+    for name, module in skipped.items():
+        print(f"skipped: {module} not installed ({name})", file=sys.stderr if quiet else sys.stdout)
+    if not quiet:
+        print(f"{'entry point':<20}{'input':<20}{'source':<11}{'size':>7}  {'stage':<18}{'ms':>10}{'peak KB':>10}")
+    for entry_point, (kind, stages) in entry_points.items():
+        for name, source, text in inputs[kind]:
+            size = input_size(kind, text)
+            for row in run_stages(stages, text, args.repeat):
+                row.update(entry_point=entry_point, input=name, source=source, kind=kind, size=size)
+                results.append(row)
+                if not quiet:
+                    print(f"{entry_point:<20}{name:<20}{source:<11}{size:>7}  {row['stage']:<18}"
+                          f"{row['ms']:>10.2f}{row['peak_kb']:>10.0f}")
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': args.repeat,
+        'skipped': skipped,
+        'results': results,
+    }
+    if args.json == '-':
+        json.dump(report, sys.stdout, indent=1)
+    elif args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=1)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Pre-OCR normalization: stage timings, pixel reduction and end-to-end OCR time.
+
+Usage: python benchmarks/bench_preprocess.py [--upscale 4] [--repeat 3]
+
+Each sample image is also tested as an upscaled JPEG (a stand-in for a
+48MP phone photo). End to end is decode, preprocessing and OCR of the
+file, with preprocessing off ("raw") and with the default options
+("prep"); "steps" lists the transforms that ran. OCR timings need
+Tesseract; without it only the preprocessing side is reported.
+"""
+import argparse
+import os
+import tempfile
+
+from PIL import Image
+
+from common import best_of, sample_images
+
+from image2word.ocr_engine import get_engine
+from image2word.preprocess import DEFAULT_OPTIONS, PreprocessOptions, preprocess_file
+
+RAW = PreprocessOptions(enabled=False)
+
+
+def end_to_end(engine, options):
+    # What image_file_to_hocr does on a cache miss
+    def run(path):
+        return engine.image_to_hocr(preprocess_file(path, options).image)
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--upscale', type=int, default=4, help="linear factor for the large-photo variants")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    try:
+        engine = get_engine()
+        engine.image_to_hocr(Image.new('L', (64, 32), 255))
+    except Exception as e:
+        print(f"(OCR unavailable: {e}; reporting preprocessing only)")
+        engine = None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inputs = []
+        for path in sample_images():
+            inputs.append(path)
+            big_path = os.path.join(tmp, os.path.splitext(os.path.basename(path))[0] + f"_x{args.upscale}.jpg")
+            with Image.open(path) as img:
+                img.convert('RGB').resize((img.width * args.upscale, img.height * args.upscale)).save(big_path, quality=90)
+            inputs.append(big_path)
+
+        print(f"{'input':<24}{'MP in':>8}{'MP out':>8}{'prep ms':>9}  {'steps':<24}"
+              f"{'e2e raw ms':>12}{'e2e prep ms':>13}{'saved ms':>10}")
+        for path in inputs:
+            prep, result = best_of(preprocess_file, path, repeat=args.repeat)
+            w, h = result.stats['original_size']
+            steps = [step for step in ('deskew', 'binarize') if step in result.stats['timings']]
+            if result.image.size != (w, h):
+                steps.insert(0, 'resize')
+            steps = '+'.join(steps) or '-'
+            row = (f"{os.path.basename(path):<24}{w * h / 1e6:>8.1f}{result.image.width * result.image.height / 1e6:>8.1f}"
+                   f"{prep * 1000:>9.0f}  {steps:<24}")
+            if engine is not None:
+                raw, _ = best_of(end_to_end(engine, RAW), path, repeat=args.repeat)
+                processed, _ = best_of(end_to_end(engine, DEFAULT_OPTIONS), path, repeat=args.repeat)
+                row += f"{raw * 1000:>12.0f}{processed * 1000:>13.0f}{(raw - processed) * 1000:>10.0f}"
+            print(row)
+
+
+if __name__ == '__main__':
+    main()
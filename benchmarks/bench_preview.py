@@ -0,0 +1,100 @@
+"""Main-loop blocking of the desktop preview: one-shot insert vs TextPreview.
+
+Usage: python benchmarks/bench_preview.py [--pages 1 10 50] [--view-lines 40]
+
+Needs a display: the text widget has to be on screen for its view to count.
+For each synthetic document it reports how long the old one-shot render
+blocks the event loop, and for
+TextPreview the number of after() steps, the longest step (the budget is
+tk_preview.CHUNK_BUDGET, under one 16 ms frame), the time until the first
+screen is shown and how many lines end up materialized for a view of
+--view-lines lines.
+"""
+import argparse
+import time
+
+from common import synthetic_hocr
+
+from image2word.hocr_parser import parse_hocr
+from image2word.layout import layout_words
+from image2word.render import render_tk
+from image2word.tk_preview import TAG_STYLES, TextPreview
+
+SYNTHETIC_WORDS = 300  # per page, roughly a dense scan
+
+
+class TimedPreview(TextPreview):
+    def __init__(self, textbox):
+        super().__init__(textbox)
+        self.steps = []
+
+    def step(self):
+        start = time.perf_counter()
+        super().step()
+        self.steps.append(time.perf_counter() - start)
+
+
+def one_shot(root, textbox, pages):
+    for tag, style in TAG_STYLES.items():
+        textbox.tag_config(tag, **style)
+    textbox.delete("1.0", "end")
+    start = time.perf_counter()
+    for number, paragraphs in enumerate(pages):
+        if number:
+            textbox.insert("end", "\n")
+        render_tk(textbox, paragraphs)
+    root.update_idletasks()
+    return time.perf_counter() - start
+
+
+def chunked(root, textbox, pages):
+    preview = TimedPreview(textbox)
+    preview.clear()
+    start = time.perf_counter()
+    for number, paragraphs in enumerate(pages):
+        preview.append(paragraphs, page_break=number > 0)
+    first_screen = None
+    while preview.job is not None:
+        root.update()
+        if first_screen is None and preview.steps:
+            first_screen = time.perf_counter() - start
+    return preview, first_screen or 0.0
+
+
+def main():
+    import tkinter as tk
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, nargs='+', default=[1, 10, 50])
+    parser.add_argument('--view-lines', type=int, default=40)
+    args = parser.parse_args()
+
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"skipped: no display ({e})")
+        return
+    print(f"{'pages':>6}{'words':>8}  {'one-shot ms':>12}{'steps':>7}{'max step ms':>13}"
+          f"{'first screen ms':>17}{'lines':>8}{'of':>8}")
+    for count in args.pages:
+        pages = [layout_words(parse_hocr(synthetic_hocr(SYNTHETIC_WORDS, seed=seed))) for seed in range(count)]
+        words = count * SYNTHETIC_WORDS
+        textbox = tk.Text(root, height=args.view_lines, width=80, wrap="word")
+        textbox.pack()
+        blocking = one_shot(root, textbox, pages)
+        total_lines = int(textbox.index("end-1c").split(".")[0])
+        textbox.destroy()
+
+        textbox = tk.Text(root, height=args.view_lines, width=80, wrap="word")
+        textbox.pack()
+        root.update()
+        preview, first_screen = chunked(root, textbox, pages)
+        print(f"{count:>6}{words:>8}  {blocking * 1000:>12.1f}{len(preview.steps):>7}"
+              f"{max(preview.steps, default=0) * 1000:>13.1f}{first_screen * 1000:>17.1f}"
+              f"{preview.lines:>8}{total_lines:>8}")
+        textbox.destroy()
+    root.destroy()
+
+
+if __name__ == '__main__':
+    main()
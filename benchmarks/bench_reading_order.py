@@ -0,0 +1,96 @@
+"""Layout time, with reading order and column detection, as a fraction of OCR time.
+
+Usage: python benchmarks/bench_reading_order.py [--words 1000 3000 10000 30000] [--columns 1 2 3]
+                                                [--budget 0.01] [--ocr-words-per-second N] [--repeat 3]
+
+Lays out synthetic pages of 1..N text columns (see
+common.synthetic_columns_hocr), checks that every word comes out in
+reading order (title, each column top to bottom, footer), and compares
+the layout time with the time Tesseract takes to recognize that many
+words. The OCR rate is measured on sample_images with the first
+available engine, or taken from --ocr-words-per-second when there is
+none. Exits with status 1 if any page's layout takes more than --budget
+of its OCR time.
+"""
+import argparse
+import sys
+
+from PIL import Image
+
+from common import best_of, sample_images, synthetic_columns_hocr
+
+from image2word.hocr_parser import parse_hocr
+from image2word.layout import WordColumns, layout_words
+from image2word.ocr_engine import ENGINES
+from image2word.reading_order import reading_order
+
+DEFAULT_OCR_WORDS_PER_SECOND = 300  # Tesseract LSTM on one core, dense printed text
+
+
+def measure_ocr_rate():
+    # Words per second of the first engine that works, or None
+    for engine_cls in ENGINES.values():
+        try:
+            engine = engine_cls()
+            engine.image_to_hocr(Image.new('L', (64, 32), 255))
+        except Exception:
+            continue
+        seconds = words = 0
+        for path in sample_images():
+            image = Image.open(path)
+            image.load()
+            time, hocr = best_of(engine.image_to_hocr, image, repeat=1)
+            seconds += time
+            words += len(parse_hocr(hocr))
+        if words:
+            return words / seconds, engine.name
+    return None, None
+
+
+def in_reading_order(words, paragraphs):
+    return ' '.join(p.text for p in paragraphs if p.runs).split() == [w.text for w in words]
+
+
+def order_only(words):
+    columns = WordColumns(words)
+    heights = sorted((columns.y2 - columns.y).tolist())
+    return reading_order(columns.x, columns.y, columns.x2, columns.y2, heights[len(heights) // 2])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--words', type=int, nargs='+', default=[1000, 3000, 10000, 30000])
+    parser.add_argument('--columns', type=int, nargs='+', default=[1, 2, 3])
+    parser.add_argument('--budget', type=float, default=0.01, help="largest allowed layout / OCR time")
+    parser.add_argument('--ocr-words-per-second', type=float,
+                        help="OCR rate to compare with (default: measured, else %d)" % DEFAULT_OCR_WORDS_PER_SECOND)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rate, source = args.ocr_words_per_second, 'given'
+    if rate is None:
+        rate, source = measure_ocr_rate()
+    if rate is None:
+        rate, source = DEFAULT_OCR_WORDS_PER_SECOND, 'assumed, no OCR engine available'
+    print(f"OCR rate: {rate:.0f} words/s ({source}); budget: layout <= {args.budget:.1%} of OCR time\n")
+
+    print(f"{'columns':>8}{'words':>8}{'blocks':>8}{'order ms':>10}{'layout ms':>11}{'OCR ms':>10}"
+          f"{'share':>8}{'in order':>10}")
+    failed = False
+    for columns in args.columns:
+        for n in args.words:
+            words = parse_hocr(synthetic_columns_hocr(n, columns, seed=n))
+            order_time, blocks = best_of(order_only, words, repeat=args.repeat)
+            layout_time, paragraphs = best_of(layout_words, words, repeat=args.repeat)
+            ocr_time = len(words) / rate
+            share = layout_time / ocr_time
+            ordered = in_reading_order(words, paragraphs)
+            failed |= share > args.budget or not ordered
+            print(f"{columns:>8}{len(words):>8}{len(blocks):>8}{order_time * 1000:>10.2f}{layout_time * 1000:>11.2f}"
+                  f"{ocr_time * 1000:>10.0f}{share:>8.2%}{'yes' if ordered else 'NO':>10}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
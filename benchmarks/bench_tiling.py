@@ -0,0 +1,66 @@
+"""Wall-clock speedup of tiled OCR on a large page, by worker count.
+
+Usage: python benchmarks/bench_tiling.py [--workers 1 2 4 8]
+
+The test page is the sample images stacked, cut to A3 and upscaled to an
+A3 scan at 600dpi (7016x9921). Needs Tesseract. Set OMP_THREAD_LIMIT=1
+for a fair comparison, otherwise the single-band run also uses several
+cores.
+"""
+import argparse
+import os
+import time
+
+from PIL import Image
+
+from common import sample_images
+
+from image2word.hocr_parser import parse_hocr
+from image2word.ocr_engine import get_engine
+from image2word.tiling import tiled_image_to_hocr
+
+
+A3_600DPI = (7016, 9921)
+
+
+def a3_page():
+    # The samples stacked top to bottom, cut (or padded) to A3's aspect ratio
+    # before upscaling, which keeps the page under PIL's decompression bomb limit
+    pages = [Image.open(path).convert('L') for path in sample_images() if path.lower().endswith('.jpeg')]
+    width = max(p.width for p in pages)
+    height = round(width * A3_600DPI[1] / A3_600DPI[0])
+    sheet = Image.new('L', (width, height), 255)
+    top = 0
+    for page in pages:
+        if top >= height:
+            break
+        sheet.paste(page, (0, top))
+        top += page.height
+    return sheet.resize(A3_600DPI)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    engine = get_engine()
+    page = a3_page()
+    print(f"page {page.width}x{page.height} ({page.width * page.height / 1e6:.0f}MP), engine {engine.name}")
+
+    start = time.perf_counter()
+    baseline_words = len(parse_hocr(engine.image_to_hocr(page)))
+    baseline = time.perf_counter() - start
+    print(f"{'workers':>8}{'seconds':>10}{'speedup':>10}{'words':>8}")
+    print(f"{'untiled':>8}{baseline:>10.2f}{1.0:>9.1f}x{baseline_words:>8}")
+
+    for workers in args.workers:
+        start = time.perf_counter()
+        words = len(parse_hocr(tiled_image_to_hocr(engine, page, workers)))
+        elapsed = time.perf_counter() - start
+        print(f"{workers:>8}{elapsed:>10.2f}{baseline / elapsed:>9.1f}x{words:>8}")
+
+
+if __name__ == '__main__':
+    main()
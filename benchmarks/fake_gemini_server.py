@@ -0,0 +1,154 @@
+"""Local stand-in for the Gemini generateContent REST endpoint.
+
+Usage: python benchmarks/fake_gemini_server.py [--port 8765] [--latency-ms 800] [--error-rate 0.1] [--rpm-limit 0]
+
+Point the apps at it with IMAGE2WORD_GEMINI_ENDPOINT=http://127.0.0.1:8765.
+Every response is "# image <sha1 of the uploaded bytes>" so callers can
+check which answer belongs to which image; streamGenerateContent sends it
+line by line. Latency is jittered +-50%;
+``--error-rate`` of the requests get a 429 (and a few a 503), and with
+``--rpm-limit`` requests beyond that many in the last minute get a 429.
+"""
+import argparse
+import base64
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def response_json(text):
+    return {
+        'candidates': [{'content': {'parts': [{'text': text}], 'role': 'model'}, 'finishReason': 1}],
+        'usageMetadata': {'promptTokenCount': 400, 'candidatesTokenCount': 20, 'totalTokenCount': 420},
+    }
+
+
+class FakeGemini:
+    def __init__(self, latency=0.8, error_rate=0.0, rpm_limit=0, port=0, seed=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rpm_limit = rpm_limit
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.recent = deque()
+        self.stats = {'requests': 0, 'ok': 0, '429': 0, '503': 0, 'max_in_flight': 0}
+        self.in_flight = 0
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self.server.daemon_threads = True
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _decide(self):
+        # Status code for the next request
+        now = time.monotonic()
+        with self.lock:
+            self.stats['requests'] += 1
+            while self.recent and now - self.recent[0] > 60:
+                self.recent.popleft()
+            if self.rpm_limit and len(self.recent) >= self.rpm_limit:
+                status = 429
+            else:
+                roll = self.rng.random()
+                status = 429 if roll < self.error_rate else 503 if roll < self.error_rate * 1.2 else 200
+            if status == 200:
+                self.recent.append(now)
+            self.stats['ok' if status == 200 else str(status)] += 1
+            latency = self.latency * self.rng.uniform(0.5, 1.5)
+        return status, latency
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                with fake.lock:
+                    fake.in_flight += 1
+                    fake.stats['max_in_flight'] = max(fake.stats['max_in_flight'], fake.in_flight)
+                try:
+                    status, latency = fake._decide()
+                    if status != 200:
+                        time.sleep(latency / 10)
+                        name = 'RESOURCE_EXHAUSTED' if status == 429 else 'UNAVAILABLE'
+                        self._reply(status, {'error': {'code': status, 'message': 'fake quota', 'status': name}})
+                        return
+                    data = b''
+                    for part in request['contents'][-1]['parts']:
+                        inline = part.get('inlineData') or part.get('inline_data')
+                        if inline:
+                            data = base64.b64decode(inline['data'])
+                    text = f"# image {hashlib.sha1(data).hexdigest()[:12]}\nFake **markdown** for {len(data)} bytes."
+                    if ':streamGenerateContent' in self.path:
+                        self._stream(text.splitlines(keepends=True), latency)
+                        return
+                    time.sleep(latency)
+                    self._reply(200, response_json(text))
+                finally:
+                    with fake.lock:
+                        fake.in_flight -= 1
+
+            def _stream(self, pieces, latency):
+                # JSON array sent element by element (what the REST transport parses)
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                for i, piece in enumerate(pieces):
+                    time.sleep(latency / len(pieces))
+                    element = ('[' if i == 0 else ',') + json.dumps(response_json(piece))
+                    if i == len(pieces) - 1:
+                        element += ']'
+                    chunk = element.encode()
+                    self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+                    self.wfile.flush()
+                self.wfile.write(b'0\r\n\r\n')
+
+            def _reply(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=800.0)
+    parser.add_argument('--error-rate', type=float, default=0.1)
+    parser.add_argument('--rpm-limit', type=int, default=0)
+    args = parser.parse_args()
+
+    fake = FakeGemini(args.latency_ms / 1000, args.error_rate, args.rpm_limit, args.port)
+    print(f"Fake Gemini listening on {fake.url} (Ctrl+C to stop)")
+    try:
+        fake.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(fake.stats)
+
+
+if __name__ == '__main__':
+    main()
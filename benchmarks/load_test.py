@@ -0,0 +1,113 @@
+"""Latency and throughput of a running Gradio server under concurrent load.
+
+Usage: python benchmarks/load_test.py [--url http://127.0.0.1:7860] [--app tesseract|gemini]
+                                      [--concurrency 1 2 4 8 16 32] [--rounds 4]
+
+Start the server first (python tesseract_app.py, or python app.py with
+IMAGE2WORD_GEMINI_ENDPOINT pointing at benchmarks/fake_gemini_server.py).
+At each concurrency level, that many clients each send --rounds
+single-image conversions back to back. Every upload is a distinct image
+(a sample image with a few pixels of border), so the OCR cache never
+answers. Reported per level: completed, rejected ("server busy") and
+failed requests, p50/p99 latency of the completed ones, p50 of the
+rejections and completed conversions per second. Needs gradio_client
+(installed with gradio).
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from PIL import Image, ImageOps
+
+from common import sample_images
+
+API_NAME = '/process_image'
+
+
+def percentile(values, fraction):
+    # Nearest rank; None for no values
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, round(fraction * len(values)) - 1))]
+
+
+def make_uploads(first, count, directory):
+    # Upload files first .. first + count - 1, each one different from all others
+    originals = [Image.open(path).convert('RGB') for path in sample_images()]
+    paths = []
+    for i in range(first, first + count):
+        image = ImageOps.expand(originals[i % len(originals)], border=1 + i // len(originals), fill='white')
+        path = os.path.join(directory, f"upload_{i}.png")
+        image.save(path)
+        paths.append(path)
+    return paths
+
+
+def run_level(url, app, api_key, concurrency, uploads):
+    from gradio_client import Client, handle_file
+
+    clients = [Client(url, verbose=False) for _ in range(concurrency)]
+    work = [uploads[i::concurrency] for i in range(concurrency)]
+    latencies, rejections, failures = [], [], []
+    lock = threading.Lock()
+
+    def client_loop(client, paths):
+        for path in paths:
+            args = (handle_file(path),) if app == 'tesseract' else (handle_file(path), api_key)
+            start = time.perf_counter()
+            try:
+                outputs = client.predict(*args, api_name=API_NAME)
+            except Exception as e:
+                # A full line is a gr.Error, which the client raises
+                seconds = time.perf_counter() - start
+                with lock:
+                    (rejections if 'busy' in str(e).lower() else failures).append(seconds)
+                continue
+            seconds = time.perf_counter() - start
+            # Conversion errors come back as text, without a file
+            document = outputs[0] if app == 'tesseract' else outputs[1]
+            with lock:
+                (latencies if document else failures).append(seconds)
+
+    threads = [threading.Thread(target=client_loop, args=(client, paths)) for client, paths in zip(clients, work)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, rejections, failures, time.perf_counter() - start
+
+
+def ms(value):
+    return '-' if value is None else f"{value * 1000:.0f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:7860')
+    parser.add_argument('--app', choices=('tesseract', 'gemini'), default='tesseract')
+    parser.add_argument('--api-key', default=os.getenv('GEMINI_API_KEY', 'load-test'),
+                        help="sent to the Gemini app (any value works against the fake server)")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument('--rounds', type=int, default=4, help="requests per client at each level")
+    args = parser.parse_args()
+
+    print(f"{'clients':>8}{'ok':>6}{'busy':>6}{'failed':>8}{'p50 ms':>9}{'p99 ms':>9}"
+          f"{'busy p50 ms':>13}{'conv/s':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        uploaded = 0
+        for concurrency in args.concurrency:
+            count = concurrency * args.rounds
+            uploads = make_uploads(uploaded, count, directory)
+            uploaded += count
+            latencies, rejections, failures, wall = run_level(args.url, args.app, args.api_key, concurrency, uploads)
+            print(f"{concurrency:>8}{len(latencies):>6}{len(rejections):>6}{len(failures):>8}"
+                  f"{ms(percentile(latencies, 0.5)):>9}{ms(percentile(latencies, 0.99)):>9}"
+                  f"{ms(percentile(rejections, 0.5)):>13}{len(latencies) / wall:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+"""GUI-free OCR, layout and document core shared by the Image2Word front ends.
+
+Importing the package is cheap: submodules (and their heavy dependencies
+such as NumPy, python-docx, PyMuPDF, tesserocr or the Gemini SDK) are only
+loaded when one of the names below is first used.
+"""
+import importlib
+
+_EXPORTS = {
+    'parse_hocr': 'hocr_parser',
+    'get_engine': 'ocr_engine',
+    'image_file_to_hocr': 'ocr_engine',
+    'page_to_hocr': 'ocr_engine',
+    'count_pages': 'page_source',
+    'iter_pages': 'page_source',
+    'read_scale': 'preprocess',
+    'words_to_docx': 'docx_builder',
+    'markdown_to_docx': 'docx_builder',
+    'generate_markdown': 'gemini_client',
+    'stream_markdown': 'gemini_client',
+    'convert_batch': 'gemini_batch',
+    'Trace': 'tracing',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{module}', __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,244 @@
+"""Convert images and documents to Word, markdown or HTML without a GUI.
+
+Usage: python -m image2word [options] INPUT [INPUT ...]
+
+INPUTs are files, glob patterns or directories (scanned for supported
+images and PDF/TIFF documents; add -r to include subdirectories). Each
+input becomes one output file next to it, or under --output-dir. Inputs
+whose output is newer than the input are skipped unless --force is given.
+
+Progress is written to stdout as JSON lines, one object per event:
+  {"event": "start", "files": 12, "engine": "tesseract", "format": "docx", "jobs": 4}
+  {"event": "skip", "input": "a.png", "output": "a.docx", "reason": "up to date"}
+  {"event": "done", "input": "b.pdf", "output": "b.docx", "pages": 3, "seconds": 2.41,
+   "stages": {"decode": 0.12, "ocr": 2.05, ...}}
+  {"event": "error", "input": "c.png", "error": "..."}
+  {"event": "summary", "done": 10, "skipped": 1, "failed": 1, "seconds": 8.7}
+The exit status is 1 if any file failed.
+"""
+import argparse
+import asyncio
+import glob
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .convert import (DOCX_WRITERS, GEMINI_MODEL, GEMINI_PROMPT, INPUT_EXTENSIONS, OUTPUT_FORMATS, gemini_pages,
+                      is_document, is_up_to_date, output_path, render_pages, task_error, tesseract_pages, write_atomic)
+from .page_source import iter_pages
+from .tracing import Trace
+
+DEFAULT_JOBS = os.cpu_count() or 1
+
+
+class Progress:
+    """JSON-lines event writer, safe to call from any thread."""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.lock = threading.Lock()
+        self.counts = {'done': 0, 'skip': 0, 'error': 0}
+
+    def emit(self, event, **fields):
+        with self.lock:
+            if event in self.counts:
+                self.counts[event] += 1
+            self.stream.write(json.dumps({'event': event, **fields}) + '\n')
+            self.stream.flush()
+
+
+def expand_inputs(patterns, recursive=False):
+    """Resolve files, globs and directories to [(path, name relative to its argument)]."""
+    found = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, dirs, files in os.walk(pattern):
+                if not recursive:
+                    dirs.clear()
+                dirs.sort()
+                for name in sorted(files):
+                    if name.lower().endswith(INPUT_EXTENSIONS):
+                        path = os.path.join(root, name)
+                        found.append((path, os.path.relpath(path, pattern)))
+        elif glob.has_magic(pattern):
+            found.extend((path, os.path.basename(path)) for path in sorted(glob.glob(pattern, recursive=True))
+                         if os.path.isfile(path) and path.lower().endswith(INPUT_EXTENSIONS))
+        else:
+            found.append((pattern, os.path.basename(pattern)))
+    seen = set()
+    unique = []
+    for path, relative in found:
+        key = os.path.abspath(path)
+        if key not in seen:
+            seen.add(key)
+            unique.append((path, relative))
+    return unique
+
+
+def plan(inputs, fmt, output_dir, force, progress):
+    # -> [(path, output)] still to convert; reports skips and clashes
+    todo = []
+    claimed = {}
+    for path, relative in inputs:
+        output = output_path(path, fmt, output_dir, relative)
+        other = claimed.setdefault(os.path.abspath(output), path)
+        if other != path:
+            progress.emit('error', input=path, error=f"output {output} is already written by {other}")
+        elif not os.path.isfile(path):
+            progress.emit('error', input=path, error="no such file")
+        elif not force and is_up_to_date(path, output):
+            progress.emit('skip', input=path, output=output, reason="up to date")
+        else:
+            todo.append((path, output))
+    return todo
+
+
+def convert_tesseract(path, output, fmt, tile_workers, docx_writer, use_ocr_lines):
+    # Runs in a worker process; returns what the 'done' event reports
+    start = time.perf_counter()
+    trace = Trace('cli', 'tesseract')
+    try:
+        with trace.active():
+            pages = tesseract_pages(path, tile_workers, use_ocr_lines=use_ocr_lines)
+            write_atomic(output, render_pages(pages, fmt, docx_writer))
+    except Exception as e:
+        trace.finish(ok=False)
+        raise task_error(e) from None
+    trace.finish()
+    return len(pages), time.perf_counter() - start, trace.durations
+
+
+def write_gemini(texts, output, fmt, trace):
+    # Executor thread: lay out, render and save the markdown of every page
+    with trace.active():
+        write_atomic(output, render_pages(gemini_pages(texts), fmt, docx_writer='python-docx'))
+
+
+def run_tesseract(todo, fmt, jobs, docx_writer, use_ocr_lines, progress):
+    # The pool already keeps every core busy, so big pages aren't tiled
+    tile_workers = 1 if jobs > 1 else DEFAULT_JOBS
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(convert_tesseract, path, output, fmt, tile_workers, docx_writer, use_ocr_lines):
+                   (path, output) for path, output in todo}
+        for future in as_completed(futures):
+            path, output = futures[future]
+            try:
+                pages, seconds, durations = future.result()
+            except Exception as e:
+                progress.emit('error', input=path, error=str(e))
+                continue
+            progress.emit('done', input=path, output=output, pages=pages, seconds=round(seconds, 3),
+                          stages={name: round(seconds, 4) for name, seconds in durations.items()})
+
+
+async def convert_gemini(batch, path, output, fmt, files):
+    # Pages go to Gemini one at a time; ``files`` bounds how many files are open at once
+    loop = asyncio.get_running_loop()
+    async with files:
+        start = time.perf_counter()
+        texts = []
+        durations = {}
+        if is_document(path):
+            pages = iter_pages(path)
+            while True:
+                page = await loop.run_in_executor(None, next, pages, None)
+                if page is None:
+                    break
+                texts.append(await batch.convert(page, index=len(texts)))
+        else:
+            texts.append(await batch.convert(path))
+        for result in texts:
+            if not result.ok:
+                raise RuntimeError(f"page {result.index + 1}: {result.error}")
+        trace = Trace('cli', 'gemini')
+        await loop.run_in_executor(None, write_gemini, [r.text for r in texts], output, fmt, trace)
+        trace.finish()
+        for result in texts:
+            for name, seconds in result.durations.items():
+                durations[name] = durations.get(name, 0.0) + seconds
+        for name, seconds in trace.durations.items():
+            durations[name] = durations.get(name, 0.0) + seconds
+        return len(texts), time.perf_counter() - start, durations
+
+
+async def run_gemini(todo, fmt, jobs, args, progress):
+    from .gemini_batch import GeminiBatch
+
+    files = asyncio.Semaphore(jobs)
+    async with GeminiBatch(args.api_key, args.model, args.prompt, concurrency=jobs,
+                           rpm=args.rpm, tpm=args.tpm) as batch:
+        async def one(path, output):
+            try:
+                pages, seconds, durations = await convert_gemini(batch, path, output, fmt, files)
+            except Exception as e:
+                progress.emit('error', input=path, error=str(e))
+                return
+            progress.emit('done', input=path, output=output, pages=pages, seconds=round(seconds, 3),
+                          stages={name: round(value, 4) for name, value in durations.items()})
+
+        await asyncio.gather(*(one(path, output) for path, output in todo))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='image2word', description=__doc__.splitlines()[0],
+                                     epilog="Progress events are JSON lines on stdout; logs go to stderr.")
+    parser.add_argument('inputs', nargs='+', metavar='INPUT', help="files, glob patterns or directories")
+    parser.add_argument('--engine', choices=('tesseract', 'gemini'), default='tesseract')
+    parser.add_argument('--format', choices=sorted(OUTPUT_FORMATS), default='docx', dest='fmt')
+    parser.add_argument('-o', '--output-dir', help="write outputs here instead of next to each input")
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help=f"files converted at once (default: {DEFAULT_JOBS} for tesseract, 4 for gemini)")
+    parser.add_argument('--docx-writer', choices=DOCX_WRITERS, default='auto',
+                        help="tesseract docx output: python-docx, or the faster direct writer (auto: for big documents)")
+    parser.add_argument('--ocr-lines', action='store_true',
+                        help="tesseract: keep the lines Tesseract found instead of grouping words by height")
+    parser.add_argument('-r', '--recursive', action='store_true', help="include subdirectories of directory inputs")
+    parser.add_argument('-f', '--force', action='store_true', help="convert even if the output is up to date")
+    parser.add_argument('-v', '--verbose', action='store_true', help="log progress details to stderr")
+    gemini = parser.add_argument_group('gemini')
+    gemini.add_argument('--api-key', default=os.getenv('GEMINI_API_KEY'), help="default: $GEMINI_API_KEY")
+    gemini.add_argument('--model', default=GEMINI_MODEL)
+    gemini.add_argument('--prompt', default=GEMINI_PROMPT)
+    gemini.add_argument('--rpm', type=int, default=None, help="requests per minute allowed by your quota")
+    gemini.add_argument('--tpm', type=int, default=None, help="tokens per minute allowed by your quota")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, stream=sys.stderr,
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if args.engine == 'gemini':
+        from .gemini_batch import DEFAULT_CONCURRENCY, DEFAULT_RPM, DEFAULT_TPM
+        if not args.api_key:
+            parser.error("the gemini engine needs --api-key or GEMINI_API_KEY")
+        args.rpm = args.rpm or DEFAULT_RPM
+        args.tpm = args.tpm or DEFAULT_TPM
+        jobs = args.jobs or DEFAULT_CONCURRENCY
+    else:
+        jobs = args.jobs or DEFAULT_JOBS
+    if jobs < 1:
+        parser.error("--jobs must be at least 1")
+
+    inputs = expand_inputs(args.inputs, args.recursive)
+    if not inputs:
+        parser.error("no input files found")
+
+    progress = Progress()
+    start = time.perf_counter()
+    progress.emit('start', files=len(inputs), engine=args.engine, format=args.fmt, jobs=jobs)
+    todo = plan(inputs, args.fmt, args.output_dir, args.force, progress)
+    if todo:
+        if args.engine == 'gemini':
+            asyncio.run(run_gemini(todo, args.fmt, jobs, args, progress))
+        else:
+            run_tesseract(todo, args.fmt, min(jobs, len(todo)), args.docx_writer, args.ocr_lines, progress)
+    counts = progress.counts
+    progress.emit('summary', done=counts['done'], skipped=counts['skip'], failed=counts['error'],
+                  seconds=round(time.perf_counter() - start, 3))
+    return 1 if counts['error'] else 0
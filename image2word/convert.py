@@ -0,0 +1,181 @@
+import os
+import tempfile
+from io import BytesIO
+
+from .docx_builder import new_document, render_docx
+from .docx_writer import write_docx
+from .hocr_parser import parse_hocr
+from .layout import layout_markdown, layout_words
+from .page_source import DOCUMENT_EXTENSIONS, IMAGE_EXTENSIONS, count_pages, get_page, iter_pages
+from .preprocess import read_scale
+from .render import render_html, render_markdown
+from .tracing import Trace, stage
+
+# Whole-file conversion for headless use (the command-line converter, the
+# desktop job queue and the Tesseract server's process pool).
+#
+# A file is laid out once into a list of pages (layout.py), from hOCR words
+# for the Tesseract engine or markdown for Gemini, and the pages are
+# rendered to one of OUTPUT_FORMATS with the same renderers the apps use.
+
+OUTPUT_FORMATS = {'docx': '.docx', 'md': '.md', 'html': '.html'}
+DOCX_WRITERS = ('auto', 'python-docx', 'direct')
+# Documents with at least this many paragraphs (lines) skip python-docx (see docx_writer.py)
+DIRECT_WRITER_PARAGRAPHS = 500
+INPUT_EXTENSIONS = IMAGE_EXTENSIONS + DOCUMENT_EXTENSIONS
+
+GEMINI_MODEL = 'gemini-2.5-flash'
+GEMINI_PROMPT = (
+    "Extract the text from this image. Return the content in Markdown format. "
+    "Use headers (#) for big text, bold (**) for bold text. "
+    "Do not include markdown code block fences (like ```markdown). "
+    "Just return the raw text."
+)
+
+
+def is_document(path):
+    return os.path.splitext(path)[1].lower() in DOCUMENT_EXTENSIONS
+
+
+def tesseract_pages(path, tile_workers, on_page=None, use_ocr_lines=False):
+    # -> one laid-out page (list of Paragraphs) per page of ``path``;
+    # on_page(done, total, paragraphs) is called as each page is finished;
+    # use_ocr_lines: take lines from Tesseract instead of clustering word tops
+    from .ocr_engine import image_file_to_hocr, page_to_hocr
+
+    if is_document(path):
+        total = count_pages(path) if on_page else None
+        hocrs = (page_to_hocr(page, tile_workers=tile_workers) for page in iter_pages(path))
+    else:
+        total = 1
+        hocrs = [image_file_to_hocr(path, tile_workers=tile_workers)]
+    pages = []
+    for hocr in hocrs:
+        with stage('parse'):
+            words = parse_hocr(hocr)
+        pages.append(layout_words(words, use_ocr_lines, read_scale(hocr)))
+        if on_page:
+            on_page(len(pages), total, pages[-1])
+    return pages
+
+
+def tesseract_job(path, report, tile_workers=1):
+    # Desktop job (see jobs.py): pages are reported as they are laid out,
+    # the result is the finished .docx
+    pages = tesseract_pages(path, tile_workers, on_page=report)
+    if not any(pages):
+        raise ValueError("No readable text found.")
+    return render_pages(pages, 'docx')
+
+
+def task_error(e):
+    # What a process-pool task raises in place of ``e``: some exceptions
+    # (pytesseract's TesseractNotFoundError) can't be unpickled in the
+    # parent, which then breaks the whole pool and loses the message
+    return RuntimeError(str(e) or type(e).__name__)
+
+
+def tesseract_task(path, index=None, fmt=None):
+    """Process-pool task for the web server: OCR one image, or page ``index`` of a document.
+
+    Returns ``(paragraphs, data, durations)``: the laid-out page, the page
+    rendered to ``fmt`` (None without one) and the stage timings, for the
+    caller's trace.
+    """
+    from .ocr_engine import image_file_to_hocr, page_to_hocr
+
+    trace = Trace('tesseract_app', 'page')
+    try:
+        with trace.active():
+            # One page per process: the pool already uses every core
+            if index is None:
+                hocr = image_file_to_hocr(path, tile_workers=1)
+            else:
+                hocr = page_to_hocr(get_page(path, index), tile_workers=1)
+            with stage('parse'):
+                words = parse_hocr(hocr)
+            paragraphs = layout_words(words, scale=read_scale(hocr))
+            data = render_pages([paragraphs], fmt) if fmt and paragraphs else None
+    except Exception as e:
+        raise task_error(e) from None
+    return paragraphs, data, trace.durations
+
+
+def render_task(pages, fmt):
+    # Process-pool task: render_pages() and its stage timings
+    trace = Trace('tesseract_app', 'render')
+    try:
+        with trace.active():
+            data = render_pages(pages, fmt)
+    except Exception as e:
+        raise task_error(e) from None
+    return data, trace.durations
+
+
+def gemini_pages(texts):
+    # Gemini's markdown, one string per page -> laid-out pages
+    return [layout_markdown(text) for text in texts]
+
+
+def render_pages(pages, fmt, docx_writer='auto'):
+    """Render laid-out pages to bytes in ``fmt``.
+
+    docx_writer is 'auto', 'python-docx' or 'direct' (docx_writer.py).
+    """
+    if fmt == 'md':
+        return '\n\n'.join(render_markdown(paragraphs) for paragraphs in pages).encode()
+    if fmt == 'html':
+        parts = []
+        for number, paragraphs in enumerate(pages):
+            if number:
+                parts.append('\n<hr>\n')
+            render_html(paragraphs, parts)
+        return wrap_html(''.join(parts))
+
+    if docx_writer == 'auto':
+        big = sum(len(paragraphs) for paragraphs in pages) >= DIRECT_WRITER_PARAGRAPHS
+        docx_writer = 'direct' if big else 'python-docx'
+    buffer = BytesIO()
+    if docx_writer == 'direct':
+        with stage('save'):
+            write_docx(pages, buffer)
+        return buffer.getvalue()
+    doc = new_document()
+    with stage('docx'):
+        for number, paragraphs in enumerate(pages):
+            if number:
+                doc.add_page_break()
+            render_docx(paragraphs, doc)
+    with stage('save'):
+        doc.save(buffer)
+    return buffer.getvalue()
+
+
+def wrap_html(body):
+    return f"<!DOCTYPE html>\n<html><head><meta charset='utf-8'></head><body>\n{body}\n</body></html>\n".encode()
+
+
+def output_path(path, fmt, output_dir=None, relative=None):
+    """Where ``path`` converts to: next to it, or under output_dir keeping ``relative``."""
+    stem = os.path.splitext(relative or os.path.basename(path))[0]
+    if output_dir is None:
+        return os.path.splitext(path)[0] + OUTPUT_FORMATS[fmt]
+    return os.path.join(output_dir, stem + OUTPUT_FORMATS[fmt])
+
+
+def is_up_to_date(path, output):
+    return os.path.exists(output) and os.path.getmtime(output) >= os.path.getmtime(path)
+
+
+def write_atomic(output, data):
+    # Readers (and the up-to-date check) never see a half-written file
+    directory = os.path.dirname(os.path.abspath(output))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.image2word_', suffix=os.path.splitext(output)[1])
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, output)
+    except BaseException:
+        os.unlink(tmp)
+        raise
@@ -0,0 +1,114 @@
+from .layout import layout_markdown, layout_words
+
+# python-docx renderer for laid-out pages (see layout.py), shared by the
+# Tesseract (hOCR words) and Gemini (markdown) front ends. python-docx is
+# imported on first use.
+
+# Word-level documents put their formatting in paragraph styles: body text
+# is Normal at BODY_PT, header lines use HEADER_STYLE. Runs only carry
+# bold/italic, and only where a word has it.
+HEADER_STYLE = 'OCR Header'
+BODY_PT = 11
+HEADER_PT = 14
+# Multi-column parts of a page (Paragraph.columns) are continuous sections
+# with COLUMN_SPACING twips between their columns; every page ends in one
+# column, so page breaks and the next page are not split.
+COLUMN_SPACING = 720
+
+
+def new_document():
+    from docx import Document
+    return Document()
+
+
+def ensure_styles(doc):
+    """Give ``doc`` the paragraph styles word-level paragraphs use (idempotent)."""
+    from docx.enum.style import WD_STYLE_TYPE
+    from docx.shared import Pt
+
+    styles = doc.styles
+    try:
+        return styles[HEADER_STYLE]
+    except KeyError:
+        pass
+    styles['Normal'].font.size = Pt(BODY_PT)
+    header = styles.add_style(HEADER_STYLE, WD_STYLE_TYPE.PARAGRAPH)
+    header.base_style = styles['Normal']
+    header.font.bold = True
+    header.font.size = Pt(HEADER_PT)
+    return header
+
+
+def start_section(doc, columns):
+    """End ``doc``'s current section and continue in a new one with ``columns`` columns."""
+    from docx.enum.section import WD_SECTION
+    from docx.oxml.ns import qn
+
+    sect_pr = doc.add_section(WD_SECTION.CONTINUOUS)._sectPr
+    cols = sect_pr.find(qn('w:cols'))
+    if cols is None:
+        cols = sect_pr.makeelement(qn('w:cols'), {})
+        sect_pr.insert_element_before(cols, 'w:formProt', 'w:vAlign', 'w:noEndnote', 'w:titlePg',
+                                      'w:textDirection', 'w:bidi', 'w:rtlGutter', 'w:docGrid',
+                                      'w:printerSettings', 'w:sectPrChange')
+    cols.set(qn('w:num'), str(columns))
+    cols.set(qn('w:space'), str(COLUMN_SPACING))
+
+
+def render_docx(paragraphs, doc=None):
+    """Append a page of Paragraphs to ``doc`` (a new document if None) and return it."""
+    from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_BREAK
+
+    if doc is None:
+        doc = new_document()
+    header_style = None
+    columns = 1
+
+    for paragraph in paragraphs:
+        if paragraph.columns:
+            columns = paragraph.columns
+            start_section(doc, columns)
+        if paragraph.heading:
+            p = doc.add_heading(paragraph.text, level=paragraph.heading)
+            p.alignment = WD_ALIGN_PARAGRAPH.LEFT
+            continue
+        if paragraph.header and header_style is None:
+            header_style = ensure_styles(doc)
+        p = doc.add_paragraph(style=header_style if paragraph.header else None)
+        if paragraph.centered:
+            p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        if paragraph.column_break:
+            p.add_run().add_break(WD_BREAK.COLUMN)
+        for run in paragraph.runs:
+            r = p.add_run(run.text)
+            if run.bold:
+                r.bold = True
+            if run.italic:
+                r.italic = True
+    if columns > 1:
+        start_section(doc, 1)
+    return doc
+
+
+def words_to_docx(words_data, use_ocr_lines=False, doc=None, scale=1.0, preview=False):
+    """Lay out parsed hOCR words as paragraphs; returns ``(doc, html_preview)``.
+
+    Pass an existing doc to append to it (used for multi-page input).
+    scale: size of the OCR'd image relative to the original, for the px
+    thresholds. The HTML preview is only built when ``preview`` is set
+    (otherwise None is returned in its place); both come from one layout.
+    """
+    paragraphs = layout_words(words_data, use_ocr_lines, scale)
+    doc = render_docx(paragraphs, doc)
+    if not preview:
+        return doc, None
+    from .render import preview_html
+    return doc, preview_html(paragraphs)
+
+
+def markdown_to_docx(text, doc=None, max_heading=9):
+    """Convert Markdown text (headers and bold) into a DOCX object.
+
+    Pass an existing doc to append to it (used for multi-page input).
+    """
+    return render_docx(layout_markdown(text, max_heading), doc)
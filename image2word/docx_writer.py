@@ -0,0 +1,159 @@
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from .docx_builder import BODY_PT, COLUMN_SPACING, HEADER_PT, HEADER_STYLE
+
+# Direct WordprocessingML writer for word-level (hOCR) documents.
+#
+# python-docx builds every paragraph and run as lxml proxy objects and only
+# serializes them on save, which dominates the time and memory of large
+# documents. This writer renders the same laid-out pages (layout.py) as
+# XML text straight into the zip stream, with a minimal package: content
+# types, relationships, styles and the document part. The page setup and
+# styles match python-docx's default template plus ensure_styles(), so the
+# result looks the same as render_docx() output and opens in python-docx.
+# It is meant for word-level pages: markdown headings get the header style.
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+FLUSH_BYTES = 64 * 1024
+
+# Characters XML 1.0 can't carry (Word refuses the file if they slip in)
+INVALID_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '<Override PartName="/word/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>'
+    '</Types>'
+)
+
+PACKAGE_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '</Relationships>'
+)
+
+DOCUMENT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+HEADER_STYLE_ID = HEADER_STYLE.replace(' ', '')
+
+STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    f'<w:styles xmlns:w="{W_NS}">'
+    '<w:docDefaults>'
+    '<w:rPrDefault><w:rPr>'
+    # The template's theme minor font, named directly since there is no theme part
+    '<w:rFonts w:ascii="Cambria" w:eastAsia="Cambria" w:hAnsi="Cambria" w:cs="Times New Roman"/>'
+    '<w:sz w:val="22"/><w:szCs w:val="22"/><w:lang w:val="en-US" w:eastAsia="en-US" w:bidi="ar-SA"/>'
+    '</w:rPr></w:rPrDefault>'
+    '<w:pPrDefault><w:pPr><w:spacing w:after="200" w:line="276" w:lineRule="auto"/></w:pPr></w:pPrDefault>'
+    '</w:docDefaults>'
+    '<w:style w:type="paragraph" w:default="1" w:styleId="Normal"><w:name w:val="Normal"/><w:qFormat/>'
+    f'<w:rPr><w:sz w:val="{BODY_PT * 2}"/></w:rPr></w:style>'
+    f'<w:style w:type="paragraph" w:customStyle="1" w:styleId="{HEADER_STYLE_ID}">'
+    f'<w:name w:val="{HEADER_STYLE}"/><w:basedOn w:val="Normal"/>'
+    f'<w:rPr><w:b/><w:sz w:val="{HEADER_PT * 2}"/></w:rPr></w:style>'
+    '</w:styles>'
+)
+
+DOCUMENT_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    f'<w:document xmlns:w="{W_NS}"><w:body>'
+)
+
+# US Letter, 1.25" side and 1" top/bottom margins: python-docx's default template
+PAGE_SETUP = (
+    '<w:pgSz w:w="12240" w:h="15840"/>'
+    '<w:pgMar w:top="1440" w:right="1800" w:bottom="1440" w:left="1800" w:header="720" w:footer="720" '
+    'w:gutter="0"/>'
+)
+
+
+def section_properties(columns=1, continuous=False):
+    # The w:sectPr of a section; ``continuous`` for one that starts mid-page
+    return ('<w:sectPr>' + ('<w:type w:val="continuous"/>' if continuous else '') + PAGE_SETUP
+            + (f'<w:cols w:num="{columns}" w:space="{COLUMN_SPACING}"/>' if columns > 1 else '') + '</w:sectPr>')
+
+EMPTY_PARAGRAPH = '<w:p/>'
+PAGE_BREAK = '<w:p><w:r><w:br w:type="page"/></w:r></w:p>'
+COLUMN_BREAK = '<w:r><w:br w:type="column"/></w:r>'
+RUN_PROPERTIES = {
+    (False, False): '',
+    (True, False): '<w:rPr><w:b/></w:rPr>',
+    (False, True): '<w:rPr><w:i/></w:rPr>',
+    (True, True): '<w:rPr><w:b/><w:i/></w:rPr>',
+}
+
+
+def paragraph_xml(paragraph):
+    if not paragraph.runs:
+        return EMPTY_PARAGRAPH
+    header = paragraph.header or paragraph.heading
+    out = ['<w:p>']
+    if header or paragraph.centered:
+        out.append('<w:pPr>')
+        if header:
+            out.append(f'<w:pStyle w:val="{HEADER_STYLE_ID}"/>')
+        if paragraph.centered:
+            out.append('<w:jc w:val="center"/>')
+        out.append('</w:pPr>')
+    if paragraph.column_break:
+        out.append(COLUMN_BREAK)
+    for run in paragraph.runs:
+        out.append(f'<w:r>{RUN_PROPERTIES[run.bold, run.italic]}<w:t xml:space="preserve">'
+                   f'{escape(INVALID_XML.sub("", run.text))}</w:t></w:r>')
+    out.append('</w:p>')
+    return ''.join(out)
+
+
+def write_docx(pages, target):
+    """Write laid-out ``pages`` (lists of Paragraphs) as a .docx to a path or binary file.
+
+    Equivalent to render_docx() per page with page breaks between pages,
+    without building a python-docx document in memory. A section ends in the
+    w:sectPr of an empty paragraph of its own, as python-docx's add_section
+    does.
+    """
+    with zipfile.ZipFile(target, 'w', zipfile.ZIP_DEFLATED) as package:
+        package.writestr('[Content_Types].xml', CONTENT_TYPES)
+        package.writestr('_rels/.rels', PACKAGE_RELS)
+        package.writestr('word/_rels/document.xml.rels', DOCUMENT_RELS)
+        package.writestr('word/styles.xml', STYLES)
+        with package.open('word/document.xml', 'w') as part:
+            chunks = [DOCUMENT_START]
+            size = 0
+            columns, continuous = 1, False  # the current section
+            for number, paragraphs in enumerate(pages):
+                if number:
+                    chunks.append(PAGE_BREAK)
+                for paragraph in paragraphs:
+                    if paragraph.columns:
+                        chunks.append(f'<w:p><w:pPr>{section_properties(columns, continuous)}</w:pPr></w:p>')
+                        columns, continuous = paragraph.columns, True
+                    xml = paragraph_xml(paragraph)
+                    chunks.append(xml)
+                    size += len(xml)
+                    if size >= FLUSH_BYTES:
+                        part.write(''.join(chunks).encode('utf-8'))
+                        chunks, size = [], 0
+                if columns > 1:
+                    chunks.append(f'<w:p><w:pPr>{section_properties(columns, continuous)}</w:pPr></w:p>')
+                    columns = 1
+            chunks.append(section_properties(columns, continuous) + '</w:body></w:document>')
+            part.write(''.join(chunks).encode('utf-8'))
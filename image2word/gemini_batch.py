@@ -0,0 +1,238 @@
+import asyncio
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from .gemini_client import send_payload
+from .gemini_payload import DEFAULT_ENCODING, encode_image, image_tokens
+from .ocr_cache import get_cache, image_digest, make_key
+from .tracing import Trace, stage
+
+# Concurrent Gemini conversions for many images.
+#
+# Up to ``concurrency`` images are in flight at once. Every request first
+# takes one unit from a requests-per-minute bucket and its estimated token
+# count (image tiles + prompt + expected output) from a tokens-per-minute
+# bucket; the estimate is corrected with the real usage once the response
+# is in. Quota and server errors (429/5xx) are retried with full-jitter
+# exponential backoff, and a 429 also pauses every worker for that delay so
+# the whole batch slows down instead of hammering the quota. Results come
+# back in submission order; a failed image yields an error result and does
+# not stop the batch.
+#
+# The SDK calls are blocking, so they run on a thread pool sized to the
+# concurrency limit (the per-key gRPC client is thread-safe).
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RPM = 10  # Gemini 2.5 Flash free tier
+DEFAULT_TPM = 250_000
+PROMPT_TOKENS = 100  # rough; the prompt is a couple of sentences
+EXPECTED_OUTPUT_TOKENS = 1_000  # a dense page of markdown
+MAX_ATTEMPTS = 6
+BACKOFF_BASE = 1.0  # seconds
+BACKOFF_MAX = 60.0
+RETRY_CODES = (429, 500, 502, 503, 504)
+
+
+class TokenBucket:
+    """Async token bucket refilled at ``per_minute`` units per minute.
+
+    Waiters are served in arrival order. adjust() settles the difference
+    between an estimate taken earlier and the real amount, and may leave the
+    bucket in debt so later callers wait longer.
+    """
+
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.level = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount=1):
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.level >= amount:
+                    self.level -= amount
+                    return
+                await asyncio.sleep((amount - self.level) / self.rate)
+
+    def adjust(self, delta):
+        self._refill()
+        self.level = min(self.capacity, self.level - delta)
+
+
+class BatchResult:
+    __slots__ = ('index', 'source', 'text', 'error', 'attempts', 'seconds', 'cached', 'durations')
+
+    def __init__(self, index, source, text=None, error=None, attempts=0, seconds=0.0, cached=False, durations=None):
+        self.index = index
+        self.source = source  # the path (or image) that was submitted
+        self.text = text
+        self.error = error
+        self.attempts = attempts
+        self.seconds = seconds
+        self.cached = cached
+        self.durations = durations or {}  # seconds per stage, see tracing.Trace
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def is_retryable(error):
+    # google.api_core errors carry the HTTP status as .code
+    return getattr(error, 'code', None) in RETRY_CODES
+
+
+def backoff_delay(attempt):
+    # Full jitter: uniform in [0, base * 2^attempt], capped
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+class GeminiBatch:
+    def __init__(self, api_key, model_name, prompt, concurrency=DEFAULT_CONCURRENCY, rpm=DEFAULT_RPM,
+                 tpm=DEFAULT_TPM, encoding=DEFAULT_ENCODING, use_cache=True):
+        self.api_key = api_key
+        self.model_name = model_name
+        self.prompt = prompt
+        self.concurrency = max(1, int(concurrency))
+        # Blank or zero limits (e.g. an emptied form field) mean the defaults
+        self.requests = TokenBucket(max(1, int(rpm or DEFAULT_RPM)))
+        self.tokens = TokenBucket(max(1, int(tpm or DEFAULT_TPM)))
+        self.encoding = encoding
+        self.use_cache = use_cache
+        self._resume_at = 0.0  # loop time before which nobody sends (after a 429)
+
+    def cache_key(self, image):
+        return make_key(image_digest(image), engine='gemini', model=self.model_name, prompt=self.prompt,
+                        encoding=self.encoding.signature())
+
+    def _prepare(self, source, trace):
+        # Thread: decode, check the cache, encode
+        with trace.active():
+            with stage('decode'):
+                image = source if isinstance(source, Image.Image) else Image.open(source)
+                image.load()
+            key = self.cache_key(image)
+            if self.use_cache:
+                cached = get_cache().get(key)
+                if cached is not None:
+                    return key, cached, None
+            with stage('encode'):
+                return key, None, encode_image(image, self.encoding)
+
+    def _send(self, payload, trace):
+        # Thread: one request; returns the text and the tokens it really used
+        with trace.active(), stage('gemini'):
+            response = send_payload(self.api_key, self.model_name, self.prompt, payload)
+            usage = getattr(response, 'usage_metadata', None)
+            return response.text, getattr(usage, 'total_token_count', 0) or None
+
+    async def _pause_for_quota(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            wait = self._resume_at - loop.time()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    async def _convert(self, index, source, executor, semaphore, on_result):
+        loop = asyncio.get_running_loop()
+        result = BatchResult(index, source)
+        trace = Trace('gemini_batch', 'image')
+        start = time.perf_counter()
+        async with semaphore:
+            try:
+                key, text, payload = await loop.run_in_executor(executor, self._prepare, source, trace)
+                result.cached = text is not None
+                estimate = 0
+                if payload is not None:
+                    estimate = image_tokens(payload.size) + PROMPT_TOKENS + EXPECTED_OUTPUT_TOKENS
+                while text is None:
+                    await self._pause_for_quota()
+                    await self.requests.acquire(1)
+                    await self.tokens.acquire(estimate)
+                    result.attempts += 1
+                    try:
+                        text, used = await loop.run_in_executor(executor, self._send, payload, trace)
+                    except Exception as e:
+                        if not is_retryable(e) or result.attempts >= MAX_ATTEMPTS:
+                            raise
+                        delay = backoff_delay(result.attempts)
+                        if getattr(e, 'code', None) == 429:
+                            self._resume_at = max(self._resume_at, loop.time() + delay)
+                        logger.warning("gemini batch: item %d got %s, retry %d in %.1fs",
+                                       index, getattr(e, 'code', e), result.attempts, delay)
+                        await asyncio.sleep(delay)
+                        continue
+                    if used:
+                        self.tokens.adjust(used - estimate)
+                    if self.use_cache:
+                        get_cache().put(key, text)
+                result.text = text
+            except Exception as e:
+                result.error = str(e)
+        trace.finish(ok=result.ok)
+        result.durations = trace.durations
+        result.seconds = time.perf_counter() - start
+        if on_result is not None:
+            on_result(result)
+        return result
+
+    async def __aenter__(self):
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        # Never wait here: on cancellation SDK calls may still be in flight, and
+        # waiting for them would block the caller's event loop
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def convert(self, source, index=0):
+        """Convert one image; only valid inside ``async with batch:``.
+
+        For callers that produce images as they go (e.g. pages of a PDF)
+        and can't hand run() the whole list up front.
+        """
+        return await self._convert(index, source, self._executor, self._semaphore, None)
+
+    async def run(self, sources, on_result=None):
+        """Convert every image in ``sources`` (paths or PIL images).
+
+        Returns BatchResults in submission order. ``on_result`` is called
+        with each result as soon as it finishes (in completion order).
+        """
+        start = time.perf_counter()
+        async with self:
+            results = await asyncio.gather(*(
+                self._convert(index, source, self._executor, self._semaphore, on_result)
+                for index, source in enumerate(sources)
+            ))
+        failed = sum(not r.ok for r in results)
+        logger.info("gemini batch: %d images (%d failed, %d retries) in %.1fs", len(results), failed,
+                    sum(max(0, r.attempts - 1) for r in results), time.perf_counter() - start)
+        return results
+
+
+async def convert_batch_async(sources, api_key, model_name, prompt, on_result=None, **options):
+    """Library entry point inside a running event loop; see GeminiBatch for ``options``."""
+    return await GeminiBatch(api_key, model_name, prompt, **options).run(sources, on_result)
+
+
+def convert_batch(sources, api_key, model_name, prompt, on_result=None, **options):
+    """Blocking wrapper around convert_batch_async (call from non-async code)."""
+    return asyncio.run(convert_batch_async(sources, api_key, model_name, prompt, on_result, **options))
@@ -0,0 +1,142 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from .gemini_payload import DEFAULT_ENCODING, encode_image
+from .tracing import stage
+
+# Per-API-key Gemini models shared across requests.
+#
+# genai.configure() swaps one process-wide client, so two users converting
+# at the same time with different keys could end up on each other's
+# credentials, and every conversion used to pay for a new client. Here every
+# key gets its own GenerativeServiceClient, whose channel (and its
+# keep-alive connections) is reused by every later request with that key.
+# Clients are thread-safe; the small lock only guards the pool itself.
+
+logger = logging.getLogger(__name__)
+
+MAX_SESSIONS = 32  # least recently used keys are dropped beyond this
+
+# Point the clients at another server (e.g. a local fake Gemini for load
+# tests); requests then go over REST, which works with plain http:// URLs.
+GEMINI_ENDPOINT = os.getenv("IMAGE2WORD_GEMINI_ENDPOINT")
+
+_sessions = OrderedDict()
+_sessions_lock = threading.Lock()
+
+
+def _session_key(api_key, model_name):
+    # Never keep raw keys as dict keys (they'd show up in reprs and dumps)
+    return hashlib.sha256(f"{GEMINI_ENDPOINT}\n{model_name}\n{api_key}".encode()).hexdigest()
+
+
+def _create_model(api_key, model_name):
+    # The SDK takes most of a second to import, so it is loaded on first use
+    import google.generativeai as genai
+    from google.ai import generativelanguage as glm
+
+    if GEMINI_ENDPOINT:
+        client = glm.GenerativeServiceClient(transport="rest", client_options={
+            "api_key": api_key, "api_endpoint": GEMINI_ENDPOINT})
+    else:
+        client = glm.GenerativeServiceClient(client_options={"api_key": api_key})
+    model = genai.GenerativeModel(model_name)
+    # Bind the model to this key's client instead of the global default one
+    model._client = client
+    return model
+
+
+def get_model(api_key, model_name):
+    """Return the shared GenerativeModel for ``api_key``, creating it on first use."""
+    key = _session_key(api_key, model_name)
+    with _sessions_lock:
+        model = _sessions.get(key)
+        if model is not None:
+            _sessions.move_to_end(key)
+            return model
+
+    model = _create_model(api_key, model_name)
+    with _sessions_lock:
+        # Another thread may have created one meanwhile; keep the first
+        model = _sessions.setdefault(key, model)
+        _sessions.move_to_end(key)
+        while len(_sessions) > MAX_SESSIONS:
+            _sessions.popitem(last=False)
+    return model
+
+
+def send_payload(api_key, model_name, prompt, payload, stream=False):
+    """Send an already encoded image (gemini_payload.Payload) and return the SDK response."""
+    return get_model(api_key, model_name).generate_content([prompt, payload.part], stream=stream)
+
+
+def generate_markdown(api_key, model_name, prompt, image, encoding=DEFAULT_ENCODING):
+    """Send ``image`` (encoded compactly, see gemini_payload.py) and return the response text.
+
+    Bytes sent and end-to-end latency are logged for every request.
+    """
+    start = time.perf_counter()
+    with stage('encode'):
+        payload = encode_image(image, encoding)
+    encoded = time.perf_counter()
+    with stage('gemini'):
+        text = send_payload(api_key, model_name, prompt, payload).text
+    done = time.perf_counter()
+    logger.info("gemini %s: sent %d bytes (%s %dx%d from %dx%d), encode %.0f ms, request %.0f ms, total %.0f ms",
+                model_name, len(payload.data), payload.mime_type, *payload.size, *payload.original_size,
+                (encoded - start) * 1000, (done - encoded) * 1000, (done - start) * 1000)
+    return text
+
+
+def stream_markdown(api_key, model_name, prompt, image, encoding=DEFAULT_ENCODING):
+    """Like generate_markdown, but yield the response text in chunks as Gemini produces them."""
+    start = time.perf_counter()
+    with stage('encode'):
+        payload = encode_image(image, encoding)
+    encoded = time.perf_counter()
+    first = None
+    # Time spent by the consumer between chunks is its own (nested) stage
+    with stage('gemini'):
+        response = send_payload(api_key, model_name, prompt, payload, stream=True)
+        for chunk in response:
+            # chunk.text raises on the empty closing chunk; parts is just empty there
+            text = ''.join(part.text for part in chunk.parts)
+            if not text:
+                continue
+            if first is None:
+                first = time.perf_counter()
+            yield text
+    done = time.perf_counter()
+    logger.info("gemini %s (stream): sent %d bytes (%s %dx%d from %dx%d), encode %.0f ms, first text %.0f ms, "
+                "total %.0f ms", model_name, len(payload.data), payload.mime_type, *payload.size,
+                *payload.original_size, (encoded - start) * 1000, ((first or done) - start) * 1000,
+                (done - start) * 1000)
+
+
+class LineBuffer:
+    """Accumulates streamed markdown and hands out the lines completed so far.
+
+    feed() returns the newly completed lines (possibly ''), flush() whatever
+    is left after the last newline; both can go straight to markdown_to_docx.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self._pending = ''
+
+    @property
+    def text(self):
+        return ''.join(self.chunks)
+
+    def feed(self, chunk):
+        self.chunks.append(chunk)
+        head, newline, self._pending = (self._pending + chunk).rpartition('\n')
+        return head + newline
+
+    def flush(self):
+        rest, self._pending = self._pending, ''
+        return rest
@@ -0,0 +1,105 @@
+import io
+
+# Image encoding for Gemini uploads.
+#
+# Left alone, the SDK uploads the original file bytes, or a lossless WebP
+# for in-memory images: several MB per page and more image tiles (tokens)
+# than the text needs. Here the image is scaled so text lines end up about
+# target_line_height px tall, sent as grayscale when the page has no real
+# colour, and compressed as JPEG or WebP. NumPy and the preprocess helpers
+# are imported on the first encode so importing the client stays cheap.
+
+# Gemini bills images in 768x768 tiles; past this the extra detail is wasted
+MAX_SIDE = 3072
+TILE_SIZE = 768
+TOKENS_PER_TILE = 258
+
+
+class EncodeOptions:
+    def __init__(self, image_format='JPEG', quality=80, target_line_height=28, max_side=MAX_SIDE,
+                 min_side=768, grayscale='auto', colour_threshold=12.0):
+        self.image_format = image_format  # 'JPEG' or 'WEBP'
+        self.quality = quality
+        self.target_line_height = target_line_height
+        self.max_side = max_side
+        self.min_side = min_side  # never shrink the long side below this
+        self.grayscale = grayscale  # True, False or 'auto'
+        self.colour_threshold = colour_threshold  # mean chroma below this counts as text-only
+
+    def signature(self):
+        return dict(vars(self))
+
+
+DEFAULT_ENCODING = EncodeOptions()
+
+
+class Payload:
+    __slots__ = ('data', 'mime_type', 'size', 'original_size', 'grayscale')
+
+    def __init__(self, data, mime_type, size, original_size, grayscale):
+        self.data = data
+        self.mime_type = mime_type
+        self.size = size
+        self.original_size = original_size
+        self.grayscale = grayscale
+
+    @property
+    def part(self):
+        # Blob dict accepted by generate_content
+        return {'mime_type': self.mime_type, 'data': self.data}
+
+
+def image_tokens(size):
+    # Input tokens Gemini charges for an image of ``size`` (w, h)
+    w, h = size
+    if w <= 384 and h <= 384:
+        return TOKENS_PER_TILE
+    return -(-w // TILE_SIZE) * -(-h // TILE_SIZE) * TOKENS_PER_TILE
+
+
+def is_text_only(probe_rgb, threshold):
+    # Mean chroma (max - min channel) of a small RGB copy
+    import numpy as np
+    a = np.asarray(probe_rgb, dtype=np.int16)
+    return float((a.max(axis=2) - a.min(axis=2)).mean()) < threshold
+
+
+def encode_image(image, options=DEFAULT_ENCODING):
+    """Encode a PIL image into a compact Gemini upload (see module notes)."""
+    import numpy as np
+    from PIL import Image
+
+    from .preprocess import estimate_line_height, make_probe, otsu_ink_mask, to_grayscale, to_rgb
+
+    gray = to_grayscale(image)
+    probe, probe_factor = make_probe(gray)
+    line_height = estimate_line_height(otsu_ink_mask(np.asarray(probe)))
+
+    scale = 1.0
+    if line_height:
+        scale = min(1.0, options.target_line_height * probe_factor / line_height)
+    long_side = max(image.size)
+    scale = min(scale, options.max_side / long_side)
+    scale = max(scale, min(1.0, options.min_side / long_side))
+
+    grayscale = options.grayscale
+    rgb = None
+    if grayscale == 'auto':
+        if image.mode in ('L', '1', 'LA'):
+            grayscale = True
+        else:
+            rgb = to_rgb(image)
+            grayscale = is_text_only(rgb.resize(probe.size, Image.Resampling.BILINEAR), options.colour_threshold)
+
+    if grayscale:
+        out = gray
+    else:
+        out = rgb if rgb is not None else to_rgb(image)
+    if scale < 1.0:
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        out = out.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+    buffer = io.BytesIO()
+    out.save(buffer, format=options.image_format, quality=options.quality)
+    return Payload(buffer.getvalue(), f"image/{options.image_format.lower()}", out.size, image.size, grayscale)
+
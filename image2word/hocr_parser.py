@@ -0,0 +1,143 @@
+import html
+import re
+
+# Shared Tesseract output parser used by both Tesseract front-ends.
+# The hOCR is scanned in a single forward pass with one tokenizer pattern
+# that has no unbounded ".*?" spans, so it stays linear on dense pages.
+# Every word keeps its page/block/paragraph/line ids and its confidence.
+
+HOCR_PATTERN = re.compile(
+    r"<(?:div|p|span) class=['\"]"
+    r"(?:(ocr_page|ocr_carea|ocr_par|ocr_line|ocr_caption|ocr_header|ocr_textfloat)['\"]"
+    r"|ocrx_word['\"][^>]*?\btitle=['\"]bbox (\d+) (\d+) (\d+) (\d+)(?:; x_wconf ([\d.]+))?[^>]*>"
+    r"([^<]*(?:<(?!/span>)[^<]*)*)</span>)"
+)
+INNER_TAG_PATTERN = re.compile(r"<[^<]+?>")
+
+# Structural levels, in the order of the ids stored on each word
+PAGE, BLOCK, PAR, LINE = range(4)
+HOCR_CLASSES = {
+    'ocr_page': PAGE,
+    'ocr_carea': BLOCK,
+    'ocr_par': PAR,
+    'ocr_line': LINE,
+    'ocr_caption': LINE,
+    'ocr_header': LINE,
+    'ocr_textfloat': LINE,
+}
+
+
+class Word:
+    """A single recognized word with its box (page pixels) and structure ids.
+
+    Ids are 1-based running indices over the whole document, so two words
+    share a ``line`` id only if Tesseract put them on the same line.
+    """
+    __slots__ = ('text', 'x', 'y', 'x2', 'y2', 'conf', 'bold', 'italic',
+                 'page', 'block', 'par', 'line')
+
+    def __init__(self, text, x, y, x2, y2, conf=-1.0, bold=False, italic=False,
+                 page=0, block=0, par=0, line=0):
+        self.text = text
+        self.x = x
+        self.y = y
+        self.x2 = x2
+        self.y2 = y2
+        self.conf = conf
+        self.bold = bold
+        self.italic = italic
+        self.page = page
+        self.block = block
+        self.par = par
+        self.line = line
+
+    @property
+    def w(self):
+        return self.x2 - self.x
+
+    @property
+    def h(self):
+        return self.y2 - self.y
+
+    def __repr__(self):
+        return f"Word({self.text!r}, x={self.x}, y={self.y}, h={self.h}, line={self.line}, conf={self.conf})"
+
+
+def parse_hocr(hocr_string):
+    """Parse Tesseract hOCR (str or bytes) into a list of :class:`Word`."""
+    if isinstance(hocr_string, bytes):
+        hocr_string = hocr_string.decode('utf-8')
+
+    words = []
+    append = words.append
+    ids = [0, 0, 0, 0]  # page, block, par, line
+
+    for cls, x1, y1, x2, y2, conf, text in HOCR_PATTERN.findall(hocr_string):
+        if cls:
+            ids[HOCR_CLASSES[cls]] += 1
+            continue
+
+        is_bold = is_italic = False
+        if '<' in text:
+            lowered = text.lower()
+            is_bold = '<strong>' in lowered or '<b>' in lowered
+            is_italic = '<em>' in lowered or '<i>' in lowered
+            text = INNER_TAG_PATTERN.sub('', text)
+        if '&' in text:
+            text = html.unescape(text)
+        text = text.strip()
+
+        if text:
+            append(Word(text, int(x1), int(y1), int(x2), int(y2),
+                        float(conf) if conf else -1.0, is_bold, is_italic, *ids))
+    return words
+
+
+def words_to_hocr(words, width, height):
+    """Serialize words back into minimal hOCR that :func:`parse_hocr` reads losslessly.
+
+    Used when word boxes are produced or rewritten outside Tesseract (e.g.
+    merged from tiled OCR), so they can flow through the normal pipeline.
+    """
+    out = ["<div class='ocr_page' id='page_1' title='bbox 0 0 %d %d'>\n" % (width, height)]
+    open_block = open_par = open_line = None
+
+    for n, word in enumerate(words, start=1):
+        if word.block != open_block:
+            if open_line is not None:
+                out.append("</span>\n")
+            if open_par is not None:
+                out.append("</p>\n")
+            if open_block is not None:
+                out.append("</div>\n")
+            out.append(f"<div class='ocr_carea' id='block_1_{word.block}'>\n")
+            open_block, open_par, open_line = word.block, None, None
+        if word.par != open_par:
+            if open_line is not None:
+                out.append("</span>\n")
+            if open_par is not None:
+                out.append("</p>\n")
+            out.append(f"<p class='ocr_par' id='par_1_{word.par}'>\n")
+            open_par, open_line = word.par, None
+        if word.line != open_line:
+            if open_line is not None:
+                out.append("</span>\n")
+            out.append(f"<span class='ocr_line' id='line_1_{word.line}'>")
+            open_line = word.line
+
+        text = html.escape(word.text, quote=False)
+        if word.bold:
+            text = f"<strong>{text}</strong>"
+        if word.italic:
+            text = f"<em>{text}</em>"
+        out.append(f"\n <span class='ocrx_word' id='word_1_{n}' "
+                   f"title='bbox {word.x} {word.y} {word.x2} {word.y2}; x_wconf {word.conf:g}'>{text}</span>")
+
+    if open_line is not None:
+        out.append("</span>\n")
+    if open_par is not None:
+        out.append("</p>\n")
+    if open_block is not None:
+        out.append("</div>\n")
+    out.append("</div>\n")
+    return ''.join(out)
@@ -0,0 +1,276 @@
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import subprocess
+import threading
+import time
+
+from .tracing import Trace
+
+# Background conversion jobs for the desktop apps.
+#
+# A JobQueue runs submitted jobs on a bounded number of workers, in
+# submission order, and reports every change to a job (state, progress,
+# partial output) through on_change(job), called from a worker thread; the
+# apps forward it to the Tk thread with after(). Nothing here blocks the
+# caller, and results stay in memory on the Job until the app drops them.
+#
+# A job function is called as fn(path, report, *args) inside a Trace and
+# returns the result. report(done=None, total=None, item=None) updates the
+# progress and appends ``item`` (a finished page, a streamed chunk) to
+# job.partial, so the app can preview a job while it runs.
+#
+# Process workers (Tesseract) each keep one long-lived child process, so the
+# OCR engine stays warm between jobs. The child leads its own process group:
+# cancelling a running job kills the group, which takes down the tesseract
+# executable pytesseract started as well, and the worker starts a fresh
+# child for its next job. Thread workers (Gemini, which mostly waits on the
+# network) run the job in the worker thread and cancel cooperatively: every
+# report() call is a checkpoint that raises JobCancelled.
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = 'queued', 'running', 'done', 'failed', 'cancelled'
+FINISHED = (DONE, FAILED, CANCELLED)
+POLL_SECONDS = 0.1  # how often a process worker checks for cancellation
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, number, path, args=()):
+        self.number = number
+        self.path = path
+        self.args = args  # passed to the job function after the queue's own args
+        self.state = QUEUED
+        self.done = 0  # pages finished
+        self.total = None  # pages, once known
+        self.partial = []  # items passed to report(), in order
+        self.result = None
+        self.error = None
+        self.durations = {}  # stage -> seconds, from the job's Trace
+        self.timing = None  # the Trace summary, "1234 ms (ocr 900, ...)"
+        self.submitted = time.perf_counter()
+        self.started = None
+        self.finished = None
+        self.cancel_requested = False
+
+    @property
+    def name(self):
+        return os.path.basename(self.path)
+
+    @property
+    def is_finished(self):
+        return self.state in FINISHED
+
+    @property
+    def elapsed(self):
+        # Seconds running so far, or in total once finished
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    def describe(self):
+        # One line for a job list, e.g. "running  page 2/5  3.4 s"
+        parts = [self.state]
+        if self.total and self.state == RUNNING:
+            parts.append(f"page {min(self.done + 1, self.total)}/{self.total}")
+        if self.started is not None:
+            parts.append(f"{self.elapsed:.1f} s")
+        if self.error:
+            parts.append(self.error)
+        return "  ".join(parts)
+
+
+def _child_main(conn, fn, args, app):
+    # Process worker loop: a path in, events out, until the pipe is closed
+    if hasattr(os, 'setpgrp'):
+        os.setpgrp()  # lead a process group, see ProcessWorker.kill()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C is for the app
+
+    def report(done=None, total=None, item=None):
+        conn.send(('progress', done, total, item))
+
+    while True:
+        try:
+            path, job_args = conn.recv()
+        except EOFError:
+            return
+        trace = Trace(app, 'job')
+        try:
+            with trace.active():
+                result = fn(path, report, *args, *job_args)
+        except Exception as e:
+            trace.finish()
+            conn.send(('error', str(e) or type(e).__name__, trace.durations, trace.summary()))
+        else:
+            trace.finish()
+            conn.send(('done', result, trace.durations, trace.summary()))
+
+
+class ProcessWorker:
+    """Runs one job at a time in a child process that can be killed."""
+
+    def __init__(self, fn, args, app):
+        self.fn = fn
+        self.args = args
+        self.app = app
+        self.process = None
+        self.conn = None
+
+    def start(self):
+        # spawn, not fork: the parent is a threaded Tk app
+        context = multiprocessing.get_context('spawn')
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_child_main, args=(child, self.fn, self.args, self.app),
+                                       name='image2word-job', daemon=True)
+        self.process.start()
+        child.close()
+
+    def kill(self):
+        process = self.process
+        if process is None:
+            return
+        try:
+            if hasattr(os, 'killpg'):
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                # No process groups on Windows: kill the tree (tesseract.exe included)
+                subprocess.run(['taskkill', '/F', '/T', '/PID', str(process.pid)], capture_output=True)
+        except ProcessLookupError:
+            pass  # killed before it could set up its group
+        process.kill()
+        process.join()
+        self.conn.close()
+        self.process = self.conn = None
+
+    def run(self, job, update):
+        if self.process is None or not self.process.is_alive():
+            self.start()
+        self.conn.send((job.path, job.args))
+        while True:
+            while not self.conn.poll(POLL_SECONDS):
+                if job.cancel_requested:
+                    self.kill()
+                    raise JobCancelled()
+            try:
+                event = self.conn.recv()
+            except EOFError:
+                self.kill()
+                raise RuntimeError("the OCR worker process exited unexpectedly") from None
+            if event[0] == 'progress':
+                update(*event[1:])
+                continue
+            job.durations, job.timing = event[2], event[3]
+            if event[0] == 'error':
+                raise RuntimeError(event[1])
+            return event[1]
+
+    def close(self):
+        self.kill()
+
+
+class ThreadWorker:
+    """Runs jobs in the worker thread; cancellation is checked at every report()."""
+
+    def __init__(self, fn, args, app):
+        self.fn = fn
+        self.args = args
+        self.app = app
+
+    def run(self, job, update):
+        def report(done=None, total=None, item=None):
+            if job.cancel_requested:
+                raise JobCancelled()
+            update(done, total, item)
+
+        trace = Trace(self.app, 'job')
+        try:
+            with trace.active():
+                return self.fn(job.path, report, *self.args, *job.args)
+        finally:
+            trace.finish()
+            job.durations, job.timing = trace.durations, trace.summary()
+
+    def close(self):
+        pass
+
+
+class JobQueue:
+    """Submitted paths are converted by ``fn`` on ``workers`` workers, oldest first.
+
+    processes: run each worker's jobs in a child process (fn and args must
+    be picklable) instead of in the worker thread.
+    """
+
+    def __init__(self, fn, args=(), workers=1, processes=False, on_change=None, app='jobs'):
+        self.on_change = on_change or (lambda job: None)
+        self.pending = queue.Queue()
+        self.numbers = itertools.count(1)
+        self.closed = False
+        worker_class = ProcessWorker if processes else ThreadWorker
+        self.workers = [worker_class(fn, args, app) for _ in range(workers)]
+        for number, worker in enumerate(self.workers, start=1):
+            threading.Thread(target=self.work, args=(worker,), name=f'{app}-worker-{number}', daemon=True).start()
+
+    def submit(self, path, *args):
+        """Queue ``path``; ``args`` go to the job function after the queue's own."""
+        job = Job(next(self.numbers), path, args)
+        self.pending.put(job)
+        self.on_change(job)
+        return job
+
+    def cancel(self, job):
+        """Cancel a queued or running job; returns immediately."""
+        if job.is_finished:
+            return
+        job.cancel_requested = True
+        if job.state == QUEUED:
+            job.state = CANCELLED
+            job.finished = time.perf_counter()
+            self.on_change(job)
+
+    def close(self):
+        """Stop the workers, killing running process jobs."""
+        self.closed = True
+        for _ in self.workers:
+            self.pending.put(None)
+        for worker in self.workers:
+            worker.close()
+
+    def work(self, worker):
+        while True:
+            job = self.pending.get()
+            if job is None or self.closed:
+                return
+            if job.cancel_requested:
+                continue
+            job.state = RUNNING
+            job.started = time.perf_counter()
+            self.on_change(job)
+
+            def update(done, total, item, job=job):
+                if done is not None:
+                    job.done = done
+                if total is not None:
+                    job.total = total
+                if item is not None:
+                    job.partial.append(item)
+                self.on_change(job)
+
+            try:
+                job.result = worker.run(job, update)
+                job.state = DONE
+            except JobCancelled:
+                job.state = CANCELLED
+            except Exception as e:
+                logger.warning("job %d (%s) failed: %s", job.number, job.path, e)
+                job.state = FAILED
+                job.error = str(e) or type(e).__name__
+            job.finished = time.perf_counter()
+            self.on_change(job)
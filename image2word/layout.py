@@ -0,0 +1,310 @@
+import re
+from bisect import bisect_right, insort
+from operator import attrgetter
+
+from .reading_order import reading_order
+from .tracing import stage
+
+# Layout shared by every front-end and output format.
+#
+# A page is laid out once into a list of Paragraphs (runs of text with
+# bold/italic, plus alignment and header/heading level) and that list is
+# what the renderers consume: docx_builder and docx_writer for .docx,
+# render for HTML, markdown and the Tk preview. Words from Tesseract go
+# through layout_words(), Gemini's markdown through layout_markdown().
+#
+# layout_words() works on the word boxes as NumPy columns: lines are
+# labelled once, then sorted with one lexsort, and the per-line statistics
+# (mean and max height, left and right edge) are segmented reductions over
+# the sorted columns, so only the final Paragraph/Run objects are built in
+# Python. Before that, the page is split into blocks in reading order
+# (reading_order.py): lines are found within each column, never across
+# the gutter, and the lines of one column are read before the next.
+# Centering is judged against the line's column (the page's text area
+# outside columns) rather than a fixed indent, so it holds at any
+# resolution. The paragraphs that start a multi-column part of the page,
+# a new column, and the single-column part after it are marked, and the
+# docx renderers turn those marks into column sections.
+
+# Pixel thresholds are for images at their original size; multiply them by
+# the preprocessing scale (preprocess.read_scale) for downsized OCR input.
+LINE_TOLERANCE = 12  # px; words whose tops differ by less share a line
+GAP_FACTOR = 1.5  # a vertical gap this many median word heights adds a blank paragraph
+HEADER_FACTOR = 1.3  # lines this many median word heights tall are headers
+# A line is centered when both its margins inside the text area are at least
+# CENTER_MARGIN of the area's width and differ by at most CENTER_BALANCE of it
+CENTER_MARGIN = 0.05
+CENTER_BALANCE = 0.05
+
+BOLD_PATTERN = re.compile(r'(\*\*.*?\*\*)')
+
+
+class Run:
+    __slots__ = ('text', 'bold', 'italic')
+
+    def __init__(self, text, bold=False, italic=False):
+        self.text = text
+        self.bold = bold
+        self.italic = italic
+
+    def __eq__(self, other):
+        return (self.text, self.bold, self.italic) == (other.text, other.bold, other.italic)
+
+    def __repr__(self):
+        return f"Run({self.text!r}, bold={self.bold}, italic={self.italic})"
+
+
+class Paragraph:
+    """One output paragraph; a paragraph without runs is a blank spacer line.
+
+    ``header`` marks a tall OCR line (rendered with the header style), while
+    ``heading`` is a markdown heading level (0 for body text). ``columns``
+    starts a new section with that many columns at this paragraph (0 keeps
+    the current one), and ``column_break`` starts the section's next column.
+    """
+    __slots__ = ('runs', 'centered', 'header', 'heading', 'columns', 'column_break')
+
+    def __init__(self, runs=(), centered=False, header=False, heading=0, columns=0, column_break=False):
+        self.runs = list(runs)
+        self.centered = centered
+        self.header = header
+        self.heading = heading
+        self.columns = columns
+        self.column_break = column_break
+
+    @property
+    def text(self):
+        return ''.join(run.text for run in self.runs)
+
+    def __eq__(self, other):
+        return (self.runs, self.centered, self.header, self.heading, self.columns, self.column_break) == \
+            (other.runs, other.centered, other.header, other.heading, other.columns, other.column_break)
+
+    def __repr__(self):
+        return (f"Paragraph({self.runs!r}, centered={self.centered}, header={self.header}, heading={self.heading}, "
+                f"columns={self.columns}, column_break={self.column_break})")
+
+
+def cluster_ys(ys, tolerance=LINE_TOLERANCE):
+    """The y of the line each of ``ys`` joins, in order, as a list.
+
+    A word joins the earliest-created line whose y is within ``tolerance``
+    of its own y, otherwise it starts a new line at its y. Line ys are kept
+    in a sorted index, and since any two of them are at least ``tolerance``
+    apart only a couple of neighbours need checking per word, which makes
+    this O(n log n) instead of scanning every line for every word.
+    """
+    keys = []
+    order = {}  # line y -> creation index
+    index = []  # sorted line ys
+    for y in ys:
+        best = None
+        i = bisect_right(index, y - tolerance)
+        while i < len(index) and index[i] < y + tolerance:
+            line_y = index[i]
+            if best is None or order[line_y] < order[best]:
+                best = line_y
+            i += 1
+        if best is None:
+            order[y] = len(order)
+            insort(index, y)
+            best = y
+        keys.append(best)
+    return keys
+
+
+class WordColumns:
+    """A page's words as struct-of-arrays: one NumPy array per Word field."""
+    FIELDS = (('x', 'i4'), ('y', 'i4'), ('x2', 'i4'), ('y2', 'i4'), ('bold', '?'), ('italic', '?'), ('line', 'i4'))
+    __slots__ = tuple(name for name, _ in FIELDS)
+
+    def __init__(self, words):
+        import numpy as np
+
+        for name, dtype in self.FIELDS:
+            setattr(self, name, np.fromiter(map(attrgetter(name), words), dtype, len(words)))
+
+    def take(self, indices):
+        """The words at ``indices`` as WordColumns."""
+        subset = object.__new__(WordColumns)
+        for name, _ in self.FIELDS:
+            setattr(subset, name, getattr(self, name)[indices])
+        return subset
+
+
+def line_keys(columns, tolerance=LINE_TOLERANCE, use_ocr_lines=False):
+    """The y of each word's line, as an array.
+
+    Words are clustered by y (see cluster_ys). With ``use_ocr_lines`` the
+    ``ocr_line`` grouping from Tesseract is used instead, each line keyed by
+    the top of its highest word.
+    """
+    import numpy as np
+
+    if use_ocr_lines and len(columns.line) and columns.line.all():
+        ids, inverse = np.unique(columns.line, return_inverse=True)
+        tops = np.full(len(ids), np.iinfo(np.int32).max, dtype=np.int32)
+        np.minimum.at(tops, inverse, columns.y)
+        return tops[inverse]
+
+    # Only a y's first occurrence can start a line, and a later line never
+    # takes a word from an earlier one, so it is enough to cluster the
+    # distinct ys in order of appearance. Sorted, they split into groups at
+    # gaps of at least ``tolerance``, which no line can bridge. A group
+    # narrower than that is a single line keyed by its first y to appear;
+    # only wider groups (lines closer than the tolerance) need cluster_ys.
+    distinct, first, inverse = np.unique(columns.y, return_index=True, return_inverse=True)
+    wide_gap = np.diff(distinct) >= tolerance
+    group = np.concatenate(([0], np.cumsum(wide_gap)))
+    starts = np.concatenate(([0], np.flatnonzero(wide_gap) + 1))
+    ends = np.append(starts[1:], len(distinct))
+    by_appearance = np.lexsort((first, group))  # group by group, earliest first
+    keys = distinct[by_appearance[starts]][group]
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        if distinct[end - 1] - distinct[start] >= tolerance:
+            members = by_appearance[start:end]
+            keys[members] = cluster_ys(distinct[members].tolist(), tolerance)
+    return keys[inverse]
+
+
+def layout_words(words_data, use_ocr_lines=False, scale=1.0, sections=True):
+    """Lay out parsed hOCR words as a page of Paragraphs.
+
+    Lines become paragraphs in reading order, a large vertical gap adds a
+    blank one, lines centered in their column are centered and unusually
+    tall lines are headers. Consecutive words with the same formatting
+    share one Run.
+    scale: size of the OCR'd image relative to the original, for the px
+    thresholds.
+    sections: mark where multi-column parts of the page start and end (see
+    Paragraph); without, the columns are still read one after the other.
+    """
+    if not words_data:
+        return []
+    import numpy as np
+
+    with stage('layout'):
+        columns = WordColumns(words_data)
+        heights = columns.y2 - columns.y
+        median_height = np.partition(heights, len(heights) // 2)[len(heights) // 2]
+        blocks = reading_order(columns.x, columns.y, columns.x2, columns.y2, max(1, median_height))
+
+        # Lines are found per column ("lane"): words side by side in two
+        # columns are never one line
+        block_of = np.empty(len(words_data), dtype=np.int32)
+        lanes = {}
+        for rank, block in enumerate(blocks):
+            block_of[block.indices] = rank
+            lanes.setdefault((block.section, block.column), []).append(block.indices)
+        if len(lanes) == 1:
+            keys = line_keys(columns, LINE_TOLERANCE * scale, use_ocr_lines)
+        else:
+            keys = np.empty(len(words_data), dtype=columns.y.dtype)
+            for parts in lanes.values():
+                indices = np.sort(np.concatenate(parts))  # hOCR order, which line clustering depends on
+                keys[indices] = line_keys(columns.take(indices), LINE_TOLERANCE * scale, use_ocr_lines)
+
+        # Words in reading order: by block, line, then left to right
+        # (stable, so words at the same x keep their hOCR order)
+        order = np.lexsort((columns.x, keys, block_of))
+        keys, block_of = keys[order], block_of[order]
+        new_line = np.ones(len(order), dtype=bool)
+        new_line[1:] = (keys[1:] != keys[:-1]) | (block_of[1:] != block_of[:-1])
+        starts = np.flatnonzero(new_line)
+        labels = np.cumsum(new_line) - 1
+        counts = np.diff(np.append(starts, len(order)))
+        line_ys = keys[starts]
+        line_block = block_of[starts]
+        x, x2 = columns.x[order], columns.x2[order]
+        heights = heights[order]
+
+        # Per-line statistics as segmented reductions
+        mean_height = np.add.reduceat(heights, starts) / counts
+        bottom = line_ys + np.maximum.reduceat(heights, starts)
+        left = x[starts]
+        right = np.maximum.reduceat(x2, starts)
+
+        header = mean_height > median_height * HEADER_FACTOR
+        gap = np.zeros(len(starts), dtype=bool)
+        gap[1:] = (bottom[:-1] > 0) & (line_ys[1:] - bottom[:-1] > median_height * GAP_FACTOR)
+        area_left = np.array([block.left for block in blocks])[line_block]
+        area_right = np.array([block.right for block in blocks])[line_block]
+        width = np.maximum(1, area_right - area_left)
+        left_margin, right_margin = left - area_left, area_right - right
+        centered = ((np.minimum(left_margin, right_margin) >= CENTER_MARGIN * width)
+                    & (np.abs(left_margin - right_margin) <= CENTER_BALANCE * width))
+
+        # Section marks: a new section starts where the lines' section
+        # changes, a new column where only their column does
+        starts_section = np.zeros(len(starts), dtype=np.int32)
+        column_break = np.zeros(len(starts), dtype=bool)
+        if sections:
+            section = np.array([-1 if block.section is None else block.section for block in blocks])[line_block]
+            column = np.array([block.column for block in blocks])[line_block]
+            count = np.array([block.columns for block in blocks])[line_block]
+            changed = np.ones(len(starts), dtype=bool)
+            changed[1:] = section[1:] != section[:-1]
+            starts_section = np.where(changed & (section >= 0), count, 0)
+            starts_section[1:][changed[1:] & (section[1:] < 0)] = 1
+            column_break[1:] = ~changed[1:] & (column[1:] != column[:-1])
+
+        # A run starts at every line and wherever the style changes (never
+        # inside a header line, whose formatting comes from the paragraph style)
+        style = (columns.bold + 2 * columns.italic.astype(np.int8))[order]
+        breaks = np.zeros(len(order), dtype=bool)
+        breaks[1:] = (style[1:] != style[:-1]) & ~header[labels[1:]]
+        breaks[starts] = True
+        run_starts = np.flatnonzero(breaks)
+        run_ends = np.append(run_starts[1:], len(order))
+
+        texts = [words_data[i].text for i in order.tolist()]
+        styles = style.tolist()
+        current = -1
+        paragraphs = []
+        for start, end, line in zip(run_starts.tolist(), run_ends.tolist(), labels[run_starts].tolist()):
+            text = " ".join(texts[start:end])
+            if line != current:
+                current = line
+                if gap[line]:
+                    paragraphs.append(Paragraph())
+                paragraph = Paragraph(centered=bool(centered[line]), header=bool(header[line]),
+                                      columns=int(starts_section[line]), column_break=bool(column_break[line]))
+                paragraphs.append(paragraph)
+            else:
+                text = " " + text
+            if paragraph.header:
+                paragraph.runs.append(Run(text))
+            else:
+                paragraph.runs.append(Run(text, bool(styles[start] & 1), bool(styles[start] & 2)))
+    return paragraphs
+
+
+def layout_markdown(text, max_heading=9):
+    """Lay out markdown (``#`` headings and ``**bold**``) as a page of Paragraphs.
+
+    Empty lines are dropped; every other line is one paragraph.
+    """
+    paragraphs = []
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+
+        # Header Handling (# Header)
+        if line.startswith('#'):
+            level = line.count('#')
+            clean_text = line.replace('#', '').strip()
+            # Docx supports heading levels 1-9
+            paragraphs.append(Paragraph([Run(clean_text)], heading=min(level, max_heading)))
+            continue
+
+        # Very basic markdown bold parser (**text**)
+        # Splitting by ** gives: ["Regular ", "**Bold**", " Regular"]
+        runs = []
+        for part in BOLD_PATTERN.split(line):
+            if part.startswith('**') and part.endswith('**'):
+                runs.append(Run(part[2:-2], bold=True))
+            elif part:
+                runs.append(Run(part))
+        paragraphs.append(Paragraph(runs))
+    return paragraphs
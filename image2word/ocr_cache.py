@@ -0,0 +1,227 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+# Content-addressed cache for OCR / Gemini results, shared by every app.
+#
+# Keys hash the image content together with everything that changes the
+# result (engine, model, prompt, Tesseract config). Values are the raw engine
+# output (hOCR or markdown), so a hit goes straight to parsing and docx
+# generation. There is a small in-memory LRU in front of a size-bounded
+# directory on disk, and concurrent requests for the same key share a single
+# computation.
+#
+# The directory is shared by every process using it (batch workers, the
+# Tesseract server's process pool), so it is its own index: a lookup opens
+# the key's file, and the size bound is enforced against what is actually
+# in the directory, least recently read first. Across processes, the one
+# computing a key holds a marker file that the others wait on; a marker
+# older than IN_FLIGHT_TIMEOUT is left over from a crash and ignored.
+
+CACHE_DIR = os.getenv("IMAGE2WORD_CACHE_DIR", os.path.join(tempfile.gettempdir(), "image2word_cache"))
+MEMORY_ITEMS = 128
+DISK_MAX_BYTES = 256 * 1024 * 1024
+IN_FLIGHT_TIMEOUT = 600  # seconds
+POLL_SECONDS = 0.05
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def image_digest(image):
+    # Hash decoded pixels for in-memory PIL images (e.g. gr.Image(type="pil"))
+    digest = hashlib.sha256(f"{image.mode}:{image.size}".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+def make_key(content_digest, **params):
+    payload = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha256(f"{content_digest}\n{payload}".encode()).hexdigest()
+
+
+class OCRCache:
+    def __init__(self, directory=CACHE_DIR, memory_items=MEMORY_ITEMS, disk_max_bytes=DISK_MAX_BYTES):
+        self.directory = directory
+        self.memory_items = memory_items
+        self.disk_max_bytes = disk_max_bytes
+        self._memory = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".txt")
+
+    def _marker(self, key):
+        return os.path.join(self.directory, key + ".lock")
+
+    def get(self, key):
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                return value
+        if not self.directory:
+            return None
+
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                value = f.read()
+            os.utime(path)  # most recently used, for eviction
+        except OSError:
+            return None  # not computed yet, or evicted
+
+        with self._lock:
+            self._remember(key, value)
+        return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._remember(key, value)
+        if not self.directory:
+            return
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(value.encode('utf-8'))
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self._evict()
+
+    def _evict(self):
+        # Least recently used files go until the directory is within
+        # disk_max_bytes; the newest always stays
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".txt"):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue  # removed by another process meanwhile
+                entries.append((stat.st_mtime, entry.path, stat.st_size))
+                total += stat.st_size
+        entries.sort()
+        for _, path, size in entries[:-1]:
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _claim(self, key):
+        # Create the key's in-flight marker; False while another process holds it
+        marker = self._marker(key)
+        try:
+            os.close(os.open(marker, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            pass
+        except OSError:
+            return True  # can't create markers here: compute without one
+        try:
+            if time.time() - os.path.getmtime(marker) > IN_FLIGHT_TIMEOUT:
+                os.utime(marker)  # abandoned: take it over
+                return True
+        except OSError:
+            return self._claim(key)  # released meanwhile
+        return False
+
+    def _release(self, key):
+        try:
+            os.remove(self._marker(key))
+        except OSError:
+            pass
+
+    def _wait_for(self, key):
+        # The value another process is computing; None if it failed or stalled
+        marker = self._marker(key)
+        while True:
+            value = self.get(key)
+            if value is not None:
+                return value
+            try:
+                if time.time() - os.path.getmtime(marker) > IN_FLIGHT_TIMEOUT:
+                    return None
+            except OSError:
+                return self.get(key)  # released: done, or failed
+            time.sleep(POLL_SECONDS)
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for ``key``, calling ``compute()`` on a miss.
+
+        Concurrent callers with the same key, in this process or in another
+        one sharing the directory, wait for the first one instead of running
+        ``compute`` again. Failures are not cached.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[key] = Future()
+        if not leader:
+            return flight.result()
+
+        claimed = False
+        try:
+            if self.directory:
+                claimed = self._claim(key)
+                if not claimed:
+                    value = self._wait_for(key)
+            # Another leader may have finished between our miss and the lock
+            if value is None:
+                value = self.get(key)
+            if value is None:
+                value = compute()
+                self.put(key, value)
+            flight.set_result(value)
+            return value
+        except BaseException as e:
+            flight.set_exception(e)
+            raise
+        finally:
+            if claimed:
+                self._release(key)
+            with self._lock:
+                del self._in_flight[key]
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = OCRCache()
+    return _cache
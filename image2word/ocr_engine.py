@@ -0,0 +1,202 @@
+import os
+import queue
+import shlex
+import threading
+
+# OCR engines for the Tesseract front-ends.
+#
+# TesserocrEngine keeps long-lived Tesseract instances (through the C API via
+# the optional `tesserocr` package) with the language models loaded, and
+# hands them the PIL image in memory. PytesseractEngine is the old path: a
+# temp file and a fresh `tesseract` process per call. get_engine() picks the
+# first one that is available.
+
+from .ocr_cache import file_digest, get_cache, image_digest, make_key
+from .preprocess import DEFAULT_OPTIONS, preprocess_file, preprocess_image, tag_scale
+from .tiling import DEFAULT_WORKERS, should_tile, tiled_image_to_hocr
+from .tracing import stage
+
+tesserocr = None  # imported on first use, see _load_tesserocr()
+
+# "auto", "tesserocr" or "pytesseract"
+DEFAULT_ENGINE = os.getenv("IMAGE2WORD_OCR_ENGINE", "auto")
+DEFAULT_LANG = "eng"
+# Max warm Tesseract instances per process (each holds its own models).
+# They are created lazily, only when that many recognitions run at once.
+TESSEROCR_POOL_SIZE = os.cpu_count() or 1
+
+
+def _load_tesserocr():
+    # Loading libtesseract and its bindings is slow; only pay for it when asked
+    global tesserocr
+    if tesserocr is None:
+        try:
+            import tesserocr as module
+        except ImportError:
+            return None
+        tesserocr = module
+    return tesserocr
+
+
+class PytesseractEngine:
+    name = "pytesseract"
+
+    def __init__(self, lang=DEFAULT_LANG, config=""):
+        import pytesseract
+        self._pytesseract = pytesseract
+        self.lang = lang
+        self.config = config
+
+    def image_to_hocr(self, image):
+        hocr = self._pytesseract.image_to_pdf_or_hocr(image, lang=self.lang, config=self.config, extension='hocr')
+        return hocr.decode('utf-8')
+
+
+class TesserocrEngine:
+    name = "tesserocr"
+
+    def __init__(self, lang=DEFAULT_LANG, config="", pool_size=TESSEROCR_POOL_SIZE):
+        if _load_tesserocr() is None:
+            raise RuntimeError("tesserocr is not installed")
+        self.lang = lang
+        self.config = config
+        self.pool_size = pool_size
+        self._oem, self._psm, self._variables = self._parse_config(config)
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _parse_config(config):
+        # Accept the same command-line style config string as pytesseract
+        oem = tesserocr.OEM.DEFAULT
+        psm = None
+        variables = {}
+        tokens = shlex.split(config)
+        i = 0
+        while i < len(tokens):
+            token = tokens[i]
+            if token == '--oem' and i + 1 < len(tokens):
+                oem = int(tokens[i + 1])
+                i += 1
+            elif token == '--psm' and i + 1 < len(tokens):
+                psm = int(tokens[i + 1])
+                i += 1
+            elif token == '-c' and i + 1 < len(tokens) and '=' in tokens[i + 1]:
+                key, value = tokens[i + 1].split('=', 1)
+                variables[key] = value
+                i += 1
+            i += 1
+        return oem, psm, variables
+
+    def _create_api(self):
+        api = tesserocr.PyTessBaseAPI(lang=self.lang, oem=self._oem)
+        if self._psm is not None:
+            api.SetPageSegMode(self._psm)
+        for key, value in self._variables.items():
+            api.SetVariable(key, value)
+        return api
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.pool_size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+        if create:
+            try:
+                return self._create_api()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        # Every instance is busy; wait for one to come back
+        return self._idle.get()
+
+    def image_to_hocr(self, image):
+        api = self._acquire()
+        try:
+            api.SetImage(image)
+            return api.GetHOCRText(0)
+        finally:
+            api.Clear()
+            self._idle.put(api)
+
+
+ENGINES = {
+    "tesserocr": TesserocrEngine,
+    "pytesseract": PytesseractEngine,
+}
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(name=DEFAULT_ENGINE, lang=DEFAULT_LANG, config=""):
+    """Return a shared engine, creating it on first use in this process."""
+    key = (name, lang, config)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            if name == "auto":
+                engine = None
+                if _load_tesserocr() is not None:
+                    try:
+                        engine = TesserocrEngine(lang=lang, config=config)
+                        # Load the models now so a broken install falls back here
+                        engine._idle.put(engine._acquire())
+                    except Exception:
+                        engine = None
+                if engine is None:
+                    engine = PytesseractEngine(lang=lang, config=config)
+            else:
+                engine = ENGINES[name](lang=lang, config=config)
+            _engines[key] = engine
+    return engine
+
+
+def recognize(engine, image, tile_workers):
+    # Large pages are split into bands and OCR'd in parallel (see tiling.py)
+    if tile_workers > 1 and should_tile(image, tile_workers):
+        return tiled_image_to_hocr(engine, image, tile_workers)
+    return engine.image_to_hocr(image)
+
+
+def image_file_to_hocr(path, engine=None, preprocess=DEFAULT_OPTIONS, tile_workers=DEFAULT_WORKERS):
+    """OCR an image file to hOCR, reusing the cached result for identical files.
+
+    The image is normalized first (see preprocess.py); the hOCR is tagged
+    with the applied scale, read it back with ``preprocess.read_scale``.
+    Pass ``tile_workers=1`` to disable tiled OCR of very large pages.
+    """
+    engine = engine or get_engine()
+    key = make_key(file_digest(path), engine=engine.name, lang=engine.lang, config=engine.config,
+                   preprocess=preprocess.signature(), tile_workers=tile_workers)
+
+    def compute():
+        with stage('preprocess'):
+            result = preprocess_file(path, preprocess)
+        return tag_scale(recognize(engine, result.image, tile_workers), result.scale)
+
+    with stage('ocr'):
+        return get_cache().get_or_compute(key, compute)
+
+
+def page_to_hocr(image, engine=None, preprocess=DEFAULT_OPTIONS, tile_workers=DEFAULT_WORKERS):
+    """OCR an already decoded page (e.g. from a PDF), cached by its pixels."""
+    engine = engine or get_engine()
+    key = make_key(image_digest(image), engine=engine.name, lang=engine.lang, config=engine.config,
+                   preprocess=preprocess.signature(), tile_workers=tile_workers)
+
+    def compute():
+        with stage('preprocess'):
+            result = preprocess_image(image, preprocess)
+        return tag_scale(recognize(engine, result.image, tile_workers), result.scale)
+
+    with stage('ocr'):
+        return get_cache().get_or_compute(key, compute)
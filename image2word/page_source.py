@@ -0,0 +1,75 @@
+import os
+
+from PIL import Image, ImageSequence
+
+from .tracing import stage
+
+# Page-by-page input for multi-page documents. Pages are decoded lazily, one
+# at a time, so memory stays flat no matter how many pages a file has.
+# PDFs are rendered with the optional PyMuPDF package; multi-frame TIFFs
+# (and plain images, as a single page) go through Pillow.
+
+
+def _pymupdf():
+    # Imported on first PDF, not at startup
+    try:
+        import pymupdf
+    except ImportError:
+        try:
+            import fitz as pymupdf  # PyMuPDF < 1.24
+        except ImportError:
+            raise RuntimeError("PDF input needs PyMuPDF (pip install pymupdf)") from None
+    return pymupdf
+
+
+PDF_DPI = 300
+DOCUMENT_EXTENSIONS = ('.pdf', '.tif', '.tiff')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+
+def is_pdf(path):
+    return os.path.splitext(path)[1].lower() == '.pdf'
+
+
+def count_pages(path):
+    if is_pdf(path):
+        with _pymupdf().open(path) as pdf:
+            return pdf.page_count
+    with Image.open(path) as img:
+        return getattr(img, 'n_frames', 1)
+
+
+def iter_pages(path, dpi=PDF_DPI):
+    """Yield each page of ``path`` as an RGB/L PIL image, decoding one page at a time."""
+    if is_pdf(path):
+        with _pymupdf().open(path) as pdf:
+            for page in pdf:
+                with stage('decode'):
+                    pix = page.get_pixmap(dpi=dpi)
+                    mode = 'RGB' if pix.n >= 3 else 'L'
+                    image = Image.frombytes(mode, (pix.width, pix.height), pix.samples)
+                del pix
+                yield image
+        return
+
+    with Image.open(path) as img:
+        for frame in ImageSequence.Iterator(img):
+            # copy() detaches the page from the file so the next seek can't change it
+            with stage('decode'):
+                page = frame.convert('RGB') if frame.mode not in ('RGB', 'L') else frame.copy()
+            yield page
+
+
+def get_page(path, index, dpi=PDF_DPI):
+    """Page ``index`` (0-based) of ``path`` alone, for workers that each take one page."""
+    if is_pdf(path):
+        with _pymupdf().open(path) as pdf:
+            with stage('decode'):
+                pix = pdf[index].get_pixmap(dpi=dpi)
+                mode = 'RGB' if pix.n >= 3 else 'L'
+                return Image.frombytes(mode, (pix.width, pix.height), pix.samples)
+
+    with Image.open(path) as img:
+        with stage('decode'):
+            img.seek(index)
+            return img.convert('RGB') if img.mode not in ('RGB', 'L') else img.copy()
@@ -0,0 +1,320 @@
+import logging
+import re
+import time
+
+import numpy as np
+from PIL import Image
+
+from .tracing import stage
+
+# Pre-OCR normalization: shrink oversized photos to the resolution the text
+# actually needs, convert to grayscale, straighten small rotations and
+# binarize with a local (adaptive) threshold.
+#
+# The scale is picked from the measured text line height, so a 48MP phone
+# photo of a receipt ends up at roughly the same text size as a 300dpi scan.
+# JPEGs are decoded in draft mode (libjpeg's DCT scaling) straight to the
+# reduced size and to grayscale, so the full-resolution image is never built.
+#
+# Deskewing and binarizing cost more than Tesseract's own thresholding and
+# gain nothing on a scan that is already at text resolution, so they only
+# run on images that are being shrunk (scale below full_scale) and are
+# rotated by at least min_skew; the rotation isn't even estimated otherwise.
+#
+# The scale factor is written into the hOCR (tag_scale/read_scale) so the
+# pixel thresholds in the layout code can be rescaled to match, including
+# for results that come back from the OCR cache.
+
+logger = logging.getLogger(__name__)
+
+PROBE_WIDTH = 1000  # px; size of the low-res copy used for measurements
+SCALE_MARKER = re.compile(r"<!-- image2word-scale: ([\d.]+) -->")
+
+
+class PreprocessOptions:
+    def __init__(self, enabled=True, target_line_height=48, max_pixels=12_000_000, min_scale=0.2,
+                 grayscale=True, binarize=True, binarize_offset=0.15, deskew=True, max_skew=5.0, min_skew=0.5,
+                 skew_step=0.25, full_scale=0.9):
+        self.enabled = enabled
+        # Tesseract is most accurate with text lines around 40-50px tall
+        self.target_line_height = target_line_height
+        self.max_pixels = max_pixels
+        self.min_scale = min_scale
+        self.grayscale = grayscale
+        self.binarize = binarize
+        self.binarize_offset = binarize_offset
+        self.deskew = deskew
+        self.max_skew = max_skew
+        # Tesseract copes with smaller angles itself; not worth a full-page rotate
+        self.min_skew = min_skew
+        self.skew_step = skew_step
+        # Scales above this leave the image as it is: no resize, deskew or binarization
+        self.full_scale = full_scale
+
+    def signature(self):
+        # Everything that changes the OCR input, for cache keys
+        return dict(vars(self))
+
+
+DEFAULT_OPTIONS = PreprocessOptions()
+
+
+class PreprocessResult:
+    __slots__ = ('image', 'scale', 'stats')
+
+    def __init__(self, image, scale, stats):
+        self.image = image
+        self.scale = scale  # processed px per original px
+        self.stats = stats
+
+
+# MEASUREMENTS
+
+def otsu_ink_mask(gray_array):
+    # Global Otsu threshold; True where the pixel is darker than the threshold (ink)
+    hist = np.bincount(gray_array.ravel(), minlength=256).astype(np.float64)
+    levels = np.arange(256)
+    weight_bg = np.cumsum(hist)
+    weight_fg = weight_bg[-1] - weight_bg
+    mass = np.cumsum(hist * levels)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_bg = mass / weight_bg
+        mean_fg = (mass[-1] - mass) / weight_fg
+        between = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+    if np.isnan(between).all():
+        # Uniform image (e.g. a blank page): no ink at all
+        return np.zeros(gray_array.shape, dtype=bool)
+    threshold = int(np.nanargmax(between))
+    return gray_array <= threshold
+
+
+def estimate_skew(ink_mask, max_angle, step):
+    """Angle (degrees, PIL convention) that makes text rows most horizontal.
+
+    Projection-profile method: rotate the ink mask through candidate angles
+    and keep the one whose row sums change most sharply between rows. A 1
+    degree sweep is refined around the best angle down to ``step``.
+    """
+    if not ink_mask.any():
+        return 0.0
+    ink = Image.fromarray(ink_mask.astype(np.uint8) * 255)
+
+    def score(angle):
+        rotated = ink.rotate(angle, resample=Image.Resampling.NEAREST, fillcolor=0)
+        profile = np.asarray(rotated, dtype=np.float64).sum(axis=1)
+        return float(np.square(np.diff(profile)).sum())
+
+    coarse = max(step, 1.0)
+    candidates = np.arange(-max_angle, max_angle + coarse / 2, coarse)
+    best = max(candidates, key=score)
+    fine = np.arange(best - coarse + step, best + coarse - step / 2, step)
+    best = max(fine[np.abs(fine) <= max_angle], key=score, default=best)
+    return round(float(best), 4)
+
+
+def estimate_line_height(ink_mask, strips=8):
+    """Median height of text rows, from projection profiles of vertical strips.
+
+    Strips keep multi-column pages, margins and page edges from merging every
+    row into one tall run.
+    """
+    h, w = ink_mask.shape
+    bounds = np.linspace(0, w, strips + 1).astype(int)
+    runs = []
+    for left, right in zip(bounds[:-1], bounds[1:]):
+        if right - left < 2:
+            continue
+        row_ink = ink_mask[:, left:right].mean(axis=1) > 0.03
+        padded = np.concatenate(([False], row_ink, [False]))
+        edges = np.flatnonzero(padded[1:] != padded[:-1])
+        runs.append(edges[1::2] - edges[::2])
+    runs = np.concatenate(runs) if runs else np.empty(0, dtype=int)
+    runs = runs[(runs >= 2) & (runs <= h // 8)]
+    return float(np.median(runs)) if runs.size else None
+
+
+def analyze(probe, probe_factor, original_size, options):
+    # probe: small grayscale image; probe_factor: probe px per original px
+    # -> (scale, skew, line height in original px)
+    def line_height(ink_mask):
+        height = estimate_line_height(ink_mask)
+        return height / probe_factor if height else None
+
+    ink_mask = otsu_ink_mask(np.asarray(probe))
+    height = line_height(ink_mask)
+    scale = choose_scale(original_size, height, options)
+    skew = 0.0
+    if options.deskew and scale < options.full_scale:
+        skew = estimate_skew(ink_mask, options.max_skew, options.skew_step)
+        if abs(skew) < options.min_skew:
+            skew = 0.0
+    if skew:
+        # Rows measured on a rotated page come out too tall
+        straight = Image.fromarray(ink_mask.astype(np.uint8) * 255).rotate(skew, resample=Image.Resampling.NEAREST, fillcolor=0)
+        height = line_height(np.asarray(straight) > 0)
+        scale = choose_scale(original_size, height, options)
+        if scale >= options.full_scale:
+            skew = 0.0  # a rotated scan at text resolution after all: left as it is
+    return scale, skew, height
+
+
+def choose_scale(original_size, line_height, options):
+    scale = 1.0
+    if line_height:
+        scale = options.target_line_height / line_height
+    pixels = original_size[0] * original_size[1]
+    if pixels * scale * scale > options.max_pixels:
+        scale = (options.max_pixels / pixels) ** 0.5
+    elif scale >= options.full_scale:
+        return 1.0  # not worth resampling the whole image for a few percent
+    # Only ever shrink; upscaling small text is left to Tesseract
+    return max(options.min_scale, min(1.0, scale))
+
+
+# TRANSFORMS
+
+def adaptive_binarize(gray, offset):
+    """Bradley-Roth local mean threshold, computed with an integral image."""
+    a = np.asarray(gray)
+    h, w = a.shape
+    radius = max(7, w // 32)
+    integral = np.zeros((h + 1, w + 1), dtype=np.int64)
+    np.cumsum(np.cumsum(a, axis=0, dtype=np.int64), axis=1, out=integral[1:, 1:])
+
+    xs = np.arange(w)
+    x0, x1 = np.clip(xs - radius, 0, w), np.clip(xs + radius + 1, 0, w)
+    widths = (x1 - x0)[None, :]
+    keep = int(round((1 - offset) * 100))
+    out = np.empty((h, w), dtype=np.uint8)
+
+    # Row bands keep the temporary int64 arrays small on large pages
+    for top in range(0, h, 256):
+        ys = np.arange(top, min(h, top + 256))
+        y0, y1 = np.clip(ys - radius, 0, h), np.clip(ys + radius + 1, 0, h)
+        sums = (integral[np.ix_(y1, x1)] - integral[np.ix_(y0, x1)]
+                - integral[np.ix_(y1, x0)] + integral[np.ix_(y0, x0)])
+        counts = (y1 - y0)[:, None] * widths
+        # ink where pixel < local mean * (1 - offset)
+        ink = a[ys].astype(np.int64) * counts * 100 < sums * keep
+        out[ys] = np.where(ink, 0, 255)
+    return Image.fromarray(out)
+
+
+def on_white(image):
+    # Images with transparency composited onto white as RGB; transparent
+    # areas would otherwise turn black (and hide dark text) on conversion
+    if image.mode in ('RGBA', 'LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGBA', image.size, (255, 255, 255, 255))
+        return Image.alpha_composite(background, image).convert('RGB')
+    return image
+
+
+def to_grayscale(image):
+    return on_white(image).convert('L')
+
+
+def to_rgb(image):
+    image = on_white(image)
+    return image if image.mode == 'RGB' else image.convert('RGB')
+
+
+def make_probe(gray):
+    factor = min(1.0, PROBE_WIDTH / gray.width)
+    if factor >= 1.0:
+        return gray, 1.0
+    size = (max(1, round(gray.width * factor)), max(1, round(gray.height * factor)))
+    return gray.resize(size, Image.Resampling.BILINEAR), factor
+
+
+def finish(image, scale, skew, options, stats, timings):
+    # Bring a (possibly already reduced) image to the target scale, straighten, binarize
+    start = time.perf_counter()
+    if options.grayscale or options.binarize:
+        image = to_grayscale(image)
+    target = (max(1, round(stats['original_size'][0] * scale)), max(1, round(stats['original_size'][1] * scale)))
+    if image.size != target:
+        image = image.resize(target, Image.Resampling.LANCZOS, reducing_gap=3.0)
+    timings['resize'] = time.perf_counter() - start
+
+    if skew:
+        start = time.perf_counter()
+        fill = 255 if image.mode == 'L' else (255, 255, 255)
+        image = image.rotate(skew, resample=Image.Resampling.BILINEAR, fillcolor=fill)
+        timings['deskew'] = time.perf_counter() - start
+
+    # Only for shrunk images, and (unless deskewing is off) rotated ones; see above
+    if options.binarize and scale < options.full_scale and (skew or not options.deskew):
+        start = time.perf_counter()
+        image = adaptive_binarize(image, options.binarize_offset)
+        timings['binarize'] = time.perf_counter() - start
+
+    stats.update(processed_size=image.size, skew=skew,
+                 pixel_ratio=(stats['original_size'][0] * stats['original_size'][1]) / (image.width * image.height),
+                 seconds=sum(timings.values()), timings=timings)
+    logger.info("preprocess: %dx%d -> %dx%d (%.1fx fewer pixels, skew %.2f deg) in %.0f ms",
+                *stats['original_size'], *image.size, stats['pixel_ratio'], skew, stats['seconds'] * 1000)
+    return PreprocessResult(image, image.width / stats['original_size'][0], stats)
+
+
+def preprocess_image(image, options=DEFAULT_OPTIONS):
+    """Normalize an already decoded image (e.g. a PDF page) for OCR."""
+    if not options.enabled:
+        return PreprocessResult(image, 1.0, {'original_size': image.size, 'processed_size': image.size})
+
+    timings = {}
+    start = time.perf_counter()
+    gray = to_grayscale(image)
+    probe, probe_factor = make_probe(gray)
+    scale, skew, line_height = analyze(probe, probe_factor, image.size, options)
+    timings['analyze'] = time.perf_counter() - start
+
+    stats = {'original_size': image.size, 'line_height': line_height}
+    return finish(gray if options.grayscale or options.binarize else image, scale, skew, options, stats, timings)
+
+
+def preprocess_file(path, options=DEFAULT_OPTIONS):
+    """Decode and normalize an image file, using JPEG draft decoding when possible."""
+    if not options.enabled:
+        image = Image.open(path)
+        return PreprocessResult(image, 1.0, {'original_size': image.size, 'processed_size': image.size})
+
+    with Image.open(path) as img:
+        if img.format != 'JPEG':
+            with stage('decode'):
+                img.load()
+            return preprocess_image(img, options)
+        original_size = img.size
+
+    timings = {}
+    start = time.perf_counter()
+    # 1. Cheap low-res grayscale probe straight from the DCT coefficients
+    with Image.open(path) as probe:
+        probe.draft('L', (PROBE_WIDTH, PROBE_WIDTH * original_size[1] // original_size[0]))
+        probe = probe.convert('L')
+    probe, _ = make_probe(probe)
+    probe_factor = probe.width / original_size[0]
+    scale, skew, line_height = analyze(probe, probe_factor, original_size, options)
+    timings['analyze'] = time.perf_counter() - start
+
+    # 2. Decode at the smallest DCT scale that is still >= the target size
+    start = time.perf_counter()
+    img = Image.open(path)
+    target = (max(1, round(original_size[0] * scale)), max(1, round(original_size[1] * scale)))
+    img.draft('L' if options.grayscale or options.binarize else img.mode, target)
+    with stage('decode'):
+        img.load()
+    timings['decode'] = time.perf_counter() - start
+
+    stats = {'original_size': original_size, 'line_height': line_height}
+    return finish(img, scale, skew, options, stats, timings)
+
+
+def tag_scale(hocr, scale):
+    return f"<!-- image2word-scale: {scale:.6f} -->\n{hocr}"
+
+
+def read_scale(hocr):
+    # Scale of the image the hOCR coordinates refer to (1.0 if untagged)
+    match = SCALE_MARKER.search(hocr, 0, 200)
+    return float(match.group(1)) if match else 1.0
@@ -0,0 +1,200 @@
+import itertools
+
+# Reading order for word boxes, by recursive XY-cut.
+#
+# A region of the page is split at horizontal whitespace into bands (read
+# top to bottom) or, when it is a single band, at vertical whitespace
+# gutters into columns (read left to right), and each part is split again
+# until neither works. Every split sorts the region's boxes once and finds
+# the gaps with a running maximum, so a level of the cut tree costs
+# O(n log n), and it is all NumPy.
+#
+# Plain XY-cut reads two columns whose lines share a baseline grid row by
+# row whenever a paragraph break happens to line up across them. So
+# consecutive bands that have the same column gutters are merged back and
+# cut into columns together, and so is the end of the longest column when
+# a paragraph break there happens to be the first full-width gap below the
+# shorter ones: a band that fits between the gutters, less than TAIL_GAP
+# median word heights below. Cutting bands first keeps a centered title or
+# a page footer out of whichever column it happens to sit above or below.
+#
+# A gutter has to be at least COLUMN_GAP median word heights wide (wider
+# than any word space). Every column must be at least COLUMN_MIN_SHARE of
+# the region wide and COLUMN_MIN_WIDTH median word heights (about 15
+# characters), so the narrow price column of a receipt stays on its lines.
+# It must also hold COLUMN_MIN_LINES lines over at least COLUMN_MIN_HEIGHT
+# of the region's height, so a wide gap on a single form line ("Invoice
+# number 12345 ... Date 2024 January 15") is not a gutter. Parts that
+# fall short join their left neighbour. Only when bands are matched up
+# into a column run are short bands allowed to have gutters.
+#
+# Each leaf block knows the column it sits in (for centering) and, below a
+# column split, which section and column it belongs to, so the docx
+# renderers can lay that part of the page out as newspaper columns.
+
+COLUMN_GAP = 1.5  # median word heights
+BLOCK_GAP = 0.8  # median word heights; smaller horizontal gaps are line spacing
+COLUMN_MIN_SHARE = 0.15  # of the width of the region being split
+COLUMN_MIN_WIDTH = 10  # median word heights
+COLUMN_MIN_LINES = 3
+COLUMN_MIN_HEIGHT = 0.25  # of the height of the region being split
+TAIL_GAP = 2.5  # median word heights; a band further below a column run is not its tail
+
+
+class Block:
+    __slots__ = ('indices', 'left', 'right', 'section', 'column', 'columns')
+
+    def __init__(self, indices, left, right, section=None, column=0, columns=1):
+        self.indices = indices  # word indices, in no particular order
+        self.left = left  # the enclosing column (or the page's text area)
+        self.right = right
+        self.section = section  # id shared by the blocks of one column split, None outside one
+        self.column = column
+        self.columns = columns  # columns in the section
+
+    def __repr__(self):
+        return (f"Block({len(self.indices)} words, {self.left}-{self.right}, section={self.section}, "
+                f"column={self.column}/{self.columns})")
+
+
+def _split(starts, ends, min_gap):
+    # Sort intervals by start; -> (order, positions in order where at least
+    # min_gap of whitespace separates everything before from everything after)
+    import numpy as np
+
+    order = np.argsort(starts, kind='stable')
+    reach = np.maximum.accumulate(ends[order])
+    return order, np.flatnonzero(starts[order][1:] - reach[:-1] >= min_gap) + 1
+
+
+class XYCut:
+    def __init__(self, x, y, x2, y2, median_height):
+        self.x, self.y, self.x2, self.y2 = x, y, x2, y2
+        self.column_gap = COLUMN_GAP * median_height
+        self.block_gap = BLOCK_GAP * median_height
+        self.min_width = COLUMN_MIN_WIDTH * median_height
+        self.line_gap = median_height / 2  # between the tops of two lines
+        self.tail_gap = TAIL_GAP * median_height
+        self.sections = itertools.count()
+
+    def columns(self, indices, lines=True):
+        """Split ``indices`` into columns, left to right, or None.
+
+        lines: also require every column to have enough lines and height
+        (without, any wide enough part with a gutter beside it is a column).
+        """
+        import numpy as np
+
+        order, cuts = _split(self.x[indices], self.x2[indices], self.column_gap)
+        if not len(cuts):
+            return None
+        parts = np.split(indices[order], cuts)
+        lefts = [self.x[part].min() for part in parts]
+        rights = [self.x2[part].max() for part in parts]
+        min_width = max(self.min_width, COLUMN_MIN_SHARE * (max(rights) - min(lefts)))
+        min_height = COLUMN_MIN_HEIGHT * (self.y2[indices].max() - self.y[indices].min())
+
+        def too_small(part, left, right):
+            if right - left < min_width:
+                return True
+            if not lines:
+                return False
+            return (self.y2[part].max() - self.y[part].min() < min_height
+                    or self.line_count(part) < COLUMN_MIN_LINES)
+
+        # Parts too small join their left neighbour (a small first part, the second)
+        columns = []
+        for part, left, right in zip(parts, lefts, rights):
+            if columns and (too_small(part, left, right) or too_small(*columns[-1])):
+                merged, first, _ = columns[-1]
+                columns[-1] = (np.concatenate((merged, part)), first, right)
+            else:
+                columns.append((part, left, right))
+        return columns if len(columns) > 1 else None
+
+    def line_count(self, indices):
+        # Distinct line tops, roughly
+        import numpy as np
+
+        return 1 + int(np.count_nonzero(np.diff(np.sort(self.y[indices])) >= self.line_gap))
+
+    def bands(self, indices):
+        import numpy as np
+
+        order, cuts = _split(self.y[indices], self.y2[indices], self.block_gap)
+        return np.split(indices[order], cuts)
+
+    def runs(self, bands):
+        # Consecutive bands split into the same columns (and their tails), as lists of bands
+        runs, previous = [], None
+        for band in bands:
+            columns = self.columns(band, lines=False)
+            if previous and columns and self.same_gutters(previous, columns):
+                runs[-1].append(band)
+                previous = columns
+            elif (previous and self.y[band].min() - self.y2[runs[-1][-1]].max() < self.tail_gap
+                  and self.fits(previous, band)):
+                runs[-1].append(band)
+            else:
+                runs.append([band])
+                previous = columns
+        return runs
+
+    def fits(self, columns, band):
+        # No word of the band reaches into a gutter between the columns
+        x, x2 = self.x[band], self.x2[band]
+        for (_, _, right), (_, left, _) in zip(columns, columns[1:]):
+            if ((x2 > right) & (x < left)).any():
+                return False
+        return True
+
+    def blocks(self, indices, left, right):
+        """Leaf blocks of ``indices`` in reading order."""
+        import numpy as np
+
+        out = []
+        # (indices, left, right, section, column, columns in section, its bands if known)
+        stack = [(indices, left, right, None, 0, 1, None)]
+        while stack:
+            indices, left, right, section, column, count, bands = stack.pop()
+            if bands is None:
+                bands = self.bands(indices)
+                if len(bands) > 1:
+                    stack.extend((np.concatenate(run), left, right, section, column, count, run)
+                                 for run in reversed(self.runs(bands)))
+                    continue
+
+            columns = self.columns(indices)
+            if columns:
+                if section is None:
+                    section, count = next(self.sections), len(columns)
+                    children = [(part, lo, hi, section, i, count, None) for i, (part, lo, hi) in enumerate(columns)]
+                else:
+                    # Columns inside a column: read in order, no nested sections
+                    children = [(part, lo, hi, section, column, count, None) for part, lo, hi in columns]
+                stack.extend(reversed(children))
+            elif len(bands) > 1:
+                # Bands whose gutters drifted apart: one after the other
+                stack.extend((band, left, right, section, column, count, [band]) for band in reversed(bands))
+            else:
+                out.append(Block(indices, left, right, section, column, count))
+        return out
+
+    def same_gutters(self, a, b):
+        # Both splits have the same number of columns and each pair of
+        # gutters still leaves a gutter where they overlap
+        if len(a) != len(b):
+            return False
+        for (_, _, a_right), (_, a_left, _), (_, _, b_right), (_, b_left, _) in zip(a, a[1:], b, b[1:]):
+            if min(a_left, b_left) - max(a_right, b_right) < self.column_gap:
+                return False
+        return True
+
+
+def reading_order(x, y, x2, y2, median_height):
+    """Split word boxes (NumPy columns) into Blocks in reading order."""
+    import numpy as np
+
+    if not len(x):
+        return []
+    return XYCut(x, y, x2, y2, median_height).blocks(np.arange(len(x)), x.min(), x2.max())
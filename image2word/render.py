@@ -0,0 +1,113 @@
+from html import escape
+
+# Lightweight renderers for laid-out pages (see layout.py): escaped HTML,
+# markdown and the Tk preview. Output is collected in a list and joined
+# once, so rendering stays linear in the size of the page.
+
+PREVIEW_STYLE = "background-color: #ffffff; color: #ffffff; padding: 20px; font-family: monospace; border-radius: 5px;"
+# Headers remain light blue for distinction
+HEADER_SPAN_STYLE = "font-size: 1.3em; font-weight: bold; color: #62a1ff;"
+# Longest Tk text segment; keeps a single insert (see tk_preview.py) short
+MAX_SEGMENT_CHARS = 4096
+
+
+def render_html(paragraphs, out=None):
+    """HTML for a page of Paragraphs, every piece of text escaped.
+
+    With ``out`` (a list) the pieces are appended to it and it is returned
+    unjoined, so several pages can share one builder.
+    """
+    parts = [] if out is None else out
+    for paragraph in paragraphs:
+        if not paragraph.runs:
+            parts.append("<br>")
+            continue
+        if paragraph.heading:
+            level = min(paragraph.heading, 6)
+            parts.append(f"<h{level}>{escape(paragraph.text)}</h{level}>")
+            continue
+        parts.append("<div style='text-align: center;'>" if paragraph.centered else "<div>")
+        for run in paragraph.runs:
+            text = escape(run.text)
+            if paragraph.header:
+                text = f"<span style='{HEADER_SPAN_STYLE}'>{text}</span>"
+            if run.bold:
+                text = f"<b>{text}</b>"
+            if run.italic:
+                text = f"<i>{text}</i>"
+            parts.append(text)
+        parts.append("</div>")
+    return "".join(parts) if out is None else parts
+
+
+def preview_html(paragraphs):
+    """render_html() inside the container the Gradio preview uses."""
+    parts = [f"<div style='{PREVIEW_STYLE}'>"]
+    render_html(paragraphs, parts)
+    parts.append("</div>")
+    return "".join(parts)
+
+
+def render_markdown(paragraphs):
+    """Markdown for a page of Paragraphs; header lines become ``#`` headings."""
+    lines = []
+    for paragraph in paragraphs:
+        if not paragraph.runs:
+            lines.append("")
+        elif paragraph.heading or paragraph.header:
+            lines.append("#" * (paragraph.heading or 1) + " " + paragraph.text)
+        else:
+            parts = []
+            for run in paragraph.runs:
+                # Markers go around the words, not the space that joins them
+                body = run.text.lstrip(" ")
+                if body and run.bold:
+                    body = f"**{body}**"
+                if body and run.italic:
+                    body = f"*{body}*"
+                parts.append(run.text[:len(run.text) - len(run.text.lstrip(" "))] + body)
+            lines.append("".join(parts))
+    return "\n".join(lines)
+
+
+def merge_segments(segments, max_chars=MAX_SEGMENT_CHARS):
+    """Join adjacent ``(text, tags)`` segments that share tags, up to ``max_chars`` each."""
+    pending, pending_tags, size = [], None, 0
+    for text, tags in segments:
+        if pending and (tags != pending_tags or size >= max_chars):
+            yield "".join(pending), pending_tags
+            pending, size = [], 0
+        pending_tags = tags
+        pending.append(text)
+        size += len(text)
+    if pending:
+        yield "".join(pending), pending_tags
+
+
+def tk_segments(paragraphs):
+    """``(text, tags)`` segments for a page of Paragraphs in a Tk text widget.
+
+    Uses the tags "header", "bold", "italic" and "center", which the
+    widget's owner configures. Adjacent runs with the same tags (and the
+    line ends between them) come out as one segment.
+    """
+    def pieces():
+        for paragraph in paragraphs:
+            if not paragraph.runs:
+                yield "\n", ()
+                continue
+            tags = ("center",) if paragraph.centered else ()
+            header = ("header",) if paragraph.header or paragraph.heading else ()
+            for run in paragraph.runs:
+                yield run.text, tags + (("bold",) if run.bold else ()) + (("italic",) if run.italic else ()) + header
+            yield "\n", tags
+    return merge_segments(pieces())
+
+
+def render_tk(textbox, paragraphs):
+    """Insert a page of Paragraphs at the end of a Tk text widget in one call."""
+    args = []
+    for text, tags in tk_segments(paragraphs):
+        args += (text, tags)
+    if args:
+        textbox.insert("end", *args)
@@ -0,0 +1,187 @@
+import asyncio
+import functools
+import itertools
+import logging
+import math
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Admission control for the Gradio servers.
+#
+# The conversion handlers are coroutines on the server's event loop, so they
+# must not block it: the CPU-bound (Tesseract) or blocking-I/O (Gemini SDK)
+# part of a request runs on the scheduler's executor through call() or
+# stream(). A Scheduler lets at most ``concurrency`` requests run and at most
+# ``max_waiting`` more wait, served in arrival order. A request that finds
+# the line full is turned away at once with ServerBusy instead of queueing
+# without bound, so latency and memory stay bounded under load. While it
+# waits, a request can show its place in line and an estimated wait, from a
+# moving average of recent service times. A request that runs several
+# things at once (a batch) reserves that many slots of ``concurrency``.
+#
+# Tesseract gets a process pool sized to the cores (one request per
+# process), Gemini a thread pool sized to its concurrency cap. Everything
+# but call() and stream() must be used from the event loop thread.
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WAITING = int(os.getenv("IMAGE2WORD_MAX_QUEUE", "16"))
+SERVICE_SMOOTHING = 0.2  # weight of the newest request in the service time average
+
+
+class ServerBusy(Exception):
+    pass
+
+
+class Ticket:
+    """One request's place in a Scheduler; use as ``async with scheduler.admit() as ticket:``."""
+
+    def __init__(self, scheduler, slots=1):
+        self.scheduler = scheduler
+        self.slots = slots
+        self.running = False
+        self.started = None
+        self.wakeup = asyncio.Event()
+
+    @property
+    def position(self):
+        # 1-based place in the waiting line, 0 once running
+        return 0 if self.running else self.scheduler.waiting.index(self) + 1
+
+    async def positions(self):
+        """Yield the ticket's place in line whenever it changes, until the request may run."""
+        while True:
+            self.wakeup.clear()
+            if self.running:
+                return
+            yield self.position
+            await self.wakeup.wait()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        # Also reached when the client goes away while waiting (the handler is cancelled)
+        self.scheduler.release(self)
+
+
+class Scheduler:
+    """Runs at most ``concurrency`` requests at once with at most ``max_waiting`` in line.
+
+    processes: run call() in a process pool (functions and arguments must be
+    picklable) instead of a thread pool.
+    """
+
+    def __init__(self, name, concurrency, max_waiting=DEFAULT_MAX_WAITING, processes=False):
+        self.name = name
+        self.concurrency = max(1, int(concurrency))
+        self.max_waiting = max(0, int(max_waiting))
+        self.processes = processes
+        self.executor = None
+        self.waiting = deque()
+        self.running = 0
+        self.service = None  # seconds per request, moving average
+        self.rejected = 0
+
+    def start(self):
+        """Create the executor; for processes, bring the workers up now.
+
+        Call before the server starts its threads, so pool workers are not
+        forked from a process with other threads running.
+        """
+        if self.executor is None:
+            if self.processes:
+                self.executor = ProcessPoolExecutor(max_workers=self.concurrency)
+                self.executor.submit(os.getpid)  # with fork, the first submit starts every worker
+            else:
+                self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix=self.name)
+        return self
+
+    def admit(self, slots=1):
+        """A Ticket for a new request; raises ServerBusy if the line is full.
+
+        slots: how many of the ``concurrency`` slots the request keeps busy
+        (capped at ``concurrency``).
+        """
+        if self.running >= self.concurrency and len(self.waiting) >= self.max_waiting:
+            self.rejected += 1
+            logger.warning("%s: turned a request away (%d running, %d waiting)",
+                           self.name, self.running, len(self.waiting))
+            raise ServerBusy(f"The server is busy ({self.running} conversions running, "
+                             f"{len(self.waiting)} waiting). Please try again in a minute.")
+        ticket = Ticket(self, min(max(1, int(slots)), self.concurrency))
+        self.waiting.append(ticket)
+        self._dispatch()
+        return ticket
+
+    def release(self, ticket):
+        if ticket.running:
+            ticket.running = False
+            self.running -= ticket.slots
+            seconds = time.monotonic() - ticket.started
+            self.service = seconds if self.service is None else (
+                SERVICE_SMOOTHING * seconds + (1 - SERVICE_SMOOTHING) * self.service)
+        elif ticket in self.waiting:
+            self.waiting.remove(ticket)
+        else:
+            return
+        self._dispatch()
+        for waiting in self.waiting:
+            waiting.wakeup.set()  # everyone behind moved up
+
+    def _dispatch(self):
+        # In arrival order: a request waits until its slots are all free
+        while self.waiting and self.running + self.waiting[0].slots <= self.concurrency:
+            ticket = self.waiting.popleft()
+            ticket.running = True
+            ticket.started = time.monotonic()
+            self.running += ticket.slots
+            ticket.wakeup.set()
+
+    def estimate(self, position):
+        """Expected seconds until the request at ``position`` starts, or None before the first one finished."""
+        if self.service is None:
+            return None
+        slots = sum(ticket.slots for ticket in itertools.islice(self.waiting, position))
+        return self.service * math.ceil(slots / self.concurrency)
+
+    def describe(self, position):
+        # "Queued: 3 of 5, about 20 s"
+        text = f"Queued: {position} of {len(self.waiting)}"
+        wait = self.estimate(position)
+        if wait is not None:
+            text += f", about {wait:.0f} s"
+        return text
+
+    async def call(self, fn, *args):
+        """``fn(*args)`` on the executor, awaited without blocking the loop."""
+        executor = self.start().executor
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, functools.partial(fn, *args))
+        except BrokenProcessPool:
+            # A worker died (e.g. tesseract crashed it); the next request gets a fresh pool
+            if self.executor is executor:
+                logger.warning("%s: worker process died, restarting the pool", self.name)
+                executor.shutdown(wait=False)
+                self.executor = None
+            raise RuntimeError("the OCR worker process exited unexpectedly") from None
+
+    async def stream(self, iterable):
+        """Iterate a blocking iterator, each step on the executor (thread pools only)."""
+        self.start()
+        loop = asyncio.get_running_loop()
+        iterator = iter(iterable)
+        end = object()
+        while True:
+            item = await loop.run_in_executor(self.executor, next, iterator, end)
+            if item is end:
+                return
+            yield item
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
@@ -0,0 +1,135 @@
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from .tracing import metrics
+
+# Managed output directory for the Gradio servers.
+#
+# The apps build every result in memory; only what a gr.File output needs
+# as a path is written here, once. Files are removed TTL seconds after they
+# were written, and the oldest go first whenever the directory would grow
+# past MAX_BYTES, so a long-running server's disk use stays bounded. A
+# daemon thread sweeps expired files every SWEEP_SECONDS; files left over
+# from an earlier run are picked up at startup and expire the same way.
+# Size, file count and evictions are exported with the /metrics histograms.
+
+logger = logging.getLogger(__name__)
+
+SPOOL_DIR = os.getenv("IMAGE2WORD_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "image2word_spool"))
+MAX_BYTES = int(os.getenv("IMAGE2WORD_SPOOL_MAX_BYTES", str(512 * 1024 * 1024)))
+TTL = int(os.getenv("IMAGE2WORD_SPOOL_TTL", "3600"))  # seconds a download stays available
+SWEEP_SECONDS = 60
+
+
+class Spool:
+    def __init__(self, directory=SPOOL_DIR, max_bytes=MAX_BYTES, ttl=TTL, sweep_seconds=SWEEP_SECONDS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sweep_seconds = sweep_seconds
+        self._files = OrderedDict()  # path -> (size, written at), oldest first
+        self._bytes = 0
+        self._evictions = {'ttl': 0, 'size': 0}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._load_index()
+
+    def _load_index(self):
+        os.makedirs(self.directory, exist_ok=True)
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.path, stat.st_size))
+        for written, path, size in sorted(entries):
+            self._files[path] = (size, written)
+            self._bytes += size
+
+    def write(self, data, name):
+        """Store ``data`` as a file named after ``name`` (e.g. "converted_doc.docx"); returns its path."""
+        stem, ext = os.path.splitext(name)
+        path = os.path.join(self.directory, f"{stem}_{os.urandom(4).hex()}{ext}")
+        with open(path, 'wb') as f:
+            f.write(data)
+        with self._lock:
+            self._files[path] = (len(data), time.time())
+            self._bytes += len(data)
+            evicted = []
+            while self._bytes > self.max_bytes and len(self._files) > 1:
+                evicted.append(self._pop_oldest())
+            self._evictions['size'] += len(evicted)
+        self._remove(evicted)
+        return path
+
+    def sweep(self):
+        """Remove every expired file; returns how many."""
+        deadline = time.time() - self.ttl
+        with self._lock:
+            evicted = []
+            while self._files and next(iter(self._files.values()))[1] < deadline:
+                evicted.append(self._pop_oldest())
+            self._evictions['ttl'] += len(evicted)
+        self._remove(evicted)
+        return len(evicted)
+
+    def _pop_oldest(self):
+        path, (size, _) = self._files.popitem(last=False)
+        self._bytes -= size
+        return path
+
+    def _remove(self, paths):
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass  # already gone (a manual clean-up, another server sharing the directory)
+
+    def start(self):
+        """Sweep in a daemon thread until stop()."""
+        threading.Thread(target=self._sweeper, name='spool-sweeper', daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _sweeper(self):
+        while not self._stop.wait(self.sweep_seconds):
+            try:
+                if self.sweep():
+                    logger.info("spool: %d files, %d bytes after sweep", len(self._files), self._bytes)
+            except Exception:
+                logger.exception("spool sweep failed")
+
+    def collect(self):
+        # Prometheus lines for tracing.metrics
+        with self._lock:
+            files, size, evictions = len(self._files), self._bytes, dict(self._evictions)
+        out = ["# HELP image2word_spool_bytes Size of the files waiting to be downloaded.",
+               "# TYPE image2word_spool_bytes gauge",
+               f"image2word_spool_bytes {size}",
+               "# HELP image2word_spool_files Files waiting to be downloaded.",
+               "# TYPE image2word_spool_files gauge",
+               f"image2word_spool_files {files}",
+               "# HELP image2word_spool_evictions_total Files removed from the spool, by reason.",
+               "# TYPE image2word_spool_evictions_total counter"]
+        for reason, count in sorted(evictions.items()):
+            out.append(f'image2word_spool_evictions_total{{reason="{reason}"}} {count}')
+        return out
+
+
+_spool = None
+_spool_lock = threading.Lock()
+
+
+def get_spool():
+    """The process-wide Spool, with its sweeper running and its metrics registered."""
+    global _spool
+    with _spool_lock:
+        if _spool is None:
+            _spool = Spool().start()
+            metrics.add_collector(_spool.collect)
+    return _spool
@@ -0,0 +1,124 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from .page_source import is_pdf, iter_pages
+from .tracing import stage
+
+# Off-thread, cached image previews for the desktop apps.
+#
+# Decoding a phone photo at full size and resizing it on the Tk main thread
+# freezes the window for about a second, so PreviewLoader does the work on
+# a single background thread and the app shows a placeholder meanwhile.
+# JPEGs are decoded in draft mode (libjpeg's DCT scaling) and other formats
+# are box-reduced before the LANCZOS resize, so the full-size image is
+# never built for a thumbnail. Thumbnails are cached by path, mtime and
+# size, so picking the same file again costs nothing.
+#
+# An app that also needs the image itself for OCR (the Gemini upload) asks
+# for the source too: it is decoded once, at most about SOURCE_SIDE px on
+# the long side, and the thumbnail is made from it.
+
+THUMBNAIL_HEIGHT = 400
+SOURCE_SIDE = 3072  # gemini_payload.MAX_SIDE: the upload is never larger
+PDF_PREVIEW_DPI = 72
+CACHE_ENTRIES = 32
+
+
+class Preview:
+    __slots__ = ('path', 'thumbnail', 'source')
+
+    def __init__(self, path, thumbnail, source=None):
+        self.path = path
+        self.thumbnail = thumbnail
+        self.source = source  # decoded image for OCR, when asked for
+
+
+def file_key(path):
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_mtime_ns, stat.st_size
+
+
+def decode_reduced(path, size):
+    """Decode ``path`` to at least ``size`` (w, h) where possible, without the full-size image."""
+    img = Image.open(path)
+    if img.format == 'JPEG':
+        img.draft(None, size)
+    factor = min(img.width // size[0], img.height // size[1])
+    with stage('decode'):
+        img.load()
+        if factor >= 2:
+            img = img.reduce(factor)
+    return img
+
+
+def thumbnail_size(size, height=THUMBNAIL_HEIGHT):
+    return max(1, round(height * size[0] / size[1])), height
+
+
+def make_thumbnail(image, size=None):
+    # size from the original image: a reduced decode may be off by a pixel.
+    # reducing_gap box-reduces first, the final LANCZOS pass is on a small image
+    return image.resize(size or thumbnail_size(image.size), Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+
+def fit(size, long_side):
+    # (w, h) scaled so the longer side is long_side (never enlarged)
+    w, h = size
+    factor = min(1.0, long_side / max(w, h))
+    return max(1, int(w * factor)), max(1, int(h * factor))
+
+
+class PreviewLoader:
+    """Builds previews on a background thread; ``load()`` returns a Future of a Preview."""
+
+    def __init__(self, entries=CACHE_ENTRIES):
+        self.entries = entries
+        self.cache = OrderedDict()  # file_key -> thumbnail, least recently used first
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='preview')
+
+    def cached(self, path):
+        """The cached thumbnail for ``path`` as it is now, or None. Cheap enough for the UI thread."""
+        try:
+            key = file_key(path)
+        except OSError:
+            return None
+        with self.lock:
+            thumbnail = self.cache.get(key)
+            if thumbnail is not None:
+                self.cache.move_to_end(key)
+            return thumbnail
+
+    def load(self, path, source=False):
+        """Thumbnail for ``path`` (first page of a PDF), plus the decoded image if ``source``."""
+        return self.executor.submit(self.build, path, source)
+
+    def build(self, path, source=False):
+        key = file_key(path)
+        thumbnail = None if source else self.cached(path)
+        if thumbnail is not None:
+            return Preview(path, thumbnail)
+
+        image = None
+        if is_pdf(path):
+            thumbnail = make_thumbnail(next(iter_pages(path, dpi=PDF_PREVIEW_DPI)))
+        else:
+            with Image.open(path) as probe:
+                original = probe.size
+            size = thumbnail_size(original)
+            if source:
+                image = decode_reduced(path, fit(original, SOURCE_SIDE))
+                thumbnail = make_thumbnail(image, size)
+            else:
+                thumbnail = make_thumbnail(decode_reduced(path, size), size)
+
+        with self.lock:
+            self.cache[key] = thumbnail
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.entries:
+                self.cache.popitem(last=False)
+        return Preview(path, thumbnail, image)
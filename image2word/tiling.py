@@ -0,0 +1,99 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .hocr_parser import parse_hocr, words_to_hocr
+from .preprocess import make_probe, otsu_ink_mask
+
+# Tiled OCR for very large single pages. The page is cut into horizontal
+# bands at whitespace rows, the bands (plus a small overlap) are OCR'd in
+# parallel, and the word boxes are shifted back into page coordinates. A
+# word seen by two bands is kept only by the band whose core (the part
+# between its own cuts) contains the word's vertical centre.
+#
+# Threads are enough for parallelism: pytesseract waits on a subprocess and
+# tesserocr releases the GIL while recognizing.
+
+TILE_MIN_PIXELS = 6_000_000  # pages smaller than this are OCR'd in one go
+MIN_BAND_HEIGHT = 800  # px
+BAND_OVERLAP = 40  # px added above and below each band
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+
+def should_tile(image, workers=DEFAULT_WORKERS):
+    return workers > 1 and image.width * image.height >= TILE_MIN_PIXELS and image.height >= 2 * MIN_BAND_HEIGHT
+
+
+def find_band_cuts(image, bands):
+    """Return up to ``bands + 1`` row positions (first 0, last height) splitting the page at whitespace.
+
+    Each cut starts at an even split and moves to the nearest run of
+    ink-free rows (within half a band) that is at least half as tall as the
+    widest such run.
+    """
+    height = image.height
+    probe, factor = make_probe(image.convert('L'))
+    row_ink = otsu_ink_mask(np.asarray(probe)).mean(axis=1)
+    blank = row_ink <= max(0.002, float(np.percentile(row_ink, 5)))
+    padded = np.concatenate(([False], blank, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    gaps = list(zip(edges[::2], edges[1::2]))  # [start, end) in probe rows
+
+    cuts = [0]
+    band = height / bands
+    for i in range(1, bands):
+        ideal = i * band
+        nearby = [(start, end) for start, end in gaps
+                  if abs((start + end) / 2 / factor - ideal) <= band / 2]
+        best = None
+        if nearby:
+            longest = max(end - start for start, end in nearby)
+            candidates = [(start + end) / 2 for start, end in nearby if end - start >= longest / 2]
+            best = min(candidates, key=lambda middle: abs(middle / factor - ideal))
+        cut = int(best / factor) if best is not None else int(ideal)
+        if cut - cuts[-1] >= MIN_BAND_HEIGHT // 2:
+            cuts.append(cut)
+    cuts.append(height)
+    return cuts
+
+
+def merge_band_words(band_results, cuts):
+    """Shift band words into page coordinates and drop duplicates from the overlaps."""
+    merged = []
+    id_offsets = [0, 0, 0]  # block, par, line
+    for index, (top, words) in enumerate(band_results):
+        core_top, core_bottom = cuts[index], cuts[index + 1]
+        max_ids = [0, 0, 0]
+        for word in words:
+            max_ids = [max(max_ids[0], word.block), max(max_ids[1], word.par), max(max_ids[2], word.line)]
+            word.y += top
+            word.y2 += top
+            centre = (word.y + word.y2) / 2
+            if not core_top <= centre < core_bottom:
+                continue
+            word.block += id_offsets[0]
+            word.par += id_offsets[1]
+            word.line += id_offsets[2]
+            merged.append(word)
+        id_offsets = [offset + n for offset, n in zip(id_offsets, max_ids)]
+    return merged
+
+
+def tiled_image_to_hocr(engine, image, workers=DEFAULT_WORKERS):
+    """OCR ``image`` in parallel horizontal bands and return page-level hOCR."""
+    bands = max(1, min(workers, image.height // MIN_BAND_HEIGHT))
+    cuts = find_band_cuts(image, bands)
+    boxes = [(max(0, cuts[i] - BAND_OVERLAP), min(image.height, cuts[i + 1] + BAND_OVERLAP))
+             for i in range(len(cuts) - 1)]
+
+    def run(box):
+        top, bottom = box
+        band = image.crop((0, top, image.width, bottom))
+        return top, parse_hocr(engine.image_to_hocr(band))
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(boxes))) as pool:
+        band_results = list(pool.map(run, boxes))
+
+    words = merge_band_words(band_results, cuts)
+    return words_to_hocr(words, image.width, image.height)
@@ -0,0 +1,128 @@
+import time
+from collections import deque
+
+from .render import merge_segments, tk_segments
+
+# Incremental rendering for the desktop preview panes (tk.Text widgets).
+#
+# Inserting a long document into a Text widget in one go blocks the Tk main
+# loop until it is done, so the window freezes. TextPreview queues the text
+# as (text, tags) segments instead and inserts them in steps scheduled with
+# after(): a step inserts batches of segments (one Tcl call per batch) until
+# it has used CHUNK_BUDGET, then hands control back to the event loop so the
+# window redraws and handles input between steps.
+#
+# Only the part of the document in view, plus MARGIN_LINES below it, is
+# materialized. The rest stays queued until the view is scrolled or resized
+# towards it, so a 200-page result costs no more up front than one page.
+# Nothing here imports tkinter; the widget is passed in.
+
+CHUNK_BUDGET = 0.008  # seconds: half a 60 Hz frame, the other half is for redrawing
+BATCH_SEGMENTS = 64
+MARGIN_LINES = 200
+
+TAG_STYLES = {
+    "header": {"font": ("Roboto", 14, "bold"), "foreground": "#62a1ff"},
+    "bold": {"font": ("Roboto", 11, "bold")},
+    "italic": {"font": ("Roboto", 11, "italic")},
+    "center": {"justify": "center"},
+}
+
+
+class TextPreview:
+    """Feeds a tk.Text widget from a queue, a time-boxed chunk at a time.
+
+    The widget is kept disabled (read-only) between steps. With ``follow``
+    the end of the text is kept in view, as for streamed output; that
+    materializes everything as it arrives.
+    """
+
+    def __init__(self, textbox, follow=False):
+        self.textbox = textbox
+        self.follow = follow
+        self.pending = deque()
+        self.lines = 1  # lines materialized in the widget
+        self.job = None
+        self.markdown_header = None  # header-ness of the unfinished streamed line, None at a line start
+
+        for tag, style in TAG_STYLES.items():
+            textbox.tag_config(tag, **style)
+        # Scrolling and resizing can bring queued text into view
+        textbox.configure(yscrollcommand=self.on_view_change)
+        textbox.bind("<Configure>", self.on_view_change, add="+")
+
+    def clear(self, message=None):
+        """Drop everything shown and queued, then show ``message`` if given."""
+        if self.job is not None:
+            self.textbox.after_cancel(self.job)
+            self.job = None
+        self.pending.clear()
+        self.lines = 1
+        self.markdown_header = None
+        self.textbox.configure(state="normal")
+        self.textbox.delete("1.0", "end")
+        if message:
+            self.textbox.insert("1.0", message)
+            self.lines += message.count("\n")
+        self.textbox.configure(state="disabled")
+
+    def append(self, paragraphs, page_break=False):
+        """Queue a page of laid-out Paragraphs (see layout.py)."""
+        if page_break:
+            self.pending.append(("\n", ()))
+        self.pending.extend(tk_segments(paragraphs))
+        self.schedule()
+
+    def append_markdown(self, text):
+        """Queue streamed markdown text; lines starting with '#' get the header tag.
+
+        ``text`` may begin or end in the middle of a line.
+        """
+        header = self.markdown_header
+        lines = text.split("\n")
+        segments = []
+        for number, line in enumerate(lines):
+            if header is None and line:
+                header = line.startswith("#")
+            piece = line if number == len(lines) - 1 else line + "\n"
+            if piece:
+                segments.append((piece, ("header",) if header else ()))
+            if piece.endswith("\n"):
+                header = None
+        self.markdown_header = header
+        self.pending.extend(merge_segments(segments))
+        self.schedule()
+
+    def on_view_change(self, *args):
+        self.schedule()
+
+    def wanted(self):
+        # True while the view plus the margin reaches past what is materialized
+        if self.follow:
+            return True
+        bottom = self.textbox.index(f"@0,{self.textbox.winfo_height()}")
+        return self.lines < int(bottom.split(".")[0]) + MARGIN_LINES
+
+    def schedule(self):
+        if self.job is None and self.pending and self.wanted():
+            # 1 ms rather than 0 so pending redraws run between steps
+            self.job = self.textbox.after(1, self.step)
+
+    def step(self):
+        self.job = None
+        textbox = self.textbox
+        deadline = time.perf_counter() + CHUNK_BUDGET
+        textbox.configure(state="normal")
+        while self.pending and self.wanted():
+            args = []
+            for _ in range(min(BATCH_SEGMENTS, len(self.pending))):
+                text, tags = self.pending.popleft()
+                args += (text, tags)
+                self.lines += text.count("\n")
+            textbox.insert("end", *args)
+            if time.perf_counter() >= deadline:
+                break
+        textbox.configure(state="disabled")
+        if self.follow:
+            textbox.see("end")
+        self.schedule()
@@ -0,0 +1,254 @@
+import contextvars
+import cProfile
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+# Per-conversion stage timings.
+#
+# An app creates one Trace per conversion job and runs its synchronous work
+# inside ``with trace.active():``. Code anywhere below (ocr_engine,
+# preprocess, gemini_client, ...) marks its stages with the module-level
+# ``with stage('ocr'):``, which is a no-op when no trace is active. Nested
+# stages are subtracted from their parent, so every stage reports its own
+# (self) time and the stages add up to the job total.
+#
+# Generators (the streaming Gradio handlers) may resume on another thread,
+# so they activate the trace around each synchronous step instead of across
+# a yield, and call finish() at the end.
+#
+# Finished traces are logged as one line each and folded into Prometheus
+# style histograms; set IMAGE2WORD_METRICS_PORT to serve them over HTTP.
+# Other modules can add their own lines with metrics.add_collector().
+# Set IMAGE2WORD_PROFILE_SLOW_MS to run every job under cProfile and keep
+# the .prof files (in IMAGE2WORD_PROFILE_DIR) of jobs slower than that.
+# Python 3.12+ allows one active profiler per process, so a job that starts
+# while another one is being profiled runs unprofiled instead of failing.
+
+logger = logging.getLogger(__name__)
+
+STAGES = ('decode', 'preprocess', 'ocr', 'encode', 'gemini', 'parse', 'layout', 'docx', 'save')
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+METRICS_PORT = os.getenv("IMAGE2WORD_METRICS_PORT")
+PROFILE_SLOW_MS = float(os.getenv("IMAGE2WORD_PROFILE_SLOW_MS", "0")) or None
+PROFILE_DIR = os.getenv("IMAGE2WORD_PROFILE_DIR", os.path.join(tempfile.gettempdir(), "image2word_profiles"))
+
+_current = contextvars.ContextVar('image2word_trace', default=None)
+_profiler_busy_logged = False
+
+
+def _enable(profile):
+    # True if ``profile`` is now collecting
+    global _profiler_busy_logged
+    try:
+        profile.enable()
+        return True
+    except ValueError:  # "Another profiling tool is already active"
+        if not _profiler_busy_logged:
+            _profiler_busy_logged = True
+            logger.info("trace: another job is being profiled; overlapping jobs run unprofiled")
+        return False
+
+
+class Trace:
+    def __init__(self, app, job='convert'):
+        self.app = app
+        self.job = job
+        self.durations = {}  # stage -> self time in seconds
+        self.started = time.perf_counter()
+        self.total = None
+        self.ok = True
+        self._stack = []  # [stage, start, child seconds] of the open stages
+        self._lock = threading.Lock()
+        self._profile = cProfile.Profile() if PROFILE_SLOW_MS else None
+        self._profiled = False  # collected anything
+
+    @contextmanager
+    def active(self):
+        """Make this the trace that ``stage()`` records into, for the enclosed block."""
+        token = _current.set(self)
+        profiling = self._profile is not None and _enable(self._profile)
+        self._profiled |= profiling
+        try:
+            yield self
+        except BaseException:
+            self.ok = False
+            raise
+        finally:
+            if profiling:
+                self._profile.disable()
+            _current.reset(token)
+
+    @contextmanager
+    def stage(self, name):
+        frame = [name, time.perf_counter(), 0.0]
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - frame[1]
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1][2] += elapsed
+            self.add(name, elapsed - frame[2])
+
+    def add(self, name, seconds):
+        # For time measured elsewhere (e.g. in a worker process)
+        with self._lock:
+            self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+    def summary(self):
+        # "1234 ms (ocr 900, parse 12, ...)" in pipeline order
+        order = sorted(self.durations, key=lambda s: STAGES.index(s) if s in STAGES else len(STAGES))
+        parts = ", ".join(f"{name} {self.durations[name] * 1000:.0f}" for name in order)
+        total = self.total if self.total is not None else time.perf_counter() - self.started
+        return f"{total * 1000:.0f} ms ({parts})"
+
+    def finish(self, ok=None):
+        if self.total is not None:
+            return self
+        if ok is not None:
+            self.ok = ok
+        self.total = time.perf_counter() - self.started
+        logger.info("trace %s/%s %s: %s", self.app, self.job, "ok" if self.ok else "failed", self.summary())
+        metrics.observe(self)
+        if self._profiled and self.total * 1000 >= PROFILE_SLOW_MS:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            path = os.path.join(PROFILE_DIR, f"{self.app}_{self.job}_{time.strftime('%Y%m%d-%H%M%S')}_"
+                                             f"{os.urandom(2).hex()}.prof")
+            self._profile.dump_stats(path)
+            logger.info("trace %s/%s: slow job profile saved to %s", self.app, self.job, path)
+        return self
+
+
+@contextmanager
+def stage(name):
+    """Time ``name`` into the active trace, if there is one."""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    with trace.stage(name):
+        yield
+
+
+class Histogram:
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += value
+        self.count += 1
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages = {}  # (app, stage) -> Histogram
+        self.jobs = {}  # (app, job) -> Histogram
+        self.outcomes = {}  # (app, job, status) -> count
+        self.collectors = []  # functions returning more exposition lines (see add_collector)
+
+    def add_collector(self, collect):
+        """Have ``collect()`` append its own lines (e.g. gauges) to every render()."""
+        with self._lock:
+            self.collectors.append(collect)
+
+    def observe(self, trace):
+        with self._lock:
+            for name, seconds in trace.durations.items():
+                self.stages.setdefault((trace.app, name), Histogram()).observe(seconds)
+            self.jobs.setdefault((trace.app, trace.job), Histogram()).observe(trace.total)
+            key = (trace.app, trace.job, "ok" if trace.ok else "failed")
+            self.outcomes[key] = self.outcomes.get(key, 0) + 1
+
+    def render(self):
+        """Prometheus text exposition format."""
+        out = []
+        with self._lock:
+            out += _render_histogram('image2word_stage_seconds', "Self time per pipeline stage.",
+                                     ('app', 'stage'), self.stages)
+            out += _render_histogram('image2word_job_seconds', "End-to-end conversion time.",
+                                     ('app', 'job'), self.jobs)
+            out.append("# HELP image2word_jobs_total Finished conversions.")
+            out.append("# TYPE image2word_jobs_total counter")
+            for (app, job, status), count in sorted(self.outcomes.items()):
+                out.append(f'image2word_jobs_total{{app="{app}",job="{job}",status="{status}"}} {count}')
+            collectors = list(self.collectors)
+        for collect in collectors:
+            out += collect()
+        return "\n".join(out) + "\n"
+
+
+def _render_histogram(name, help_text, label_names, histograms):
+    out = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for key, histogram in sorted(histograms.items()):
+        labels = ",".join(f'{label}="{value}"' for label, value in zip(label_names, key))
+        for bound, count in zip(BUCKETS, histogram.counts):
+            out.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+        out.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+        out.append(f'{name}_sum{{{labels}}} {histogram.total:.6f}')
+        out.append(f'{name}_count{{{labels}}} {histogram.count}')
+    return out
+
+
+metrics = Metrics()
+
+
+def _metrics_handler():
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip('/') not in ('', '/metrics'):
+                self.send_error(404)
+                return
+            body = metrics.render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return MetricsHandler
+
+
+def start_metrics_server(port=METRICS_PORT):
+    """Serve /metrics on ``port`` in a daemon thread; does nothing if no port is configured."""
+    if not port:
+        return None
+    from http.server import ThreadingHTTPServer
+    server = ThreadingHTTPServer(('0.0.0.0', int(port)), _metrics_handler())
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info("metrics on http://0.0.0.0:%s/metrics", port)
+    return server
+
+
+def traced(trace, iterable):
+    """Iterate ``iterable`` with ``trace`` active during each step.
+
+    For generators that yield to the UI: every step runs synchronously, so
+    the trace is active exactly while the wrapped generator is working.
+    """
+    iterator = iter(iterable)
+    while True:
+        with trace.active():
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
@@ -3,16 +3,25 @@ import tkinter as tk
 from tkinter import filedialog, messagebox, simpledialog
 from PIL import Image
 import os
-import threading
 import time
 import base64
 from io import BytesIO
-import google.generativeai as genai
 
-from docx import Document
-from docx.shared import Pt
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-import re
+from image2word.cli import expand_inputs
+from image2word.docx_builder import markdown_to_docx, new_document
+from image2word.gemini_client import LineBuffer, stream_markdown
+from image2word.gemini_payload import DEFAULT_ENCODING
+from image2word.jobs import CANCELLED, DONE, FAILED, RUNNING, JobQueue
+from image2word.ocr_cache import get_cache, image_digest, make_key
+from image2word.page_source import DOCUMENT_EXTENSIONS, count_pages, iter_pages
+from image2word.thumbnails import PreviewLoader
+from image2word.tk_preview import TextPreview
+from image2word.tracing import stage
+
+MODEL_NAME = 'gemini-2.5-flash'
+PROMPT = "Extract the text from this image. Return the content in Markdown format. Use headers (#) for big text, bold (**) for bold text. Do not include markdown code block fences. Just return the raw text."
+# Files converted at once; each mostly waits on its own Gemini stream
+JOB_WORKERS = 4
 
 # Set the theme
 ctk.set_appearance_mode("Dark")
@@ -32,12 +41,23 @@ class TechyOCRApp(ctk.CTk):
 
         # Variables
         self.image_path = None
-        self.current_doc_object = None 
+        self.selected_paths = []  # Loaded files, queued by 'INITIALIZE AI'
+        self.previews = PreviewLoader()  # Thumbnails, built off the UI thread
+        self.preview_future = None  # Preview (and decoded image) of the picked file
+        self.preview_path = None
+        # Conversions run on worker threads (they mostly wait on Gemini); results stay on their Job until saved
+        self.jobs = JobQueue(self.convert_job, workers=JOB_WORKERS, on_change=self.on_job_change,
+                             app='ocr_gemini_app')
+        self.job_rows = {}  # job number -> (job, label, button)
+        self.selected_job = None  # Job shown in the preview and saved by 'DOWNLOAD DOCX'
+        self.shown_chunks = 0  # Markdown chunks of selected_job already in the preview
+        self.ticking = False
 
         self.api_key = os.getenv("OPENAI_API_KEY") 
         
         self.setup_sidebar()
         self.setup_main_area()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
 
         # Check API Key on launch
         if not self.api_key:
@@ -54,7 +74,7 @@ class TechyOCRApp(ctk.CTk):
         """Left panel with controls"""
         self.sidebar_frame = ctk.CTkFrame(self, width=200, corner_radius=0)
         self.sidebar_frame.grid(row=0, column=0, sticky="nsew")
-        self.sidebar_frame.grid_rowconfigure(5, weight=1)
+        self.sidebar_frame.grid_rowconfigure(6, weight=1)
 
         # Logo
         self.logo_label = ctk.CTkLabel(self.sidebar_frame, text="Image 2\nWord", 
@@ -68,28 +88,34 @@ class TechyOCRApp(ctk.CTk):
                                      border_width=2, border_color="#1f538d")
         self.btn_load.grid(row=1, column=0, padx=20, pady=10)
 
+        self.btn_folder = ctk.CTkButton(self.sidebar_frame, text="QUEUE FOLDER", 
+                                       command=self.select_folder, 
+                                       fg_color="#2b2b2b", hover_color="#3a3a3a", 
+                                       border_width=2, border_color="#1f538d")
+        self.btn_folder.grid(row=2, column=0, padx=20, pady=10)
+
         self.btn_convert = ctk.CTkButton(self.sidebar_frame, text="INITIALIZE AI", 
-                                        command=self.start_conversion_thread, state="disabled",
+                                        command=self.queue_conversion, state="disabled",
                                         fg_color="#1f538d", hover_color="#14375e")
-        self.btn_convert.grid(row=2, column=0, padx=20, pady=10)
+        self.btn_convert.grid(row=3, column=0, padx=20, pady=10)
 
         self.btn_save = ctk.CTkButton(self.sidebar_frame, text="DOWNLOAD DOCX", 
                                      command=self.save_document, state="disabled",
                                      fg_color="#27ae60", hover_color="#2ecc71")
-        self.btn_save.grid(row=3, column=0, padx=20, pady=10)
+        self.btn_save.grid(row=4, column=0, padx=20, pady=10)
 
         # Progress Bar
         self.progress_bar = ctk.CTkProgressBar(self.sidebar_frame, width=150)
-        self.progress_bar.grid(row=4, column=0, padx=20, pady=(10, 20))
+        self.progress_bar.grid(row=5, column=0, padx=20, pady=(10, 20))
         self.progress_bar.set(0)
         self.progress_bar.grid_remove()
 
         # Appearance Mode
         self.appearance_mode_label = ctk.CTkLabel(self.sidebar_frame, text="Interface Mode:", anchor="w")
-        self.appearance_mode_label.grid(row=6, column=0, padx=20, pady=(10, 0))
+        self.appearance_mode_label.grid(row=7, column=0, padx=20, pady=(10, 0))
         self.appearance_mode_optionemenu = ctk.CTkOptionMenu(self.sidebar_frame, values=["Dark", "Light"],
                                                                command=self.change_appearance_mode_event)
-        self.appearance_mode_optionemenu.grid(row=7, column=0, padx=20, pady=(10, 20))
+        self.appearance_mode_optionemenu.grid(row=8, column=0, padx=20, pady=(10, 20))
 
     def setup_main_area(self):
         self.main_frame = ctk.CTkFrame(self, corner_radius=0, fg_color="transparent")
@@ -124,186 +150,275 @@ class TechyOCRApp(ctk.CTk):
                                padx=15, pady=15, wrap="word")
         
         self.textbox.pack(fill="both", expand=True, padx=2, pady=(0, 10))
-        self.textbox.insert("1.0", "System Idle.\nWaiting for input stream...")
-        self.textbox.configure(state="disabled")
+        # Streamed text is inserted a chunk at a time, keeping the end in view
+        self.preview = TextPreview(self.textbox, follow=True)
+        self.preview.clear("System Idle.\nWaiting for input stream...")
+
+        # Job Queue: one row per file, click a row to preview it
+        self.jobs_frame = ctk.CTkScrollableFrame(self.main_frame, height=120, corner_radius=10, label_text="JOBS",
+                                                 label_font=ctk.CTkFont(size=12, weight="bold"))
+        self.jobs_frame.grid(row=1, column=0, columnspan=2, sticky="ew", pady=(20, 0))
 
         # Status Footer
         self.status_label = ctk.CTkLabel(self.main_frame, text="STATUS: READY", anchor="w", text_color="#00ff00")
-        self.status_label.grid(row=1, column=0, columnspan=2, sticky="ew", pady=(10, 0))
+        self.status_label.grid(row=2, column=0, columnspan=2, sticky="ew", pady=(10, 0))
 
     # LOGIC & EVENTS
     def change_appearance_mode_event(self, new_appearance_mode: str):
         ctk.set_appearance_mode(new_appearance_mode)
 
     def select_image(self):
-        filename = filedialog.askopenfilename(filetypes=(("Images", "*.jpg;*.png;*.jpeg;*.webp"),))
-        if filename:
-            self.image_path = filename
-            self.display_image(filename)
+        filenames = filedialog.askopenfilenames(filetypes=(("Images", "*.jpg;*.png;*.jpeg;*.webp"),
+                                                           ("Documents", "*.pdf;*.tif;*.tiff")))
+        if filenames:
+            self.selected_paths = list(filenames)
+            self.image_path = filenames[0]
+            self.display_image(filenames[0], source=True)
             self.btn_convert.configure(state="normal")
-            self.btn_save.configure(state="disabled")
-            self.status_label.configure(text=f"STATUS: IMAGE LOADED", text_color="cyan")
-            self.textbox.configure(state="normal")
-            self.textbox.delete("1.0", "end")
-            self.textbox.insert("1.0", ">> Image loaded.\n>> Press 'INITIALIZE AI' to send to Gemini 2.5")
-            self.textbox.configure(state="disabled")
-
-    def display_image(self, path):
-        img = Image.open(path)
-        target_h = 400
-        aspect = img.width / img.height
-        new_w = int(target_h * aspect)
-        
-        img = img.resize((new_w, target_h), Image.Resampling.LANCZOS)
-        self.ctk_image = ctk.CTkImage(light_image=img, dark_image=img, size=(new_w, target_h))
+            self.status_label.configure(text=f"STATUS: {len(filenames)} FILE(S) LOADED", text_color="cyan")
+            self.preview.clear(">> Image loaded.\n>> Press 'INITIALIZE AI' to send to Gemini 2.5" if len(filenames) == 1 else
+                               f">> {len(filenames)} files loaded.\n>> Press 'INITIALIZE AI' to queue them.")
+
+    def select_folder(self):
+        folder = filedialog.askdirectory()
+        if folder:
+            paths = [path for path, _ in expand_inputs([folder])]
+            if not paths:
+                messagebox.showinfo("Empty Folder", "No images or documents found in that folder.")
+                return
+            self.queue_paths(paths)
+
+    def display_image(self, path, source=False):
+        # Decoded and resized on a background thread (cached per file); placeholder meanwhile.
+        # With source, a single image's decoded picture is kept for the upload, so it is read only once.
+        thumbnail = self.previews.cached(path)
+        if thumbnail is not None:
+            self.show_thumbnail(thumbnail)
+        else:
+            self.lbl_image_preview.configure(image=None, text="Loading preview...")
+        if thumbnail is not None and not source:
+            return
+        future = self.previews.load(path, source=source and not path.lower().endswith(DOCUMENT_EXTENSIONS))
+        future.add_done_callback(lambda f: self.after(0, lambda: self.preview_ready(path, f)))
+        if source:
+            self.preview_future, self.preview_path = future, path
+
+    def preview_ready(self, path, future):
+        if path != self.image_path:
+            return  # another file was picked meanwhile
+        try:
+            self.show_thumbnail(future.result().thumbnail)
+        except Exception as e:
+            self.lbl_image_preview.configure(image=None, text=f"Preview unavailable: {e}")
+
+    def show_thumbnail(self, img):
+        self.ctk_image = ctk.CTkImage(light_image=img, dark_image=img, size=img.size)
         self.lbl_image_preview.configure(image=self.ctk_image, text="")
 
-    def start_conversion_thread(self):
+    def queue_conversion(self):
+        self.btn_convert.configure(state="disabled")  # until more files are loaded
+        self.queue_paths(self.selected_paths)
+
+    def queue_paths(self, paths):
         if not self.api_key:
             messagebox.showerror("Error", "No API Key found.")
             self.prompt_api_key()
             return
 
-        self.btn_convert.configure(state="disabled")
-        self.btn_load.configure(state="disabled")
-        self.btn_save.configure(state="disabled")
-        self.progress_bar.grid()
-        self.progress_bar.start()
-        
-        threading.Thread(target=self.run_ocr_process, daemon=True).start()
+        # The picked file's decoded image goes with its job, paired here on the Tk thread
+        preview_path, preview_future = self.preview_path, self.preview_future
+        jobs = [self.jobs.submit(path, preview_future if path == preview_path else None) for path in paths]
+        self.update_status(f"{len(jobs)} FILE(S) QUEUED", "yellow")
+        # Follow the new work unless a finished result is being looked at
+        if self.selected_job is None or not self.selected_job.is_finished:
+            self.select_job(jobs[0])
 
     # --- REPLACED OCR LOGIC WITH GPT LOGIC ---
     def encode_image(self, image_path):
         with open(image_path, "rb") as image_file:
             return base64.b64encode(image_file.read()).decode('utf-8')
 
-    def run_ocr_process(self):
-        try:
-            self.update_status("Configuring Gemini AI...", "yellow")
-            
-            # Configure the Google API
-            genai.configure(api_key=self.api_key)
-            
-            # Load the Model
-            model = genai.GenerativeModel('gemini-2.5-flash')
-            
-            self.update_status("Processing Image...", "orange")
-            
-            # Load image directly with PIL (Google handles PIL images natively)
-            img = Image.open(self.image_path)
-            
-            # The Prompt
-            prompt = "Extract the text from this image. Return the content in Markdown format. Use headers (#) for big text, bold (**) for bold text. Do not include markdown code block fences. Just return the raw text."
-            
-            # Send to Gemini
-            response = model.generate_content([prompt, img])
-            
-            # Get text
-            result_text = response.text
-            
-            self.update_status("Compiling Document...", "orange")
-            
-            # Generate Doc Object from the Markdown String
-            self.current_doc_object = self.markdown_to_docx(result_text)
-            
-            # Pass the raw text to completion for display
-            self.after(0, lambda text=result_text: self.conversion_complete(text))
-            
-        except Exception as e:
-            # Convert 'e' to a string immediately
-            error_msg = str(e)
-            self.after(0, lambda: self.conversion_failed(error_msg))
+    def convert_job(self, path, report, preview=None):
+        # Runs on a job worker thread (see jobs.py). Pages are streamed into
+        # the document, and through report() into the preview, as Gemini
+        # writes them; multi-page input keeps one decoded page in memory.
+        doc = new_document()
+        if path.lower().endswith(DOCUMENT_EXTENSIONS):
+            total = count_pages(path)
+            for number, page in enumerate(iter_pages(path), start=1):
+                report(number - 1, total)
+                key = make_key(image_digest(page), engine='gemini', model=MODEL_NAME, prompt=PROMPT,
+                               encoding=DEFAULT_ENCODING.signature())
+                if number > 1:
+                    doc.add_page_break()
+                self.stream_page(key, page, doc, report)
+        else:
+            total = 1
+            report(0, total)
+            # Keyed by pixels like every other Gemini front end, so they share cache entries
+            image = self.source_image(path, preview)
+            key = make_key(image_digest(image), engine='gemini', model=MODEL_NAME, prompt=PROMPT,
+                           encoding=DEFAULT_ENCODING.signature())
+            self.stream_page(key, image, doc, report)
+        report(total, total)
+
+        # Stored in memory until the user saves it
+        buffer = BytesIO()
+        with stage('save'):
+            doc.save(buffer)
+        return buffer.getvalue()
+
+    def stream_page(self, key, img, doc, report):
+        # Appends one page's markdown to doc, and reports it for the preview, as it arrives.
+        # img is a decoded page. Cached results come back as a single chunk.
+        cache = get_cache()
+        cached = cache.get(key)
+        chunks = [cached] if cached is not None else self.call_gemini(img)
+        
+        lines = LineBuffer()
+        for chunk in chunks:
+            with stage('docx'):
+                self.markdown_to_docx(lines.feed(chunk), doc=doc)
+            report(item=chunk)  # also where a cancelled job stops
+        with stage('docx'):
+            self.markdown_to_docx(lines.flush(), doc=doc)
+        report(item="\n")
+        
+        if cached is None:
+            cache.put(key, lines.text)
+
+    def call_gemini(self, img):
+        # Shared client for this key; the image is downscaled and compressed before upload
+        return stream_markdown(self.api_key, MODEL_NAME, PROMPT, img)
 
     def update_status(self, text, color):
         color_map = {"yellow": "#f1c40f", "orange": "#e67e22", "red": "#e74c3c", "green": "#2ecc71"}
         self.after(0, lambda: self.status_label.configure(text=f"STATUS: {text}", text_color=color_map.get(color, "white")))
 
-    def conversion_complete(self, raw_text):
-        self.progress_bar.stop()
-        self.progress_bar.grid_remove()
-        self.btn_load.configure(state="normal")
-        self.btn_convert.configure(state="normal")
-        self.btn_save.configure(state="normal")
-        
-        self.update_status("COMPLETED. READY TO DOWNLOAD.", "green")
-        
-        # Display preview
-        self.display_text_result(raw_text)
-        messagebox.showinfo("Success", "AI Conversion Complete!")
+    def source_image(self, path, preview=None):
+        # Decoded once when the file was picked (see display_image), if it was;
+        # preview is that file's preview future, taken when the job was queued
+        with stage('decode'):
+            if preview is not None:
+                source = preview.result().source
+                if source is not None:
+                    return source
+            return Image.open(path)
+
+    # JOB QUEUE
+    def on_job_change(self, job):
+        # Called on a worker thread; widgets are only touched on the Tk thread
+        self.after(0, lambda: self.refresh_job(job))
+
+    def refresh_job(self, job):
+        if job.number not in self.job_rows:
+            self.add_job_row(job)
+        _, label, button = self.job_rows[job.number]
+        label.configure(text=f"{job.name}   {job.describe()}")
+        if job.state == DONE:
+            button.configure(text="SAVE", command=lambda: self.save_job(job),
+                             fg_color="#27ae60", hover_color="#2ecc71")
+        elif job.is_finished:
+            button.pack_forget()
+        if job is self.selected_job:
+            self.show_job(job)
+        self.update_activity()
+
+    def add_job_row(self, job):
+        row = ctk.CTkFrame(self.jobs_frame, fg_color="transparent")
+        row.pack(fill="x", pady=2)
+        label = ctk.CTkLabel(row, text=job.name, anchor="w", cursor="hand2")
+        label.pack(side="left", fill="x", expand=True, padx=(5, 10))
+        label.bind("<Button-1>", lambda event: self.select_job(job))
+        button = ctk.CTkButton(row, text="CANCEL", width=80, command=lambda: self.jobs.cancel(job),
+                               fg_color="#c0392b", hover_color="#e74c3c")
+        button.pack(side="right", padx=5)
+        self.job_rows[job.number] = (job, label, button)
+
+    def select_job(self, job):
+        self.selected_job = job
+        self.shown_chunks = 0
+        self.preview.clear()
+        if job.path != self.image_path:
+            self.image_path = job.path
+            self.display_image(job.path)
+        self.show_job(job)
+
+    def show_job(self, job):
+        # Text is previewed as it streams in
+        chunks = job.partial[self.shown_chunks:]
+        for chunk in chunks:
+            self.preview.append_markdown(chunk)
+        self.shown_chunks += len(chunks)
+
+        self.btn_save.configure(state="normal" if job.state == DONE else "disabled")
+        if job.state == DONE:
+            # Real per-stage timing of this job, e.g. "1234 ms (encode 40, gemini 5200, docx 30)"
+            self.update_status(f"{job.name} COMPLETED IN {job.timing}. READY TO DOWNLOAD.", "green")
+        elif job.state == FAILED:
+            self.update_status(f"ERROR: {job.name}: {job.error}", "red")
+        elif job.state == CANCELLED:
+            self.update_status(f"{job.name} CANCELLED", "orange")
+        elif job.state == RUNNING:
+            self.update_status(f"Processing {job.name} ({job.describe()})...", "orange")
+        else:
+            self.update_status(f"{job.name} QUEUED", "yellow")
+
+    def update_activity(self):
+        # Progress bar, and a twice-a-second refresh of the elapsed times, while jobs are active
+        active = any(not job.is_finished for job, _, _ in self.job_rows.values())
+        if active and not self.ticking:
+            self.ticking = True
+            self.progress_bar.grid()
+            self.progress_bar.start()
+            self.after(500, self.tick)
+        elif not active and self.ticking:
+            self.ticking = False
+            self.progress_bar.stop()
+            self.progress_bar.grid_remove()
+
+    def tick(self):
+        if not self.ticking:
+            return
+        for job, label, _ in self.job_rows.values():
+            if job.state == RUNNING:
+                label.configure(text=f"{job.name}   {job.describe()}")
+        self.after(500, self.tick)
 
-    def conversion_failed(self, error_msg):
-        self.progress_bar.stop()
-        self.progress_bar.grid_remove()
-        self.btn_load.configure(state="normal")
-        self.btn_convert.configure(state="normal")
-        self.update_status(f"ERROR: {error_msg}", "red")
+    def save_job(self, job):
+        self.select_job(job)
+        self.save_document()
 
     def save_document(self):
-        if not self.current_doc_object:
+        job = self.selected_job
+        if job is None or job.state != DONE:
             return
             
         file_path = filedialog.asksaveasfilename(
             defaultextension=".docx",
             filetypes=[("Word Document", "*.docx")],
-            initialfile=f"GPT_Converted_{os.path.basename(self.image_path).split('.')[0]}.docx"
+            initialfile=f"GPT_Converted_{os.path.basename(job.path).split('.')[0]}.docx"
         )
         
         if file_path:
             try:
-                self.current_doc_object.save(file_path)
+                # The document was built by the job; saving is just writing it out
+                with open(file_path, 'wb') as f:
+                    f.write(job.result)
+                self.update_status(f"SAVED {job.name}", "green")
                 messagebox.showinfo("Saved", f"File saved successfully at:\n{file_path}")
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to save file: {e}")
 
+    def on_close(self):
+        # Jobs still waiting on Gemini are abandoned, not waited for
+        self.jobs.close()
+        self.destroy()
+
     # FORMATTING LOGIC (Markdown -> Docx)
-    def markdown_to_docx(self, text):
-        doc = Document()
-        lines = text.split('\n')
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-                
-            # Header Handling (# Header)
-            if line.startswith('#'):
-                level = line.count('#')
-                clean_text = line.replace('#', '').strip()
-                p = doc.add_heading(clean_text, level=min(level, 3) if level < 9 else 1)
-                p.alignment = WD_ALIGN_PARAGRAPH.LEFT
-            else:
-                # Standard Paragraph with simple Bold parsing
-                p = doc.add_paragraph()
-                
-                # Very basic markdown bold parser (**text**)
-                # Splitting by ** gives: ["Regular ", "Bold", " Regular"]
-                parts = re.split(r'(\*\*.*?\*\*)', line)
-                for part in parts:
-                    if part.startswith('**') and part.endswith('**'):
-                        run = p.add_run(part[2:-2])
-                        run.bold = True
-                    else:
-                        p.add_run(part)
-                
-                p.style = doc.styles['Normal']
-                
-        return doc
-
-    def display_text_result(self, raw_text):
-        self.textbox.configure(state="normal")
-        self.textbox.delete("1.0", "end")
-        
-        # Configure Tags
-        self.textbox.tag_config("header", font=("Roboto", 14, "bold"), foreground="#62a1ff")
-        
-        lines = raw_text.split('\n')
-        for line in lines:
-            if line.startswith('#'):
-                self.textbox.insert("end", line + "\n", "header")
-            else:
-                self.textbox.insert("end", line + "\n")
-        
-        self.textbox.configure(state="disabled")
+    def markdown_to_docx(self, text, doc=None):
+        # Pass an existing doc to append to it (used for multi-page input)
+        return markdown_to_docx(text, doc=doc, max_heading=3)
 
 if __name__ == "__main__":
     app = TechyOCRApp()
@@ -1,19 +1,24 @@
 import customtkinter as ctk
 import tkinter as tk
 from tkinter import filedialog, messagebox
-from PIL import Image, ImageTk
-import pytesseract
-from docx import Document
-from docx.shared import Pt
-from docx.enum.text import WD_ALIGN_PARAGRAPH
+from PIL import ImageTk
 import os
-import re
-import threading
-import time
+
+from image2word.cli import expand_inputs
+from image2word.convert import tesseract_job
+from image2word.jobs import CANCELLED, DONE, FAILED, RUNNING, JobQueue
+from image2word.thumbnails import PreviewLoader
+from image2word.tk_preview import TextPreview
 
 # If Tesseract is not in your PATH, uncomment and update:
+# import pytesseract
 # pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
 
+# Files converted at once, each in its own process; half the cores are left for the UI
+JOB_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+# With several files at once big pages aren't also split across threads (see tiling.py)
+TILE_WORKERS = 1 if JOB_WORKERS > 1 else (os.cpu_count() or 1)
+
 # Set the theme
 ctk.set_appearance_mode("Dark")
 ctk.set_default_color_theme("blue")
@@ -32,16 +37,25 @@ class TechyOCRApp(ctk.CTk):
 
         # Variables
         self.image_path = None
-        self.current_doc_object = None  # Store the doc in memory before saving
+        self.selected_paths = []  # Loaded files, queued by 'INITIALIZE OCR'
+        self.previews = PreviewLoader()  # Thumbnails, built off the UI thread
+        # Conversions run in worker processes; results stay on their Job until saved
+        self.jobs = JobQueue(tesseract_job, args=(TILE_WORKERS,), workers=JOB_WORKERS, processes=True,
+                             on_change=self.on_job_change, app='ocr_tesseract_app')
+        self.job_rows = {}  # job number -> (job, label, button)
+        self.selected_job = None  # Job shown in the preview and saved by 'DOWNLOAD DOCX'
+        self.shown_pages = 0  # Pages of selected_job already in the preview
+        self.ticking = False
         
         self.setup_sidebar()
         self.setup_main_area()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
 
     def setup_sidebar(self):
         """Left panel with controls"""
         self.sidebar_frame = ctk.CTkFrame(self, width=200, corner_radius=0)
         self.sidebar_frame.grid(row=0, column=0, sticky="nsew")
-        self.sidebar_frame.grid_rowconfigure(5, weight=1) # Push bottom items down
+        self.sidebar_frame.grid_rowconfigure(6, weight=1) # Push bottom items down
 
         # Logo
         self.logo_label = ctk.CTkLabel(self.sidebar_frame, text="IMAGE 2\nWORD", 
@@ -55,29 +69,35 @@ class TechyOCRApp(ctk.CTk):
                                      border_width=2, border_color="#1f538d")
         self.btn_load.grid(row=1, column=0, padx=20, pady=10)
 
+        self.btn_folder = ctk.CTkButton(self.sidebar_frame, text="QUEUE FOLDER", 
+                                       command=self.select_folder, 
+                                       fg_color="#2b2b2b", hover_color="#3a3a3a", 
+                                       border_width=2, border_color="#1f538d")
+        self.btn_folder.grid(row=2, column=0, padx=20, pady=10)
+
         self.btn_convert = ctk.CTkButton(self.sidebar_frame, text="INITIALIZE OCR", 
-                                        command=self.start_conversion_thread, state="disabled",
+                                        command=self.queue_conversion, state="disabled",
                                         fg_color="#1f538d", hover_color="#14375e")
-        self.btn_convert.grid(row=2, column=0, padx=20, pady=10)
+        self.btn_convert.grid(row=3, column=0, padx=20, pady=10)
 
         # SAVE BUTTON (Initially Disabled)
         self.btn_save = ctk.CTkButton(self.sidebar_frame, text="DOWNLOAD DOCX", 
                                      command=self.save_document, state="disabled",
                                      fg_color="#27ae60", hover_color="#2ecc71")
-        self.btn_save.grid(row=3, column=0, padx=20, pady=10)
+        self.btn_save.grid(row=4, column=0, padx=20, pady=10)
 
         # Progress Bar
         self.progress_bar = ctk.CTkProgressBar(self.sidebar_frame, width=150)
-        self.progress_bar.grid(row=4, column=0, padx=20, pady=(10, 20))
+        self.progress_bar.grid(row=5, column=0, padx=20, pady=(10, 20))
         self.progress_bar.set(0)
         self.progress_bar.grid_remove()
 
         # Appearance Mode
         self.appearance_mode_label = ctk.CTkLabel(self.sidebar_frame, text="Interface Mode:", anchor="w")
-        self.appearance_mode_label.grid(row=6, column=0, padx=20, pady=(10, 0))
+        self.appearance_mode_label.grid(row=7, column=0, padx=20, pady=(10, 0))
         self.appearance_mode_optionemenu = ctk.CTkOptionMenu(self.sidebar_frame, values=["Dark", "Light"],
                                                                        command=self.change_appearance_mode_event)
-        self.appearance_mode_optionemenu.grid(row=7, column=0, padx=20, pady=(10, 20))
+        self.appearance_mode_optionemenu.grid(row=8, column=0, padx=20, pady=(10, 20))
 
     def setup_main_area(self):
         # Right panel with split view (Image | Text)
@@ -114,213 +134,191 @@ class TechyOCRApp(ctk.CTk):
                                padx=15, pady=15, wrap="word")
         
         self.textbox.pack(fill="both", expand=True, padx=2, pady=(0, 10))
-        self.textbox.insert("1.0", "System Idle.\nWaiting for input stream...")
-        self.textbox.configure(state="disabled")
+        # Results are inserted a chunk at a time, and only as far as they are scrolled into view
+        self.preview = TextPreview(self.textbox)
+        self.preview.clear("System Idle.\nWaiting for input stream...")
+
+        # Job Queue: one row per file, click a row to preview it
+        self.jobs_frame = ctk.CTkScrollableFrame(self.main_frame, height=120, corner_radius=10, label_text="JOBS",
+                                                 label_font=ctk.CTkFont(size=12, weight="bold"))
+        self.jobs_frame.grid(row=1, column=0, columnspan=2, sticky="ew", pady=(20, 0))
 
         # Status Footer
         self.status_label = ctk.CTkLabel(self.main_frame, text="STATUS: READY", anchor="w", text_color="#00ff00")
-        self.status_label.grid(row=1, column=0, columnspan=2, sticky="ew", pady=(10, 0))
+        self.status_label.grid(row=2, column=0, columnspan=2, sticky="ew", pady=(10, 0))
 
     # LOGIC & EVENTS
     def change_appearance_mode_event(self, new_appearance_mode: str):
         ctk.set_appearance_mode(new_appearance_mode)
 
     def select_image(self):
-        filename = filedialog.askopenfilename(filetypes=(("Images", "*.jpg;*.png;*.jpeg"),))
-        if filename:
-            self.image_path = filename
-            self.display_image(filename)
+        filenames = filedialog.askopenfilenames(filetypes=(("Images", "*.jpg;*.png;*.jpeg"),
+                                                           ("Documents", "*.pdf;*.tif;*.tiff")))
+        if filenames:
+            self.selected_paths = list(filenames)
+            self.image_path = filenames[0]
+            self.display_image(filenames[0])
             self.btn_convert.configure(state="normal")
-            self.btn_save.configure(state="disabled") # Disable save when new image loads
-            self.status_label.configure(text=f"STATUS: IMAGE LOADED", text_color="cyan")
-            self.textbox.configure(state="normal")
-            self.textbox.delete("1.0", "end")
-            self.textbox.insert("1.0", ">> Image loaded.\n>> Press 'INITIALIZE OCR' to begin.")
-            self.textbox.configure(state="disabled")
+            self.status_label.configure(text=f"STATUS: {len(filenames)} FILE(S) LOADED", text_color="cyan")
+            self.preview.clear(">> Image loaded.\n>> Press 'INITIALIZE OCR' to begin." if len(filenames) == 1 else
+                               f">> {len(filenames)} files loaded.\n>> Press 'INITIALIZE OCR' to queue them.")
+
+    def select_folder(self):
+        folder = filedialog.askdirectory()
+        if folder:
+            paths = [path for path, _ in expand_inputs([folder])]
+            if not paths:
+                messagebox.showinfo("Empty Folder", "No images or documents found in that folder.")
+                return
+            self.queue_paths(paths)
 
     def display_image(self, path):
-        img = Image.open(path)
-        # Smart Resize
-        target_h = 400
-        aspect = img.width / img.height
-        new_w = int(target_h * aspect)
-        
-        img = img.resize((new_w, target_h), Image.Resampling.LANCZOS)
-        self.ctk_image = ctk.CTkImage(light_image=img, dark_image=img, size=(new_w, target_h))
-        self.lbl_image_preview.configure(image=self.ctk_image, text="")
-
-    def start_conversion_thread(self):
-        self.btn_convert.configure(state="disabled")
-        self.btn_load.configure(state="disabled")
-        self.btn_save.configure(state="disabled")
-        self.progress_bar.grid()
-        self.progress_bar.start()
-        
-        threading.Thread(target=self.run_ocr_process, daemon=True).start()
+        # Decoded and resized on a background thread (cached per file); placeholder meanwhile
+        thumbnail = self.previews.cached(path)
+        if thumbnail is not None:
+            self.show_thumbnail(thumbnail)
+            return
+        self.lbl_image_preview.configure(image=None, text="Loading preview...")
+        future = self.previews.load(path)
+        future.add_done_callback(lambda f: self.after(0, lambda: self.preview_ready(path, f)))
 
-    def run_ocr_process(self):
+    def preview_ready(self, path, future):
+        if path != self.image_path:
+            return  # another file was picked meanwhile
         try:
-            self.update_status("Scanning Geometry...", "yellow")
-            time.sleep(0.5) 
-            
-            img = Image.open(self.image_path)
-            hocr_data = pytesseract.image_to_pdf_or_hocr(img, extension='hocr').decode('utf-8')
-            
-            self.update_status("Parsing Formatting Tags...", "orange")
-            words = self.parse_hocr(hocr_data)
-            
-            if not words:
-                raise Exception("No readable text found.")
-
-            self.update_status("Compiling Document...", "orange")
-            # Store doc object in memory, don't save yet
-            self.current_doc_object = self.generate_doc_object(words)
-            
-            self.after(0, lambda: self.conversion_complete())
-            
+            self.show_thumbnail(future.result().thumbnail)
         except Exception as e:
-            self.after(0, lambda: self.conversion_failed(str(e)))
+            self.lbl_image_preview.configure(image=None, text=f"Preview unavailable: {e}")
+
+    def show_thumbnail(self, img):
+        self.ctk_image = ctk.CTkImage(light_image=img, dark_image=img, size=img.size)
+        self.lbl_image_preview.configure(image=self.ctk_image, text="")
+
+    def queue_conversion(self):
+        self.btn_convert.configure(state="disabled")  # until more files are loaded
+        self.queue_paths(self.selected_paths)
+
+    def queue_paths(self, paths):
+        jobs = [self.jobs.submit(path) for path in paths]
+        self.update_status(f"{len(jobs)} FILE(S) QUEUED", "yellow")
+        # Follow the new work unless a finished result is being looked at
+        if self.selected_job is None or not self.selected_job.is_finished:
+            self.select_job(jobs[0])
 
     def update_status(self, text, color):
         color_map = {"yellow": "#f1c40f", "orange": "#e67e22", "red": "#e74c3c", "green": "#2ecc71"}
         self.after(0, lambda: self.status_label.configure(text=f"STATUS: {text}", text_color=color_map.get(color, "white")))
 
-    def conversion_complete(self):
-        self.progress_bar.stop()
-        self.progress_bar.grid_remove()
-        self.btn_load.configure(state="normal")
-        self.btn_convert.configure(state="normal")
-        self.btn_save.configure(state="normal") # Enable Save Button
-        
-        self.update_status("COMPLETED. READY TO DOWNLOAD.", "green")
-        
-        # Display preview from memory
-        self.display_text_result(self.current_doc_object)
-        messagebox.showinfo("Success", "Conversion Complete!\n\nReview the preview on the right.\nClick 'DOWNLOAD DOCX' to save the file.")
+    # JOB QUEUE
+    def on_job_change(self, job):
+        # Called on a worker thread; widgets are only touched on the Tk thread
+        self.after(0, lambda: self.refresh_job(job))
+
+    def refresh_job(self, job):
+        if job.number not in self.job_rows:
+            self.add_job_row(job)
+        _, label, button = self.job_rows[job.number]
+        label.configure(text=f"{job.name}   {job.describe()}")
+        if job.state == DONE:
+            button.configure(text="SAVE", command=lambda: self.save_job(job),
+                             fg_color="#27ae60", hover_color="#2ecc71")
+        elif job.is_finished:
+            button.pack_forget()
+        if job is self.selected_job:
+            self.show_job(job)
+        self.update_activity()
+
+    def add_job_row(self, job):
+        row = ctk.CTkFrame(self.jobs_frame, fg_color="transparent")
+        row.pack(fill="x", pady=2)
+        label = ctk.CTkLabel(row, text=job.name, anchor="w", cursor="hand2")
+        label.pack(side="left", fill="x", expand=True, padx=(5, 10))
+        label.bind("<Button-1>", lambda event: self.select_job(job))
+        button = ctk.CTkButton(row, text="CANCEL", width=80, command=lambda: self.jobs.cancel(job),
+                               fg_color="#c0392b", hover_color="#e74c3c")
+        button.pack(side="right", padx=5)
+        self.job_rows[job.number] = (job, label, button)
+
+    def select_job(self, job):
+        self.selected_job = job
+        self.shown_pages = 0
+        self.preview.clear()
+        if job.path != self.image_path:
+            self.image_path = job.path
+            self.display_image(job.path)
+        self.show_job(job)
+
+    def show_job(self, job):
+        # Pages are previewed as they are finished
+        pages = job.partial[self.shown_pages:]
+        for offset, paragraphs in enumerate(pages):
+            self.preview.append(paragraphs, page_break=self.shown_pages + offset > 0)
+        self.shown_pages += len(pages)
+
+        self.btn_save.configure(state="normal" if job.state == DONE else "disabled")
+        if job.state == DONE:
+            # Real per-stage timing of this job, e.g. "1234 ms (ocr 900, parse 12, ...)"
+            self.update_status(f"{job.name} COMPLETED IN {job.timing}. READY TO DOWNLOAD.", "green")
+        elif job.state == FAILED:
+            self.update_status(f"ERROR: {job.name}: {job.error}", "red")
+        elif job.state == CANCELLED:
+            self.update_status(f"{job.name} CANCELLED", "orange")
+        elif job.state == RUNNING:
+            self.update_status(f"Scanning {job.name} ({job.describe()})...", "yellow")
+        else:
+            self.update_status(f"{job.name} QUEUED", "yellow")
+
+    def update_activity(self):
+        # Progress bar, and a twice-a-second refresh of the elapsed times, while jobs are active
+        active = any(not job.is_finished for job, _, _ in self.job_rows.values())
+        if active and not self.ticking:
+            self.ticking = True
+            self.progress_bar.grid()
+            self.progress_bar.start()
+            self.after(500, self.tick)
+        elif not active and self.ticking:
+            self.ticking = False
+            self.progress_bar.stop()
+            self.progress_bar.grid_remove()
+
+    def tick(self):
+        if not self.ticking:
+            return
+        for job, label, _ in self.job_rows.values():
+            if job.state == RUNNING:
+                label.configure(text=f"{job.name}   {job.describe()}")
+        self.after(500, self.tick)
 
-    def conversion_failed(self, error_msg):
-        self.progress_bar.stop()
-        self.progress_bar.grid_remove()
-        self.btn_load.configure(state="normal")
-        self.btn_convert.configure(state="normal")
-        self.update_status(f"ERROR: {error_msg}", "red")
+    def save_job(self, job):
+        self.select_job(job)
+        self.save_document()
 
     def save_document(self):
-        if not self.current_doc_object:
+        job = self.selected_job
+        if job is None or job.state != DONE:
             return
             
         # Open Save As Dialog
         file_path = filedialog.asksaveasfilename(
             defaultextension=".docx",
             filetypes=[("Word Document", "*.docx")],
-            initialfile=f"Converted_{os.path.basename(self.image_path).split('.')[0]}.docx"
+            initialfile=f"Converted_{os.path.basename(job.path).split('.')[0]}.docx"
         )
         
         if file_path:
             try:
-                self.current_doc_object.save(file_path)
+                # The document was built by the job; saving is just writing it out
+                with open(file_path, 'wb') as f:
+                    f.write(job.result)
+                self.update_status(f"SAVED {job.name}", "green")
                 messagebox.showinfo("Saved", f"File saved successfully at:\n{file_path}")
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to save file: {e}")
 
-    # FORMATTING LOGIC
-    def parse_hocr(self, hocr_string):
-        words = []
-        pattern = re.compile(r"<span class=['\"]ocrx_word['\"].*?title=['\"]bbox (\d+) (\d+) (\d+) (\d+).*?>(.*?)</span>", re.DOTALL)
-        matches = pattern.findall(hocr_string)
-        
-        for match in matches:
-            x1, y1, x2, y2, content = match
-            x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
-            
-            is_bold = bool(re.search(r"<strong>|<b>", content, re.IGNORECASE))
-            is_italic = bool(re.search(r"<em>|<i>", content, re.IGNORECASE))
-            clean_text = re.sub('<[^<]+?>', '', content).strip()
-            
-            if clean_text:
-                words.append({'text': clean_text, 'x': x1, 'y': y1, 'h': y2-y1, 'bold': is_bold, 'italic': is_italic})
-        return words
-
-    def generate_doc_object(self, words_data):
-        doc = Document()
-        lines = {}
-        for word in words_data:
-            y = word['y']
-            found = False
-            for line_y in lines.keys():
-                if abs(line_y - y) < 12: 
-                    lines[line_y].append(word)
-                    found = True
-                    break
-            if not found: lines[y] = [word]
-
-        sorted_y = sorted(lines.keys())
-        all_heights = [w['h'] for w in words_data]
-        median_height = sorted(all_heights)[len(all_heights)//2] if all_heights else 20
-        last_y_bottom = 0
-
-        for y in sorted_y:
-            line_words = sorted(lines[y], key=lambda k: k['x'])
-            current_y_top = y
-            gap = current_y_top - last_y_bottom
-            
-            if last_y_bottom > 0 and gap > (median_height * 1.5):
-                doc.add_paragraph("") 
-
-            p = doc.add_paragraph()
-            if line_words[0]['x'] > 90: 
-                p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-
-            avg_h = sum([w['h'] for w in line_words]) / len(line_words)
-            is_header = avg_h > (median_height * 1.3)
-
-            for i, word in enumerate(line_words):
-                text = word['text'] if i == 0 else " " + word['text']
-                run = p.add_run(text)
-                
-                if is_header:
-                    run.bold = True
-                    run.font.size = Pt(14)
-                else:
-                    run.font.size = Pt(11)
-                    if word['bold']: run.bold = True
-                    if word['italic']: run.italic = True
-            
-            max_h = max([w['h'] for w in line_words])
-            last_y_bottom = y + max_h
-
-        return doc # Return the object instead of saving path
-
-    def display_text_result(self, doc_object):
-        self.textbox.configure(state="normal")
-        self.textbox.delete("1.0", "end")
-        
-        # Configure Tags
-        self.textbox.tag_config("header", font=("Roboto", 14, "bold"), foreground="#62a1ff")
-        self.textbox.tag_config("bold", font=("Roboto", 11, "bold"))
-        self.textbox.tag_config("italic", font=("Roboto", 11, "italic"))
-        self.textbox.tag_config("center", justify="center")
-
-        for p in doc_object.paragraphs:
-            tags = []
-            if p.alignment == WD_ALIGN_PARAGRAPH.CENTER:
-                tags.append("center")
-            
-            if not p.text.strip():
-                self.textbox.insert("end", "\n")
-                continue
-
-            for run in p.runs:
-                run_tags = list(tags)
-                if run.bold: run_tags.append("bold")
-                if run.italic: run_tags.append("italic")
-                if run.font.size and run.font.size.pt > 12: run_tags.append("header")
-                
-                self.textbox.insert("end", run.text, tuple(run_tags))
-            
-            self.textbox.insert("end", "\n", tuple(tags))
-        
-        self.textbox.configure(state="disabled")
+    def on_close(self):
+        # Running conversions (and their tesseract processes) are killed, not waited for
+        self.jobs.close()
+        self.destroy()
 
 if __name__ == "__main__":
     app = TechyOCRApp()
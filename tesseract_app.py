@@ -1,136 +1,181 @@
 import gradio as gr
-import pytesseract
-from PIL import Image
-from docx import Document
-from docx.shared import Pt
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-import re
+import asyncio
+import html
+import logging
 import os
-import tempfile
+import zipfile
+from io import BytesIO
+
+from image2word.convert import render_task, tesseract_task
+from image2word.page_source import count_pages
+from image2word.render import preview_html
+from image2word.scheduler import Scheduler, ServerBusy
+from image2word.spool import SWEEP_SECONDS, TTL, get_spool
+from image2word.tracing import Trace, start_metrics_server
 
 # CONFIGURATION: Set Tesseract path if needed
+# import pytesseract
 # pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
 
-def parse_hocr(hocr_string):
-    words = []
-    pattern = re.compile(r"<span class=['\"]ocrx_word['\"].*?title=['\"]bbox (\d+) (\d+) (\d+) (\d+).*?>(.*?)</span>", re.DOTALL)
-    matches = pattern.findall(hocr_string)
-    
-    for match in matches:
-        x1, y1, x2, y2, content = match
-        x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
-        
-        is_bold = bool(re.search(r"<strong>|<b>", content, re.IGNORECASE))
-        is_italic = bool(re.search(r"<em>|<i>", content, re.IGNORECASE))
-        clean_text = re.sub('<[^<]+?>', '', content).strip()
-        
-        if clean_text:
-            words.append({'text': clean_text, 'x': x1, 'y': y1, 'h': y2-y1, 'bold': is_bold, 'italic': is_italic})
-    return words
-
-def generate_doc_and_preview(words_data):
-    doc = Document()
-    
-    html_preview = "<div style='background-color: #ffffff; color: #ffffff; padding: 20px; font-family: monospace; border-radius: 5px;'>"
-    
-    lines = {}
-    for word in words_data:
-        y = word['y']
-        found = False
-        for line_y in lines.keys():
-            if abs(line_y - y) < 12: 
-                lines[line_y].append(word)
-                found = True
-                break
-        if not found: lines[y] = [word]
-
-    sorted_y = sorted(lines.keys())
-    all_heights = [w['h'] for w in words_data]
-    median_height = sorted(all_heights)[len(all_heights)//2] if all_heights else 20
-    last_y_bottom = 0
-
-    for y in sorted_y:
-        line_words = sorted(lines[y], key=lambda k: k['x'])
-        current_y_top = y
-        gap = current_y_top - last_y_bottom
-        
-        # Spacing Logic
-        if last_y_bottom > 0 and gap > (median_height * 1.5):
-            doc.add_paragraph("")
-            html_preview += "<br>"
-
-        p = doc.add_paragraph()
-        
-        # Alignment Logic
-        is_centered = line_words[0]['x'] > 90
-        if is_centered: 
-            p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-            html_preview += "<div style='text-align: center;'>"
-        else:
-            html_preview += "<div>"
-
-        avg_h = sum([w['h'] for w in line_words]) / len(line_words)
-        is_header = avg_h > (median_height * 1.3)
-
-        for i, word in enumerate(line_words):
-            text = word['text'] if i == 0 else " " + word['text']
-            run = p.add_run(text)
-            
-            # HTML Formatting for Preview
-            html_word = text
-            if is_header:
-                run.bold = True
-                run.font.size = Pt(14)
-                # Headers remain light blue for distinction
-                html_word = f"<span style='font-size: 1.3em; font-weight: bold; color: #62a1ff;'>{html_word}</span>"
-            else:
-                run.font.size = Pt(11)
-                if word['bold']: 
-                    run.bold = True
-                    html_word = f"<b>{html_word}</b>"
-                if word['italic']: 
-                    run.italic = True
-                    html_word = f"<i>{html_word}</i>"
-            
-            html_preview += html_word
-            
-        html_preview += "</div>"
-        
-        max_h = max([w['h'] for w in line_words])
-        last_y_bottom = y + max_h
-    
-    html_preview += "</div>"
-    return doc, html_preview
+# Worker processes shared by every request (defaults to every core); at most
+# this many conversions run at once and IMAGE2WORD_MAX_QUEUE more may wait
+DEFAULT_WORKERS = os.cpu_count() or 1
+scheduler = Scheduler('tesseract', DEFAULT_WORKERS, processes=True)
+
+def admit(slots=1):
+    # A place in line, or an error toast right away when the line is full
+    try:
+        return scheduler.admit(slots)
+    except ServerBusy as e:
+        raise gr.Error(str(e))
+
+def queued_html(position):
+    return f"<div style='color: gray'>{scheduler.describe(position)}...</div>"
+
+def add_durations(trace, durations):
+    for name, seconds in durations.items():
+        trace.add(name, seconds)
 
-# GRADIO INTERFACE FUNCTION
+# GRADIO INTERFACE FUNCTIONS
+# Async generators on the server's event loop: they report their place in
+# line while waiting, and the OCR itself runs in the scheduler's process pool.
 
-def process_image(image):
+async def process_image(image):
     if image is None:
-        return None, "<div style='color: red'>Please upload an image first.</div>"
-    
-    try:
-        # 1. Tesseract OCR
-        pil_img = Image.open(image)
-        hocr_data = pytesseract.image_to_pdf_or_hocr(pil_img, extension='hocr').decode('utf-8')
-        
-        # 2. Parse
-        words = parse_hocr(hocr_data)
-        if not words:
-            return None, "No text detected."
-            
-        # 3. Generate
-        doc_obj, html_preview = generate_doc_and_preview(words)
-        
-        # 4. Save to temp file for download
-        temp_dir = tempfile.gettempdir()
-        filename = f"converted_doc_{os.urandom(4).hex()}.docx"
-        save_path = os.path.join(temp_dir, filename)
-        doc_obj.save(save_path)
-        
-        return save_path, html_preview
-
-    except Exception as e:
-        return None, f"Error: {str(e)}"
+        yield None, "<div style='color: red'>Please upload an image first.</div>"
+        return
+
+    async with admit() as ticket:
+        async for position in ticket.positions():
+            yield None, queued_html(position)
+
+        trace = Trace('tesseract_app', 'image')
+        try:
+            # OCR (cached by image content), parse, layout and docx in a worker process
+            paragraphs, docx_bytes, durations = await scheduler.call(tesseract_task, image, None, 'docx')
+            add_durations(trace, durations)
+            if not paragraphs:
+                trace.finish()
+                yield None, "No text detected."
+                return
+
+            # The docx is already in memory: one write to the spool for the download
+            save_path = await asyncio.to_thread(get_spool().write, docx_bytes, "converted_doc.docx")
+            trace.finish()
+            yield save_path, preview_html(paragraphs)
+
+        except Exception as e:
+            trace.finish(ok=False)
+            yield None, f"Error: {str(e)}"
+
+async def process_document(document):
+    # Streams the preview page by page; each page is OCR'd in a worker process
+    if document is None:
+        yield None, "<div style='color: red'>Please upload a PDF or TIFF first.</div>"
+        return
+
+    path = document if isinstance(document, str) else document.name
+    async with admit() as ticket:
+        async for position in ticket.positions():
+            yield None, queued_html(position)
+
+        trace = Trace('tesseract_app', 'document')
+        try:
+            total = await scheduler.call(count_pages, path)
+            pages = []
+            previews = []
+
+            for index in range(total):
+                paragraphs, _, durations = await scheduler.call(tesseract_task, path, index)
+                add_durations(trace, durations)
+                pages.append(paragraphs)
+                if paragraphs:
+                    html_preview = preview_html(paragraphs)
+                else:
+                    html_preview = "<div style='color: gray'>No text detected.</div>"
+
+                previews.append(f"<h3 style='color: #62a1ff;'>Page {index + 1} / {total}</h3>{html_preview}")
+                yield None, "".join(previews)
+
+            docx_bytes, durations = await scheduler.call(render_task, pages, 'docx')
+            add_durations(trace, durations)
+            save_path = await asyncio.to_thread(get_spool().write, docx_bytes, "converted_doc.docx")
+            trace.finish()
+            yield save_path, "".join(previews)
+
+        except Exception as e:
+            trace.finish(ok=False)
+            yield None, f"Error: {str(e)}"
+
+# BATCH CONVERSION
+
+async def convert_file(path, limit):
+    # One batch file in the pool: (docx bytes or None, preview html, stage timings)
+    async with limit:
+        paragraphs, docx_bytes, durations = await scheduler.call(tesseract_task, path, None, 'docx')
+    if not paragraphs:
+        return None, "No text detected.", durations
+    return docx_bytes, preview_html(paragraphs), durations
+
+async def process_batch(files, workers=DEFAULT_WORKERS):
+    if not files:
+        yield None, "<div style='color: red'>Please upload at least one image.</div>"
+        return
+
+    paths = [f if isinstance(f, str) else f.name for f in files]
+    # A batch takes one place in line and reserves as many of the pool's
+    # processes as it keeps busy
+    workers = min(max(1, int(workers)), len(paths), scheduler.concurrency)
+    async with admit(workers) as ticket:
+        async for position in ticket.positions():
+            yield None, queued_html(position)
+
+        # One trace for the batch: stage times are summed over every file (and
+        # worker), the total is wall-clock time
+        trace = Trace('tesseract_app', 'batch')
+        limit = asyncio.Semaphore(workers)
+        results = await asyncio.gather(*(convert_file(path, limit) for path in paths), return_exceptions=True)
+
+    previews = []
+    entries = []  # (name in the zip, docx bytes)
+    used_names = set()
+
+    # Collect in upload order so the zip and preview match the input list
+    for path, result in zip(paths, results):
+        source_name = os.path.basename(path)
+        title = f"<h3 style='color: #62a1ff;'>{html.escape(source_name)}</h3>"
+        if isinstance(result, Exception):
+            previews.append(f"{title}<div style='color: red'>Error: {html.escape(str(result))}</div>")
+            continue
+        docx_bytes, html_preview, durations = result
+        add_durations(trace, durations)
+        if docx_bytes is None:
+            previews.append(f"{title}<div>{html_preview}</div>")
+            continue
+
+        name = f"{os.path.splitext(source_name)[0]}.docx"
+        suffix = 1
+        while name in used_names:
+            suffix += 1
+            name = f"{os.path.splitext(source_name)[0]}_{suffix}.docx"
+        used_names.add(name)
+        entries.append((name, docx_bytes))
+        previews.append(title + html_preview)
+
+    trace.finish(ok=bool(entries))
+    if not entries:
+        yield None, "".join(previews)
+        return
+    # Deflating is CPU work too: off the event loop
+    zip_path = await asyncio.to_thread(write_zip, entries)
+    yield zip_path, "".join(previews)
+
+def write_zip(entries):
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, data in entries:
+            archive.writestr(name, data)
+    return get_spool().write(buffer.getvalue(), "converted_batch.zip")
 
 # UI LAYOUT
 custom_css = """
@@ -138,7 +183,9 @@ body {background-color: #0b0f19;}
 .gradio-container {font-family: 'Roboto', sans-serif;}
 """
 
-with gr.Blocks(theme=gr.themes.Soft(primary_hue="blue", secondary_hue="slate"), css=custom_css, title="Image2Word") as app:
+# delete_cache: Gradio keeps its own copy of every output file, expire those like the spool
+with gr.Blocks(theme=gr.themes.Soft(primary_hue="blue", secondary_hue="slate"), css=custom_css, title="Image2Word",
+               delete_cache=(SWEEP_SECONDS, TTL)) as app:
     
     gr.Markdown(
         """
@@ -147,14 +194,36 @@ with gr.Blocks(theme=gr.themes.Soft(primary_hue="blue", secondary_hue="slate"),
         """
     )
     
-    with gr.Row():
-        with gr.Column(scale=1):
-            img_input = gr.Image(type="filepath", label="Source Input", height=400)
-            btn_run = gr.Button("INITIALIZE OCR", variant="primary")
-        
-        with gr.Column(scale=1):
-            preview_output = gr.HTML(label="Digitized Preview", value="<div style='color:gray'>System Idle...</div>")
-            file_output = gr.File(label="Download Result", interactive=False)
+    with gr.Tab("Single Image"):
+        with gr.Row():
+            with gr.Column(scale=1):
+                img_input = gr.Image(type="filepath", label="Source Input", height=400)
+                btn_run = gr.Button("INITIALIZE OCR", variant="primary")
+            
+            with gr.Column(scale=1):
+                preview_output = gr.HTML(label="Digitized Preview", value="<div style='color:gray'>System Idle...</div>")
+                file_output = gr.File(label="Download Result", interactive=False)
+
+    with gr.Tab("Document (PDF/TIFF)"):
+        with gr.Row():
+            with gr.Column(scale=1):
+                document_input = gr.File(label="Source Document", file_types=[".pdf", ".tif", ".tiff"])
+                btn_document = gr.Button("CONVERT DOCUMENT", variant="primary")
+            
+            with gr.Column(scale=1):
+                document_preview_output = gr.HTML(label="Digitized Preview", value="<div style='color:gray'>System Idle...</div>")
+                document_file_output = gr.File(label="Download Result", interactive=False)
+
+    with gr.Tab("Batch"):
+        with gr.Row():
+            with gr.Column(scale=1):
+                batch_input = gr.File(label="Source Images", file_count="multiple", file_types=["image"])
+                workers_input = gr.Slider(1, DEFAULT_WORKERS, value=DEFAULT_WORKERS, step=1, label="Worker Processes")
+                btn_batch = gr.Button("CONVERT BATCH", variant="primary")
+            
+            with gr.Column(scale=1):
+                batch_preview_output = gr.HTML(label="Combined Preview", value="<div style='color:gray'>System Idle...</div>")
+                batch_file_output = gr.File(label="Download ZIP", interactive=False)
 
     btn_run.click(
         fn=process_image, 
@@ -162,5 +231,25 @@ with gr.Blocks(theme=gr.themes.Soft(primary_hue="blue", secondary_hue="slate"),
         outputs=[file_output, preview_output]
     )
 
+    btn_document.click(
+        fn=process_document,
+        inputs=[document_input],
+        outputs=[document_file_output, document_preview_output]
+    )
+
+    btn_batch.click(
+        fn=process_batch,
+        inputs=[batch_input, workers_input],
+        outputs=[batch_file_output, batch_preview_output]
+    )
+
+    # The handlers only wait on the scheduler, which does the admission control
+    app.queue(default_concurrency_limit=None)
+
 if __name__ == "__main__":
+    # Per-conversion stage timings are logged; set IMAGE2WORD_METRICS_PORT for a /metrics endpoint
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s: %(message)s")
+    scheduler.start()  # fork the OCR workers before any server thread exists
+    start_metrics_server()
+    get_spool()  # sweep files left by an earlier run, report the spool in /metrics
     app.launch(share=True)
\ No newline at end of file
@@ -0,0 +1,70 @@
+import asyncio
+import types
+
+from image2word import gemini_batch
+from image2word.gemini_batch import BACKOFF_MAX, DEFAULT_RPM, GeminiBatch, TokenBucket, backoff_delay
+
+
+class Clock:
+    # Stands in for time.monotonic and asyncio.sleep: sleeping moves the clock
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def fake_clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(gemini_batch, 'time', types.SimpleNamespace(monotonic=clock.monotonic))
+    monkeypatch.setattr(gemini_batch.asyncio, 'sleep', clock.sleep)
+    return clock
+
+
+def test_bucket_paces_requests_once_its_burst_is_spent(monkeypatch):
+    clock = fake_clock(monkeypatch)
+    bucket = TokenBucket(60)  # one a second, bursts of 60
+
+    async def run():
+        await bucket.acquire(60)
+        assert clock.now == 0
+        for _ in range(3):
+            await bucket.acquire()
+
+    asyncio.run(run())
+    assert clock.now == 3.0
+
+
+def test_bucket_debt_delays_later_callers(monkeypatch):
+    clock = fake_clock(monkeypatch)
+    bucket = TokenBucket(60)
+
+    async def run():
+        await bucket.acquire(60)
+        bucket.adjust(30)  # used 30 more than estimated
+        await bucket.acquire()
+
+    asyncio.run(run())
+    assert clock.now == 31.0
+
+
+def test_blank_or_zero_limits_fall_back_to_usable_rates():
+    batch = GeminiBatch('key', 'model', 'prompt', rpm=None, tpm=0)
+    assert batch.requests.rate == DEFAULT_RPM / 60
+    assert batch.tokens.rate > 0
+    assert GeminiBatch('key', 'model', 'prompt', rpm=-5).requests.rate == 1 / 60
+
+
+def test_backoff_is_jittered_below_a_capped_exponential(monkeypatch):
+    monkeypatch.setattr(gemini_batch.random, 'uniform', lambda low, high: high)
+    assert [backoff_delay(attempt) for attempt in (1, 2, 3)] == [2.0, 4.0, 8.0]
+    assert backoff_delay(20) == BACKOFF_MAX
+    monkeypatch.undo()
+    delays = [backoff_delay(3) for _ in range(200)]
+    assert all(0 <= delay <= 8.0 for delay in delays)
+    assert len(set(delays)) > 1
@@ -0,0 +1,22 @@
+import io
+
+from PIL import Image, ImageDraw
+
+from image2word.gemini_payload import EncodeOptions, encode_image
+
+
+def transparent_page():
+    # Dark text on a fully transparent background, as in many screenshots and logos
+    image = Image.new('RGBA', (800, 600), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    for top in range(50, 550, 60):
+        draw.rectangle((50, top, 700, top + 20), fill=(20, 20, 120, 255))
+    return image
+
+
+def test_transparent_areas_are_uploaded_white():
+    for grayscale in (True, False, 'auto'):
+        payload = encode_image(transparent_page(), EncodeOptions(grayscale=grayscale))
+        uploaded = Image.open(io.BytesIO(payload.data)).convert('L')
+        assert uploaded.getpixel((10, 10)) > 240, grayscale  # background
+        assert uploaded.getpixel((uploaded.width // 2, round(60 * uploaded.height / 600))) < 100, grayscale  # text
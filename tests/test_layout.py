@@ -0,0 +1,16 @@
+from image2word.cli import build_parser
+from image2word.hocr_parser import Word
+from image2word.layout import layout_words
+
+
+def test_ocr_lines_keep_tesseracts_line_grouping():
+    # One Tesseract line whose second word sits well below the first (e.g. a subscript)
+    words = [Word("H", 40, 100, 60, 120, line=1), Word("2O", 66, 116, 100, 136, line=1),
+             Word("water", 40, 160, 130, 180, line=2)]
+    assert [p.text for p in layout_words(words) if p.runs] == ["H", "2O", "water"]
+    assert [p.text for p in layout_words(words, use_ocr_lines=True) if p.runs] == ["H 2O", "water"]
+
+
+def test_cli_passes_ocr_lines():
+    assert build_parser().parse_args(['a.png', '--ocr-lines']).ocr_lines
+    assert not build_parser().parse_args(['a.png']).ocr_lines
@@ -0,0 +1,34 @@
+from image2word.docx_builder import markdown_to_docx, new_document
+from image2word.gemini_client import LineBuffer
+
+MARKDOWN = "# Invoice\nTotal: **42.00** due\n\n## Items\nOne **bold** and one plain line\nlast line, no newline"
+
+
+def streamed(chunks):
+    lines = LineBuffer()
+    parts = [lines.feed(chunk) for chunk in chunks]
+    return lines, parts + [lines.flush()]
+
+
+def runs(doc):
+    return [[(run.text, bool(run.bold)) for run in p.runs] for p in doc.paragraphs]
+
+
+def test_feed_hands_out_whole_lines_only():
+    lines, parts = streamed(["# Inv", "oice\nTotal: *", "*42.00** due\n\n## It", "ems\nlast"])
+    assert parts == ["", "# Invoice\n", "Total: **42.00** due\n\n", "## Items\n", "last"]
+    assert lines.text == "# Invoice\nTotal: **42.00** due\n\n## Items\nlast"
+    assert lines.flush() == ""
+
+
+def test_any_chunking_renders_like_the_whole_text():
+    expected = runs(markdown_to_docx(MARKDOWN))
+    # Every split point, including inside "**" and right after a newline
+    for size in (1, 2, 3, 7, len(MARKDOWN)):
+        chunks = [MARKDOWN[i:i + size] for i in range(0, len(MARKDOWN), size)]
+        _, parts = streamed(chunks)
+        assert "".join(parts) == MARKDOWN
+        doc = new_document()
+        for part in parts:
+            markdown_to_docx(part, doc=doc)
+        assert runs(doc) == expected, size
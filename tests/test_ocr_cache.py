@@ -0,0 +1,61 @@
+import os
+import threading
+import time
+
+from image2word.ocr_cache import OCRCache
+
+
+def test_entry_written_by_another_instance_is_read(tmp_path):
+    a = OCRCache(str(tmp_path))
+    b = OCRCache(str(tmp_path))
+    a.put('key', 'hocr')
+    assert b.get('key') == 'hocr'
+    assert b.get_or_compute('key', lambda: 'computed again') == 'hocr'
+
+
+def test_size_limit_counts_every_instance_files(tmp_path):
+    a = OCRCache(str(tmp_path), disk_max_bytes=250)
+    b = OCRCache(str(tmp_path), disk_max_bytes=250)
+    # Explicit mtimes: eviction goes by mtime, which some filesystems keep in whole seconds
+    a.put('first', 'x' * 100)
+    os.utime(tmp_path / 'first.txt', (1000, 1000))
+    b.put('second', 'x' * 100)
+    os.utime(tmp_path / 'second.txt', (2000, 2000))
+    b.put('third', 'x' * 100)
+    files = sorted(name for name in os.listdir(tmp_path) if name.endswith('.txt'))
+    assert files == ['second.txt', 'third.txt']
+
+
+def test_instances_share_one_computation(tmp_path):
+    caches = [OCRCache(str(tmp_path)) for _ in range(2)]
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return 'hocr'
+
+    results = []
+    threads = [threading.Thread(target=lambda c=c: results.append(c.get_or_compute('key', compute)))
+               for c in caches]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ['hocr', 'hocr']
+    assert len(calls) == 1
+    assert not os.path.exists(tmp_path / 'key.lock')
+
+
+def test_failure_releases_the_marker(tmp_path):
+    cache = OCRCache(str(tmp_path))
+
+    def fail():
+        raise RuntimeError('tesseract failed')
+
+    try:
+        cache.get_or_compute('key', fail)
+    except RuntimeError:
+        pass
+    assert not os.path.exists(tmp_path / 'key.lock')
+    assert OCRCache(str(tmp_path)).get_or_compute('key', lambda: 'hocr') == 'hocr'
@@ -0,0 +1,45 @@
+from PIL import Image, ImageDraw
+
+from image2word.hocr_parser import Word
+from image2word.layout import layout_words
+from image2word.preprocess import preprocess_image, read_scale, tag_scale
+
+
+def page(line_height, angle=0.0, size=(3000, 4000)):
+    # Lines of "words" (solid boxes) ``line_height`` px tall, optionally rotated
+    image = Image.new('RGB', size, 'white')
+    draw = ImageDraw.Draw(image)
+    for top in range(size[1] // 10, size[1] * 9 // 10, line_height * 2):
+        x = size[0] // 10
+        while x < size[0] * 8 // 10:
+            draw.rectangle((x, top, x + line_height * 3, top + line_height), fill='black')
+            x += line_height * 4
+    return image.rotate(angle, fillcolor='white') if angle else image
+
+
+def steps(result):
+    return sorted(set(result.stats['timings']) & {'deskew', 'binarize'})
+
+
+def test_only_shrunk_rotated_photos_are_deskewed_and_binarized():
+    rotated = preprocess_image(page(120, angle=3))
+    assert rotated.scale < 0.9 and steps(rotated) == ['binarize', 'deskew']
+    assert abs(rotated.stats['skew']) >= 2
+
+    straight = preprocess_image(page(120))
+    assert straight.scale < 0.9 and steps(straight) == []
+
+    # Text already about the target height: left at full size, not even rotated
+    scan = preprocess_image(page(46, angle=3))
+    assert scan.scale == 1.0 and scan.image.size == (3000, 4000) and steps(scan) == []
+
+
+def test_scale_round_trips_through_the_hocr():
+    hocr = tag_scale("<div class='ocr_page'></div>", 0.4)
+    assert read_scale(hocr) == 0.4
+    assert read_scale("<div class='ocr_page'></div>") == 1.0
+
+    # Words 12 px apart vertically are one line at full scale but two at 0.4
+    words = [Word("one", 0, 100, 40, 110), Word("two", 60, 108, 100, 118)]
+    assert len(layout_words(words, scale=read_scale(tag_scale("", 1.0)))) == 1
+    assert len(layout_words(words, scale=read_scale(hocr))) == 2
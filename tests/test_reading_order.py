@@ -0,0 +1,55 @@
+import io
+import zipfile
+
+from image2word.docx_builder import render_docx
+from image2word.docx_writer import write_docx
+from image2word.hocr_parser import Word
+from image2word.layout import Paragraph, Run, layout_words
+
+
+def line(texts, x, y, height=20):
+    words = []
+    for text in texts:
+        width = 14 * len(text)
+        words.append(Word(text, x, y, x + width, y + height))
+        x += width + 12
+    return words
+
+
+def column_page(rows=6):
+    # Two columns of ``rows`` lines on a shared baseline grid, each line starting "c<column>r<row>"
+    words = []
+    for column, x in enumerate((40, 1300)):
+        for row in range(rows):
+            words += line([f"c{column}r{row}", "text", "in", "a", "column", "line"], x, 100 + 28 * row)
+    return words
+
+
+def test_wide_gap_on_one_line_is_not_a_column_split():
+    words = line("Invoice number 12345".split(), 40, 40) + line("Date 2024 January 15".split(), 1500, 40)
+    paragraphs = layout_words(words)
+    assert [p.text for p in paragraphs] == ["Invoice number 12345 Date 2024 January 15"]
+    assert not any(p.columns or p.column_break for p in paragraphs)
+
+
+def test_columns_are_read_one_after_the_other():
+    paragraphs = layout_words(column_page())
+    firsts = [p.text.split()[0] for p in paragraphs if p.runs]
+    assert firsts == [f"c{column}r{row}" for column in range(2) for row in range(6)]
+    assert paragraphs[0].columns == 2
+    assert [p.column_break for p in paragraphs].index(True) == 6
+
+
+def two_sections():
+    return [Paragraph([Run(text)], columns=columns, column_break=brk)
+            for text, columns, brk in (("a", 2, False), ("b", 0, True), ("c", 2, False), ("d", 0, True))]
+
+
+def test_adjacent_column_regions_are_separate_sections():
+    target = io.BytesIO()
+    write_docx([two_sections()], target)
+    document = zipfile.ZipFile(target).read('word/document.xml').decode()
+    assert document.count('<w:cols w:num="2"') == 2
+
+    doc = render_docx(two_sections())
+    assert [section._sectPr.xpath('./w:cols/@w:num') for section in doc.sections][1:] == [['2'], ['2'], ['1']]
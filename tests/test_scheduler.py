@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from image2word.scheduler import Scheduler, ServerBusy
+
+
+async def settle():
+    # Let woken tasks run
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_full_line_turns_requests_away():
+    async def run():
+        scheduler = Scheduler('test', 1, max_waiting=1)
+        running = scheduler.admit()
+        waiting = scheduler.admit()
+        with pytest.raises(ServerBusy):
+            scheduler.admit()
+        assert (running.position, waiting.position, scheduler.rejected) == (0, 1, 1)
+        scheduler.release(running)
+        assert waiting.running
+        scheduler.admit()  # room in line again
+
+    asyncio.run(run())
+
+
+def test_batches_never_oversubscribe_concurrency():
+    async def run():
+        scheduler = Scheduler('test', 4, max_waiting=8)
+        batch = scheduler.admit(3)
+        big = scheduler.admit(2)
+        single = scheduler.admit(1)
+        # Served in arrival order: the single request doesn't jump the 2-slot batch
+        assert (batch.running, big.running, single.running) == (True, False, False)
+        assert scheduler.running == 3
+        scheduler.release(batch)
+        assert big.running and single.running and scheduler.running == 3
+        assert scheduler.admit(100).slots == 4  # capped; waits for the whole pool
+        assert scheduler.running == 3
+
+    asyncio.run(run())
+
+
+def test_ticket_is_released_when_the_request_fails():
+    async def run():
+        scheduler = Scheduler('test', 1, max_waiting=1)
+        with pytest.raises(RuntimeError):
+            async with scheduler.admit():
+                raise RuntimeError("conversion failed")
+        assert scheduler.running == 0 and not scheduler.waiting
+        assert scheduler.admit().running
+
+    asyncio.run(run())
+
+
+def test_cancelled_waiter_leaves_the_line():
+    async def run():
+        scheduler = Scheduler('test', 1, max_waiting=4)
+        first = scheduler.admit()
+        seen = {}
+
+        async def request(name):
+            async with scheduler.admit() as ticket:
+                async for position in ticket.positions():
+                    seen.setdefault(name, []).append(position)
+                await asyncio.sleep(0)
+
+        second = asyncio.ensure_future(request('second'))
+        third = asyncio.ensure_future(request('third'))
+        await settle()
+        assert seen == {'second': [1], 'third': [2]}
+
+        second.cancel()
+        await settle()
+        assert second.cancelled() and len(scheduler.waiting) == 1
+        assert seen['third'] == [2, 1]  # moved up
+
+        scheduler.release(first)
+        await third
+        assert scheduler.running == 0 and not scheduler.waiting
+
+    asyncio.run(run())
@@ -0,0 +1,62 @@
+import os
+import types
+
+from image2word import spool
+from image2word.spool import Spool
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+def fake_clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(spool, 'time', types.SimpleNamespace(time=clock.time))
+    return clock
+
+
+def names(directory):
+    return sorted(name.rsplit('_', 1)[0] for name in os.listdir(directory))
+
+
+def test_files_expire_after_the_ttl(monkeypatch, tmp_path):
+    clock = fake_clock(monkeypatch)
+    store = Spool(str(tmp_path), ttl=60)
+    store.write(b'x', 'first.docx')
+    clock.now += 30
+    store.write(b'x', 'second.docx')
+    assert store.sweep() == 0
+    clock.now += 31
+    assert store.sweep() == 1
+    assert names(tmp_path) == ['second']
+    clock.now += 30
+    assert store.sweep() == 1
+    assert not os.listdir(tmp_path)
+
+
+def test_byte_cap_evicts_oldest_first(monkeypatch, tmp_path):
+    clock = fake_clock(monkeypatch)
+    store = Spool(str(tmp_path), max_bytes=250, ttl=3600)
+    for name in ('a.docx', 'b.docx', 'c.docx'):
+        store.write(b'x' * 100, name)
+        clock.now += 1
+    assert names(tmp_path) == ['b', 'c']
+    store.write(b'x' * 1000, 'big.docx')  # over the cap on its own: kept, everything else goes
+    assert names(tmp_path) == ['big']
+    assert store._evictions == {'ttl': 0, 'size': 3}
+
+
+def test_files_from_an_earlier_run_are_swept(monkeypatch, tmp_path):
+    clock = fake_clock(monkeypatch)
+    for name, age in (('old_1.docx', 120), ('new_1.docx', 10)):
+        path = tmp_path / name
+        path.write_bytes(b'x' * 10)
+        os.utime(path, (clock.now - age, clock.now - age))
+    store = Spool(str(tmp_path), ttl=60)
+    assert store._bytes == 20
+    assert store.sweep() == 1
+    assert names(tmp_path) == ['new']
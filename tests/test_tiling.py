@@ -0,0 +1,30 @@
+from image2word.hocr_parser import Word, parse_hocr, words_to_hocr
+from image2word.tiling import BAND_OVERLAP, merge_band_words
+
+CUTS = [0, 1000, 2000]
+# Page coordinates; "seam" straddles the cut at y=1000
+PAGE = [("top", 100, 130), ("above", 962, 984), ("seam", 988, 1012), ("below", 1016, 1038), ("bottom", 1500, 1530)]
+
+
+def band_results():
+    # What each band's OCR sees: the words inside its box, in band coordinates, band-local ids
+    results = []
+    for index in range(len(CUTS) - 1):
+        top = max(0, CUTS[index] - BAND_OVERLAP)
+        bottom = min(CUTS[-1], CUTS[index + 1] + BAND_OVERLAP)
+        words = [Word(text, 40, y - top, 200, y2 - top, conf=90.0, page=1, block=1, par=1, line=line)
+                 for line, (text, y, y2) in enumerate(PAGE, start=1) if y >= top and y2 <= bottom]
+        results.append((top, words))
+    return results
+
+
+def test_seam_word_is_kept_once_in_page_coordinates():
+    results = band_results()
+    assert [w.text for w in results[0][1]] == ["top", "above", "seam", "below"]
+    assert [w.text for w in results[1][1]] == ["above", "seam", "below", "bottom"]
+
+    words = parse_hocr(words_to_hocr(merge_band_words(results, CUTS), 1000, 2000))
+    assert [(w.text, w.y, w.y2) for w in words] == PAGE
+    # Ids are renumbered so the bands' lines stay distinct
+    assert len({w.line for w in words}) == len(PAGE)
+    assert len({w.block for w in words}) == 2
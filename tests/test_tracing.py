@@ -0,0 +1,22 @@
+import cProfile
+
+from image2word import tracing
+from image2word.tracing import Trace, stage
+
+
+class BusyProfile(cProfile.Profile):
+    def enable(self, *args, **kwargs):
+        raise ValueError("Another profiling tool is already active")
+
+
+def test_job_runs_unprofiled_while_another_is_profiled(monkeypatch, tmp_path):
+    monkeypatch.setattr(tracing, 'PROFILE_SLOW_MS', 0.001)
+    monkeypatch.setattr(tracing, 'PROFILE_DIR', str(tmp_path))
+    trace = Trace('test')
+    trace._profile = BusyProfile()
+    with trace.active():
+        with stage('ocr'):
+            sum(range(1000))
+    trace.finish()
+    assert trace.ok and 'ocr' in trace.durations
+    assert not list(tmp_path.iterdir())  # nothing collected, nothing saved